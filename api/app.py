@@ -9,6 +9,7 @@ from flask import Flask, request, render_template, send_from_directory
 from flask_cors import CORS
 
 from api.routes import api_blueprint
+from api.socket_async import init_async_socketio
 from api.socket_server import init_socketio
 
 
@@ -62,8 +63,8 @@ def setup_logging():
     logging.getLogger("werkzeug").setLevel(logging.WARNING)
 
 
-def create_app(env):
-    """Factory function to create and configure the Flask application.
+def build_app(env):
+    """Create and configure the Flask application without a Socket.IO server.
 
     Args:
         env (str): Application environment (e.g., DEVELOPMENT, PRODUCTION)
@@ -113,7 +114,33 @@ def create_app(env):
     app.register_blueprint(api_blueprint)
     app.json.sort_keys = False
 
+    return app
+
+
+def create_app(env):
+    """Factory function to create the Flask application and its SocketIO server.
+
+    Args:
+        env (str): Application environment (e.g., DEVELOPMENT, PRODUCTION)
+
+    Returns:
+        tuple: Configured Flask application instance and its SocketIO server
+    """
+    app = build_app(env)
+
     # Initialize SocketIO
     socketio = init_socketio(app)
 
     return app, socketio
+
+
+def create_asgi_app(env):
+    """Factory function to create the ASGI application served by asyncio.
+
+    Args:
+        env (str): Application environment (e.g., DEVELOPMENT, PRODUCTION)
+
+    Returns:
+        socketio.ASGIApp: The Flask application and an asyncio SocketIO server
+    """
+    return init_async_socketio(build_app(env))
@@ -1,8 +1,7 @@
 # pylint: skip-file
 """Enhanced multiplayer quiz API routes with WebSocket support."""
 
-from flask import Blueprint, request, jsonify
-from flask_socketio import SocketIO, emit, join_room, leave_room
+from flask import Blueprint, Response, request, jsonify, redirect
 from api.services.multiplayer_service import (
     create_new_lobby,
     join_existing_lobby,
@@ -16,178 +15,45 @@ from api.services.multiplayer_service import (
     advance_to_next_question,
     get_game_results,
     update_player_avatar,
+    get_lifecycle_stats,
+    get_journal_stats,
+    lobby_registry,
+    lobby_router,
+    CLUSTER_FORWARDED_HEADER,
+    adopt_lobby,
+    is_cluster_request,
+    moving_lobbies,
+    proxy_request,
+    resume_adopted_lobby,
+    update_cluster_nodes,
 )
 
 # Create blueprint - use 'multiplayer' as the endpoint for simplicity
 multiplayer_bp = Blueprint("multiplayer", __name__, url_prefix="/multiplayer")
 
-# SocketIO instance must be initialized in app.py and passed here
-socketio = None
 
+@multiplayer_bp.before_request
+def route_to_lobby_owner():
+    """Redirect or proxy requests for lobbies owned by another node."""
+    if request.headers.get(CLUSTER_FORWARDED_HEADER):
+        return None
 
-def init_socketio(socketio_instance):
-    """Initialize the SocketIO instance."""
-    global socketio
-    socketio = socketio_instance
-    setup_socket_events()
+    lobby_code = (request.view_args or {}).get("lobby_code")
+    if lobby_code is None and request.is_json:
+        lobby_code = (request.get_json(silent=True) or {}).get("lobby_code")
+    owner = lobby_code and lobby_router.owner(lobby_code)
+    if not owner:
+        return None
 
+    url = owner + request.full_path.rstrip("?")
+    if not lobby_router.proxy:
+        # 307 keeps the method and body of the request
+        return redirect(url, code=307)
 
-def setup_socket_events():
-    """Set up all WebSocket event handlers."""
-
-    @socketio.on("connect")
-    def handle_connect():
-        """Handle client connection."""
-        emit("connection_response", {"status": "connected"})
-
-    @socketio.on("disconnect")
-    def handle_disconnect():
-        """Handle client disconnection."""
-        pass  # Additional cleanup logic can be added here
-
-    @socketio.on("join_room")
-    def handle_join_room(data):
-        """Add a player to a specific lobby room."""
-        lobby_code = data.get("lobby_code")
-        player_name = data.get("player_name")
-
-        if not lobby_code:
-            emit("error", {"message": "Lobby code is required"})
-            return
-
-        join_room(lobby_code)
-        emit(
-            "room_joined",
-            {"lobby_code": lobby_code, "player": player_name},
-            room=lobby_code,
-        )
-
-        # Update all clients with new lobby information
-        result, _ = get_lobby_info(lobby_code)
-        emit("lobby_update", result, room=lobby_code)
-
-    @socketio.on("leave_room")
-    def handle_leave_room(data):
-        """Remove a player from a specific lobby room."""
-        lobby_code = data.get("lobby_code")
-        player_name = data.get("player_name")
-
-        if lobby_code:
-            leave_room(lobby_code)
-            emit("player_left", {"player": player_name}, room=lobby_code)
-
-            # Update all clients with new lobby information
-            result, _ = get_lobby_info(lobby_code)
-            emit("lobby_update", result, room=lobby_code)
-
-    @socketio.on("start_game")
-    def handle_start_game(data):
-        """Start a game and broadcast the first question."""
-        lobby_code = data.get("lobby_code")
-
-        if not lobby_code:
-            emit("error", {"message": "Lobby code is required"})
-            return
-
-        result, status_code = start_game(lobby_code)
-
-        if status_code == 200:
-            # Send the first question to all players
-            game_state, _ = get_game_state(lobby_code)
-            emit("game_started", game_state, room=lobby_code)
-            emit(
-                "new_question",
-                {
-                    "question": game_state["current_question"],
-                    "question_index": game_state["current_question_index"],
-                },
-                room=lobby_code,
-            )
-        else:
-            emit("error", result, room=lobby_code)
-
-    @socketio.on("submit_answer")
-    def handle_submit_answer(data):
-        """Handle a player submitting an answer."""
-        lobby_code = data.get("lobby_code")
-        player_name = data.get("player_name")
-        question_index = data.get("question_index", 0)
-        answer = data.get("answer", "")
-        time_taken = data.get("time_taken", 0)
-        is_correct = data.get("is_correct", False)
-        score = data.get("score", 0)
-
-        if not lobby_code or not player_name:
-            emit("error", {"message": "Lobby code and player name are required"})
-            return
-
-        result, status_code = submit_player_answer(
-            lobby_code,
-            player_name,
-            question_index,
-            answer,
-            time_taken,
-            is_correct,
-            score,
-        )
-
-        # Acknowledge the answer submission to the player
-        emit(
-            "answer_submitted",
-            {
-                "player": player_name,
-                "question_index": question_index,
-                "is_correct": is_correct,
-            },
-            room=request.sid,
-        )
-
-        # Get updated game state to check if all players have answered
-        game_state, _ = get_game_state(lobby_code)
-
-        if game_state.get("all_players_answered", False):
-            # If all players have answered, show mini-scoreboard
-            emit(
-                "mini_scoreboard",
-                {
-                    "results": game_state.get("current_question_results", []),
-                    "scores": game_state.get("player_scores", {}),
-                },
-                room=lobby_code,
-            )
-
-            # After a delay (this should be handled by the client), move to next question
-            # The client will emit 'request_next_question' after showing the mini-scoreboard
-
-    @socketio.on("request_next_question")
-    def handle_next_question(data):
-        """Move to the next question after mini-scoreboard is displayed."""
-        lobby_code = data.get("lobby_code")
-
-        if not lobby_code:
-            emit("error", {"message": "Lobby code is required"})
-            return
-
-        result, status_code = advance_to_next_question(lobby_code)
-
-        if status_code == 200:
-            if result.get("game_complete", False):
-                # Game is complete, show final results
-                final_results, _ = get_game_results(lobby_code)
-                emit("game_complete", final_results, room=lobby_code)
-            else:
-                # Send the next question
-                game_state, _ = get_game_state(lobby_code)
-                emit(
-                    "new_question",
-                    {
-                        "question": game_state["current_question"],
-                        "question_index": game_state["current_question_index"],
-                    },
-                    room=lobby_code,
-                )
-        else:
-            emit("error", result, room=lobby_code)
+    body, status_code, content_type = proxy_request(
+        request.method, url, request.get_data(), request.content_type
+    )
+    return Response(body, status=status_code, content_type=content_type)
 
 
 # Route to create a new lobby
@@ -205,7 +71,7 @@ def create_lobby():
     lobby = create_new_lobby(host_name, host_avatar)
 
     return (
-        jsonify({"lobby_code": lobby["lobby_code"], "host_id": lobby["host_id"]}),
+        jsonify({"lobby_code": lobby.lobby_code, "host_id": lobby.host_id}),
         201,
     )
 
@@ -315,12 +181,107 @@ def get_lobby(lobby_code):
     return jsonify(result), status_code
 
 
+# Route to get lobby lifecycle counters
+@multiplayer_bp.route("/stats", methods=["GET"])
+def get_stats():
+    """Get the number of active lobbies and the lobby lifecycle and journal counters."""
+    stats = dict(get_lifecycle_stats(), active_lobbies=len(lobby_registry))
+    journal = get_journal_stats()
+    if journal is not None:
+        stats["journal"] = journal
+    return jsonify(stats), 200
+
+
+# Route for other nodes to hand over a lobby they no longer own
+@multiplayer_bp.route("/cluster/lobbies", methods=["POST"])
+def adopt_cluster_lobby():
+    """Take over a lobby from another node of the cluster."""
+    if not is_cluster_request(request.headers):
+        return jsonify({"error": "Forbidden"}), 403
+
+    data = request.json
+    if not data or "lobby" not in data:
+        return jsonify({"error": "Lobby is required"}), 400
+
+    result, status_code = adopt_lobby(data["lobby"])
+    return jsonify(result), status_code
+
+
+# Route for the previous owner of a handed-over lobby to let it run here
+@multiplayer_bp.route("/cluster/lobbies/<lobby_code>/resume", methods=["POST"])
+def resume_cluster_lobby(lobby_code):
+    """Re-arm the timers of a lobby once its previous owner let go of it."""
+    if not is_cluster_request(request.headers):
+        return jsonify({"error": "Forbidden"}), 403
+
+    result, status_code = resume_adopted_lobby(lobby_code)
+    return jsonify(result), status_code
+
+
+# Route to change the nodes of the cluster
+@multiplayer_bp.route("/cluster/nodes", methods=["GET", "PUT"])
+def cluster_nodes():
+    """Get the cluster's nodes, or replace them and move lobbies to their owners."""
+    if request.method == "GET":
+        return jsonify(
+            {
+                "node": lobby_router.node_url,
+                "nodes": lobby_router.nodes,
+                "moving_lobbies": moving_lobbies(),
+            }
+        )
+
+    if not is_cluster_request(request.headers):
+        return jsonify({"error": "Forbidden"}), 403
+
+    data = request.json
+    if not data or not isinstance(data.get("nodes"), list):
+        return jsonify({"error": "Node list is required"}), 400
+
+    result, status_code = update_cluster_nodes(data["nodes"])
+    return jsonify(result), status_code
+
+
 # Route to get game state (including questions)
 @multiplayer_bp.route("/game/<lobby_code>", methods=["GET"])
 def get_game(lobby_code):
-    """Get the current state of a game including questions."""
-    result, status_code = get_game_state(lobby_code)
-    return jsonify(result), status_code
+    """
+    Get the current state of a game including questions.
+
+    ?view=current returns only the current question, without answers. The
+    lobby's state version is the ETag, so a request whose If-None-Match holds
+    it gets 304; ?since=<version> instead waits for the state to move past
+    that version before answering, as a long poll.
+    """
+    since = request.args.get("since", type=int)
+    known_version = since
+    if since is None:
+        known_version = next(
+            (
+                int(tag)
+                for tag in request.if_none_match.as_set(include_weak=True)
+                if tag.isdigit()
+            ),
+            None,
+        )
+
+    result, status_code = get_game_state(
+        lobby_code,
+        request.args.get("view", "full"),
+        known_version,
+        wait=since is not None,
+    )
+    if status_code == 304:
+        response = Response(status=304)
+    elif status_code == 200:
+        response = jsonify(result)
+    else:
+        return jsonify(result), status_code
+
+    # Browsers revalidate the cached state on every request
+    response.set_etag(str(result["version"]))
+    response.headers["Cache-Control"] = "no-cache"
+    return response
 
 
 # Route to submit an answer
@@ -337,11 +298,9 @@ def submit_answer():
     question_index = data.get("question_index", 0)
     answer = data.get("answer", "")
     time_taken = data.get("time_taken", 0)
-    is_correct = data.get("is_correct", False)
-    score = data.get("score", 0)
 
     result, status_code = submit_player_answer(
-        lobby_code, player_name, question_index, answer, time_taken, is_correct, score
+        lobby_code, player_name, question_index, answer, time_taken
     )
     return jsonify(result), status_code
 
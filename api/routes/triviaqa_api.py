@@ -27,6 +27,7 @@ def get_questions_route():
     topic = request.args.get("topic")
     num_questions = request.args.get("num_questions")
     difficulty = request.args.get("difficulty")
+    session_id = request.args.get("session_id")
 
-    questions = get_triviaqa(topic, num_questions, difficulty)
+    questions = get_triviaqa(topic, num_questions, difficulty, session_id)
     return jsonify(questions)
@@ -8,10 +8,12 @@ from api.utils.multiplayer_lobby import (
     init_active_sessions,
     cleanup_inactive_lobbies,
     cleanup_orphaned_players,
+    get_lifecycle_stats,
     generate_lobby_code,
     GAME_STATE,
     active_lobbies,
-    lobbies_lock,
+    lobby_registry,
+    lobby_lifecycle,
 )
 
 from api.utils.multiplayer_game import (
@@ -26,14 +28,37 @@ from api.utils.multiplayer_player import (
     leave_lobby,
     get_lobby_info,
     get_game_state,
+    game_state_watch,
     submit_player_answer,
     advance_to_next_question,
     get_game_results,
     update_player_avatar,
+    mark_player_disconnected,
+    bind_player_session,
+)
+
+from api.utils.multiplayer_engine import game_engine
+
+from api.utils.multiplayer_emitter import event_emitter
+
+from api.utils.multiplayer_shard import lobby_router
+
+from api.utils.multiplayer_journal import get_journal_stats, start_lobby_journal
+
+from api.utils.multiplayer_cluster import (
+    CLUSTER_FORWARDED_HEADER,
+    adopt_lobby,
+    is_cluster_request,
+    moving_lobbies,
+    proxy_request,
+    resume_adopted_lobby,
+    update_cluster_nodes,
 )
 
 from api.utils.multiplayer_broadcast import (
     broadcast_lobby_update,
+    broadcast_lobby_delta,
+    lobby_snapshot,
     broadcast_question,
     broadcast_player_answered,
     broadcast_all_answers_in,
@@ -46,6 +71,10 @@ __all__ = [
     "init_active_sessions",
     "cleanup_inactive_lobbies",
     "cleanup_orphaned_players",
+    "get_lifecycle_stats",
+    "active_lobbies",
+    "lobby_registry",
+    "lobby_lifecycle",
     "create_new_lobby",
     "join_existing_lobby",
     "update_player_ready_status",
@@ -54,11 +83,28 @@ __all__ = [
     "leave_lobby",
     "get_lobby_info",
     "get_game_state",
+    "game_state_watch",
     "submit_player_answer",
     "advance_to_next_question",
     "get_game_results",
     "update_player_avatar",
+    "mark_player_disconnected",
+    "bind_player_session",
+    "game_engine",
+    "event_emitter",
+    "lobby_router",
+    "start_lobby_journal",
+    "get_journal_stats",
+    "CLUSTER_FORWARDED_HEADER",
+    "adopt_lobby",
+    "is_cluster_request",
+    "moving_lobbies",
+    "proxy_request",
+    "resume_adopted_lobby",
+    "update_cluster_nodes",
     "broadcast_lobby_update",
+    "broadcast_lobby_delta",
+    "lobby_snapshot",
     "broadcast_question",
     "broadcast_player_answered",
     "broadcast_all_answers_in",
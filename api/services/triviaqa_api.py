@@ -8,6 +8,7 @@ from pymongo import MongoClient
 from api.utils.category_aggregator import get_categories
 from api.utils.opentdb_data import get_questions_from_api, format_question_api_output
 from api.utils.mongodb_data import get_mongodb_data
+from api.utils.question_bank import get_question_bank, QUESTION_BANK_TAG
 
 load_dotenv()
 CONNECTION_STRING = os.getenv("MONGO_CONNECTION_STRING")
@@ -28,7 +29,7 @@ def check_connection():
         return False
 
 
-def get_triviaqa(topic, num_questions, difficulty):
+def get_triviaqa(topic, num_questions, difficulty, session_id=None):
     """
     Retrieve trivia questions based on the given parameters.
 
@@ -36,6 +37,7 @@ def get_triviaqa(topic, num_questions, difficulty):
         topic (str): The topic or category of the questions.
         num_questions (int): The number of questions to retrieve.
         difficulty (str): The difficulty level of the questions.
+        session_id (str, optional): Client session to avoid repeating questions for.
 
     Returns:
         list: A list of trivia questions, or None if the category is not found.
@@ -48,15 +50,30 @@ def get_triviaqa(topic, num_questions, difficulty):
             category=str(category),
             difficulty=difficulty,
             num_questions=str(num_questions),
+            session_id=session_id,
         )
         return format_question_api_output(api_question_json)
 
+    if category == QUESTION_BANK_TAG:
+        bank = get_question_bank()
+        if bank is None:
+            logging.error("Question bank for category '%s' is not available", topic)
+            return None
+        return bank.get_questions(topic, num_questions, difficulty)
+
     if isinstance(category, str):
         client = MongoClient(CONNECTION_STRING)
-        result = get_mongodb_data(client, topic, num_questions, difficulty)
+        result = get_mongodb_data(client, topic, num_questions, difficulty, session_id)
         if result:
             return result
         return f"Collection '{topic}' does not exist in database 'trivia-qa'."
 
+    bank = get_question_bank()
+    if bank is not None and topic:
+        # Fall back to questions whose text matches the topic
+        result = bank.search_questions(topic, num_questions, difficulty)
+        if result:
+            return result
+
     print(f"Category '{topic}' not found")
     return None
@@ -0,0 +1,206 @@
+"""Asyncio Socket.IO server serving the multiplayer game under an ASGI server."""
+
+import asyncio
+import logging
+import os
+import threading
+import socketio as python_socketio
+from asgiref.sync import ThreadSensitiveContext
+from asgiref.wsgi import WsgiToAsgi
+from api import socket_server
+from api.services.multiplayer_service import (
+    game_state_watch,
+    init_active_sessions,
+    lobby_lifecycle,
+    start_lobby_journal,
+)
+from api.socket_handlers import EVENT_HANDLERS, SocketClient, active_sessions
+from api.utils.multiplayer_codec import CodecPacket, codec_manager
+
+# Seconds an emitter worker waits for the event loop to write an event
+EMIT_TIMEOUT = 5
+
+# Worker threads running Flask requests side by side under the ASGI server
+WSGI_THREADS = int(os.getenv("WSGI_THREADS", "64"))
+
+
+class ThreadedWsgiToAsgi:  # pylint: disable=too-few-public-methods
+    """
+    ASGI adapter running each WSGI request on its own thread, a bounded number at once.
+
+    asgiref's WsgiToAsgi runs requests thread-sensitively, which puts every
+    request on one shared thread, so a single slow route would hold up all
+    others. Giving each request its own ThreadSensitiveContext gives it its own
+    thread, and requests beyond `limit` wait for a running one to finish.
+
+    Args:
+        wsgi_application (callable): The WSGI app
+        limit (int): How many requests run at once
+    """
+
+    def __init__(self, wsgi_application, limit):
+        self.app = WsgiToAsgi(wsgi_application)
+        self.slots = asyncio.Semaphore(limit)
+
+    async def __call__(self, scope, receive, send):
+        async with self.slots, ThreadSensitiveContext():
+            await self.app(scope, receive, send)
+
+
+class AsyncSocketBridge:
+    """
+    Thread-side stand-in for the Flask-SocketIO server in asyncio mode.
+
+    The multiplayer service emits events and starts background tasks from
+    worker threads. Emits are handed to the event loop and waited for, so the
+    emitter workers keep writing the events of a room in order, and background
+    tasks run in threads as they would under the threaded server.
+    """
+
+    def __init__(self, sio):
+        self.sio = sio
+        self.loop = None
+
+    def attach(self):
+        """ASGI startup hook recording the event loop the server runs on."""
+        self.loop = asyncio.get_running_loop()
+
+    def emit(self, event, data, room=None):
+        """Emit an event from a worker thread through the event loop."""
+        if self.loop is None:
+            logging.warning("Event loop not started, dropping %s", event)
+            return
+        asyncio.run_coroutine_threadsafe(
+            self.sio.emit(event, data, room=room), self.loop
+        ).result(EMIT_TIMEOUT)
+
+    @staticmethod
+    def start_background_task(target, *args, **kwargs):
+        """Run a blocking background task in a daemon thread."""
+        thread = threading.Thread(target=target, args=args, kwargs=kwargs, daemon=True)
+        thread.start()
+        return thread
+
+
+class AsyncSocketClient(SocketClient):
+    """
+    The client of an asyncio server event, sent to from the worker thread handling it.
+
+    Args:
+        sio (socketio.AsyncServer): The server the client is connected to
+        sid (str): The client's session id
+        loop (asyncio.AbstractEventLoop): The event loop the server runs on
+    """
+
+    def __init__(self, sio, sid, loop):
+        super().__init__(sid)
+        self.sio = sio
+        self.loop = loop
+
+    def _wait(self, coroutine):
+        asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(EMIT_TIMEOUT)
+
+    def emit(self, event, data, room=None, skip_self=False):
+        if room is None:
+            self._wait(self.sio.emit(event, data, to=self.sid))
+        else:
+            skip_sid = self.sid if skip_self else None
+            self._wait(self.sio.emit(event, data, room=room, skip_sid=skip_sid))
+
+    def join(self, room):
+        self._wait(self.sio.enter_room(self.sid, room))
+
+    def leave(self, room):
+        self._wait(self.sio.leave_room(self.sid, room))
+
+
+def create_async_server(flask_app):
+    """
+    Create the asyncio Socket.IO server with the multiplayer event handlers.
+
+    Args:
+        flask_app (Flask): The app whose context blocking handlers run in
+
+    Returns:
+        socketio.AsyncServer: The server
+    """
+    # Clients pick JSON or msgpack packets when they connect
+    sio = python_socketio.AsyncServer(
+        async_mode="asgi",
+        cors_allowed_origins="*",
+        logger=False,
+        engineio_logger=False,
+        serializer=CodecPacket,
+        client_manager=codec_manager(
+            os.getenv("SOCKETIO_MESSAGE_QUEUE"), asyncio_mode=True
+        ),
+    )
+    setup_async_handlers(sio, flask_app)
+    return sio
+
+
+def setup_async_handlers(sio, flask_app):
+    """Register the shared event handlers, each run in a worker thread."""
+    for event, handler in EVENT_HANDLERS.items():
+        sio.on(event, async_handler(sio, flask_app, handler))
+
+
+def async_handler(sio, flask_app, handler):
+    """
+    Wrap a shared handler to run in the default executor, in the app context.
+
+    Args:
+        sio (socketio.AsyncServer): The server the handler's client is on
+        flask_app (Flask): The app whose context the handler runs in
+        handler (callable): The blocking handler from socket_handlers
+
+    Returns:
+        callable: The coroutine event handler
+    """
+
+    async def on_event(sid, *args):
+        loop = asyncio.get_running_loop()
+        client = AsyncSocketClient(sio, sid, loop)
+
+        def call():
+            with flask_app.app_context():
+                return handler(client, *args)
+
+        return await loop.run_in_executor(None, call)
+
+    return on_event
+
+
+def init_async_socketio(flask_app):
+    """
+    Serve the Flask app and an asyncio Socket.IO server as one ASGI app.
+
+    The Flask blueprints stay mounted through an ASGI adapter that runs up to
+    WSGI_THREADS requests in parallel, each on its own thread, so blocking
+    routes (quiz generation, MongoDB, PDF parsing, image search) neither block
+    the event loop nor each other. The multiplayer service emits through an
+    AsyncSocketBridge standing in for the threaded server.
+
+    Args:
+        flask_app (Flask): The configured Flask app
+
+    Returns:
+        socketio.ASGIApp: The ASGI app
+    """
+    sio = create_async_server(flask_app)
+    bridge = AsyncSocketBridge(sio)
+    socket_server.socketio = bridge
+
+    # Let the lobby lifecycle scheduler reap idle lobbies and orphaned players
+    init_active_sessions(active_sessions)
+    lobby_lifecycle.start(bridge)
+    start_lobby_journal()
+
+    # Waiting long polls hold request threads, so leave half for other routes
+    game_state_watch.max_waiters = min(game_state_watch.max_waiters, WSGI_THREADS // 2)
+
+    return python_socketio.ASGIApp(
+        sio,
+        other_asgi_app=ThreadedWsgiToAsgi(flask_app, WSGI_THREADS),
+        on_startup=bridge.attach,
+    )
@@ -0,0 +1,249 @@
+"""Multiplayer Socket.IO event handlers shared by the threaded and asyncio servers."""
+
+import logging
+import time
+from api.services.multiplayer_service import (
+    advance_to_next_question,
+    bind_player_session,
+    leave_lobby,
+    lobby_registry,
+    lobby_router,
+    mark_player_disconnected,
+    start_game,
+    submit_player_answer,
+)
+
+# Connected socket sessions: sid -> connection time
+active_sessions = {}
+
+
+class SocketClient:
+    """
+    The client whose event is being handled.
+
+    The handlers are blocking functions; each server passes them a client that
+    sends through its own Socket.IO server.
+
+    Args:
+        sid (str): The client's session id
+    """
+
+    def __init__(self, sid):
+        self.sid = sid
+
+    def emit(self, event, data, room=None, skip_self=False):
+        """Send an event to this client, or to a room, optionally without this client."""
+        raise NotImplementedError
+
+    def join(self, room):
+        """Add this client to a room."""
+        raise NotImplementedError
+
+    def leave(self, room):
+        """Remove this client from a room."""
+        raise NotImplementedError
+
+
+def redirect_foreign_lobby(client, lobby_code):
+    """Tell the client to reconnect to the node owning a lobby of another node."""
+    owner = lobby_router.owner(lobby_code)
+    if owner is None:
+        return False
+    client.emit("lobby_redirect", {"lobby_code": lobby_code, "node": owner})
+    return True
+
+
+def handle_connect(client, *_args):
+    """Handle client connection."""
+    logging.info("Client connected: %s", client.sid)
+    active_sessions[client.sid] = time.time()
+    client.emit("connection_response", {"status": "connected"})
+
+
+def handle_disconnect(client, *_args):
+    """Handle client disconnection."""
+    logging.info("Client disconnected: %s", client.sid)
+    active_sessions.pop(client.sid, None)
+
+    player_name = None
+    session = lobby_registry.session(client.sid)
+    if session is not None:
+        lobby_code, player_id = session
+        player_name = mark_player_disconnected(lobby_code, player_id)
+        if player_name is not None:
+            logging.info(
+                "Player %s disconnected from lobby %s", player_name, lobby_code
+            )
+
+    if player_name is None:
+        logging.warning("Disconnected client %s not found in any lobby.", client.sid)
+
+
+def handle_join_room(client, data=None):
+    """Handle client joining a lobby room."""
+    logging.info("Join room request: %s", data)
+    if not data or "lobby_code" not in data or "player_name" not in data:
+        client.emit("error", {"message": "Invalid data for joining room"})
+        return
+
+    lobby_code = data["lobby_code"]
+    player_name = data["player_name"]
+    player_id = data.get("player_id", "")
+    if redirect_foreign_lobby(client, lobby_code):
+        return
+
+    client.join(lobby_code)
+    logging.info("Player %s (%s) joined lobby %s", player_name, client.sid, lobby_code)
+
+    # Index the session ID to the player for disconnect handling
+    snapshot = bind_player_session(client.sid, lobby_code, player_name, player_id)
+
+    # Give the client the version that later deltas build on
+    if snapshot is not None:
+        client.emit("lobby_update", snapshot)
+
+    # Notify other clients in the room, which large rooms only count
+    if snapshot is None or not snapshot["settings"].get("largeRoom"):
+        client.emit(
+            "player_joined",
+            {"name": player_name, "id": player_id},
+            room=lobby_code,
+            skip_self=True,
+        )
+
+    # Acknowledge join to the client who joined
+    client.emit("room_joined", {"lobby_code": lobby_code, "status": "success"})
+
+
+def handle_leave_room(client, data=None):
+    """Handle client leaving a lobby room."""
+    if not data or "lobby_code" not in data or "player_name" not in data:
+        return
+
+    lobby_code = data["lobby_code"]
+    player_name = data["player_name"]
+    if redirect_foreign_lobby(client, lobby_code):
+        return
+
+    client.leave(lobby_code)
+    logging.info("Player %s (%s) left lobby %s", player_name, client.sid, lobby_code)
+
+    # The multiplayer service broadcasts player_left and lobby_update events
+    result, status_code = leave_lobby(lobby_code, player_name)
+
+    if status_code == 200:
+        logging.info(
+            "Player %s successfully removed from lobby %s", player_name, lobby_code
+        )
+    else:
+        logging.error(
+            "Failed to remove player %s from lobby %s: %s",
+            player_name,
+            lobby_code,
+            result,
+        )
+
+
+def handle_start_game(client, data=None):
+    """Handle game start request."""
+    logging.info("Start game request: %s", data)
+    if not data or "lobby_code" not in data:
+        client.emit("error", {"message": "Invalid data for starting game"})
+        return
+
+    lobby_code = data["lobby_code"]
+    if redirect_foreign_lobby(client, lobby_code):
+        return
+
+    # Call the multiplayer service to start generating the game
+    result, status_code = start_game(lobby_code)
+
+    if status_code not in (200, 202):
+        client.emit("error", {"message": result.get("error", "Failed to start game")})
+        return
+
+    # The multiplayer service broadcasts game_started to the room once the
+    # questions are ready, so only acknowledge that generation is under way
+    if status_code == 202:
+        client.emit("game_generating", {"status": "success"})
+
+
+def handle_submit_answer(client, data=None):
+    """Handle answer submission through the same game engine as the REST route."""
+    logging.info("Answer submission: %s", data)
+    if (
+        not data
+        or "lobby_code" not in data
+        or "player_name" not in data
+        or "question_index" not in data
+    ):
+        client.emit("error", {"message": "Invalid answer submission data"})
+        return
+    if redirect_foreign_lobby(client, data["lobby_code"]):
+        return
+
+    # The engine records the answer, broadcasts player_answered and closes
+    # the question once every player has answered
+    result, status_code = submit_player_answer(
+        data["lobby_code"],
+        data["player_name"],
+        data["question_index"],
+        data.get("answer", ""),
+        data.get("time_taken", 0),
+    )
+
+    if status_code != 200:
+        client.emit(
+            "error", {"message": result.get("error", "Failed to submit answer")}
+        )
+
+
+def handle_next_question(client, data=None):
+    """Handle request for next question."""
+    logging.info("Next question request: %s", data)
+    if not data or "lobby_code" not in data:
+        client.emit("error", {"message": "Invalid next question request"})
+        return
+
+    lobby_code = data["lobby_code"]
+    if redirect_foreign_lobby(client, lobby_code):
+        return
+
+    result, status_code = advance_to_next_question(lobby_code)
+
+    if status_code != 200:
+        client.emit(
+            "error",
+            {"message": result.get("error", "Failed to advance to next question")},
+        )
+        return
+
+    # If game is over, notify client
+    if result.get("game_over", False):
+        client.emit("game_over_acknowledged", {"status": "success"})
+
+
+def handle_validate_lobby(client, data=None):
+    """Validate if a lobby is still active."""
+    if not data or "lobby_code" not in data:
+        client.emit("error", {"message": "Invalid data for lobby validation"})
+        return
+
+    lobby_code = data["lobby_code"]
+    if redirect_foreign_lobby(client, lobby_code):
+        return
+
+    client.emit("validate_lobby_response", {"valid": lobby_code in lobby_registry})
+
+
+# Socket.IO event name -> handler, registered by both servers
+EVENT_HANDLERS = {
+    "connect": handle_connect,
+    "disconnect": handle_disconnect,
+    "join_room": handle_join_room,
+    "leave_room": handle_leave_room,
+    "start_game": handle_start_game,
+    "submit_answer": handle_submit_answer,
+    "request_next_question": handle_next_question,
+    "validate_lobby": handle_validate_lobby,
+}
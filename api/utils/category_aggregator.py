@@ -1,43 +1,131 @@
-"""Utility module for aggregating trivia categories from Open Trivia Database API and MongoDB."""
+"""Utility module for aggregating trivia categories from registered category sources."""
 
 import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import requests
 from pymongo import MongoClient
 from dotenv import load_dotenv
+from api.utils.question_bank import fetch_question_bank_categories
 
 load_dotenv()
 CONNECTION_STRING = os.getenv("MONGO_CONNECTION_STRING")
 
+OPENTDB_CATEGORY_URL = "https://opentdb.com/api_category.php"
+
+# Seconds a source's category listing is served from cache before it is refetched
+CATEGORY_CACHE_TTL = 600
+
+# Registered category sources, queried in registration order when merging results
+_category_sources = {}
+
+# Last successful listing of every source: name -> (fetched_at, categories)
+_category_cache = {}
+_cache_lock = threading.Lock()
+
+_source_executor = ThreadPoolExecutor(
+    max_workers=8, thread_name_prefix="category-source"
+)
+
+
+def register_category_source(name, fetcher, timeout=5):
+    """
+    Register a category source to be queried by get_categories.
+
+    Args:
+        name (str): Unique name of the source.
+        fetcher (callable): Function returning a dict mapping category names to the
+            value get_triviaqa dispatches on (an OpenTDB ID or a source tag).
+        timeout (float, optional): Seconds to wait for the source. Defaults to 5.
+    """
+    _category_sources[name] = {"fetch": fetcher, "timeout": timeout}
+    with _cache_lock:
+        _category_cache.pop(name, None)
+
+
+def unregister_category_source(name):
+    """Remove a category source and its cached listing."""
+    _category_sources.pop(name, None)
+    with _cache_lock:
+        _category_cache.pop(name, None)
+
+
+def fetch_opentdb_categories():
+    """Fetch the category listing of the Open Trivia Database API."""
+    response = requests.get(OPENTDB_CATEGORY_URL, timeout=5)
+    response.raise_for_status()
+    api_data = response.json()
+    return {
+        category["name"]: category["id"] for category in api_data["trivia_categories"]
+    }
+
+
+def fetch_mongodb_categories():
+    """List the collections of the trivia-qa MongoDB database."""
+    client = MongoClient(CONNECTION_STRING, serverSelectionTimeoutMS=5000)
+    collection_names = client["trivia-qa"].list_collection_names()
+    return {collection_name: "trivia-qa" for collection_name in collection_names}
+
+
+def _fetch_and_cache(name, fetcher):
+    """Run a source fetcher and cache its listing, even if the caller stopped waiting."""
+    categories = fetcher()
+    with _cache_lock:
+        _category_cache[name] = (time.monotonic(), categories)
+    return categories
+
+
+register_category_source("opentdb", fetch_opentdb_categories)
+register_category_source("trivia-qa", fetch_mongodb_categories)
+register_category_source("question-bank", fetch_question_bank_categories)
+
 
 def get_categories():
     """
-    Retrieve trivia categories from the Open Trivia Database API and MongoDB.
+    Retrieve trivia categories from all registered sources concurrently.
+
+    Every source whose cached listing is stale is queried in parallel and given its
+    own timeout. A source that is slow or failing contributes its last cached
+    listing, or nothing, so callers always receive the categories that are available.
 
     Returns:
-        dict: A dictionary mapping category names to their IDs or collection names.
+        dict: A dictionary mapping category names to their IDs or source tags.
     """
-    try:
-        # Fetch categories from Open Trivia Database API
-        api_url = "https://opentdb.com/api_category.php"
-        response = requests.get(api_url, timeout=5)
-        response.raise_for_status()
-        api_data = response.json()
-
-        # Connect to MongoDB and fetch collection names
-        client = MongoClient(CONNECTION_STRING)
-        db = client["trivia-qa"]
-        collection_names = db.list_collection_names()
-
-        # Aggregate categories from API and MongoDB
-        categories = {}
-        for category in api_data["trivia_categories"]:
-            categories[category["name"]] = category["id"]
-        for collection_name in collection_names:
-            categories[collection_name] = "trivia-qa"
-
-        return categories
-
-    except requests.exceptions.RequestException as error:
-        logging.warning("API Request Failed: %s", str(error))
-        raise
+    started = time.monotonic()
+    listings = {}
+    pending = {}
+
+    sources = dict(_category_sources)
+    with _cache_lock:
+        cache = dict(_category_cache)
+
+    for name, source in sources.items():
+        cached = cache.get(name)
+        if cached and started - cached[0] < CATEGORY_CACHE_TTL:
+            listings[name] = cached[1]
+        else:
+            pending[name] = _source_executor.submit(
+                _fetch_and_cache, name, source["fetch"]
+            )
+
+    for name, future in pending.items():
+        remaining = sources[name]["timeout"] - (time.monotonic() - started)
+        try:
+            listings[name] = future.result(timeout=max(remaining, 0))
+        except FutureTimeoutError:
+            logging.warning("Category source '%s' timed out", name)
+        except Exception as error:  # pylint: disable=broad-except
+            logging.warning("Category source '%s' failed: %s", name, str(error))
+
+        if name not in listings and name in cache:
+            logging.info("Serving stale categories for source '%s'", name)
+            listings[name] = cache[name][1]
+
+    # Aggregate categories in registration order so later sources win on collisions
+    categories = {}
+    for name in sources:
+        categories.update(listings.get(name, {}))
+
+    return categories
@@ -1,6 +1,101 @@
 """Utility module for retrieving and formatting trivia data from MongoDB."""
 
-def get_mongodb_data(client, topic, num_questions=5, difficulty="hard"):
+import threading
+import time
+from api.utils.seen_questions import seen_questions
+
+# Seconds the list of collections in a database is trusted before it is refetched
+COLLECTION_CATALOG_TTL = 300
+
+# Seconds a forced relisting waits after the previous listing, so requests for
+# unknown topics cannot make every call list the collections again
+COLLECTION_CATALOG_REFRESH_INTERVAL = 30
+
+OPTION_LETTERS = ["A", "B", "C", "D"]
+
+# Cached collection names per database: db name -> (fetched_at, names)
+_collection_catalogs = {}
+_catalog_lock = threading.Lock()
+
+
+def get_collection_catalog(db, refresh=False):
+    """
+    Return the collection names of a database, cached for COLLECTION_CATALOG_TTL.
+
+    Args:
+        db (pymongo.database.Database): The database to list.
+        refresh (bool, optional): Relist unless the cached listing is younger than
+            COLLECTION_CATALOG_REFRESH_INTERVAL. Defaults to False.
+
+    Returns:
+        frozenset: The names of the collections in the database.
+    """
+    with _catalog_lock:
+        cached = _collection_catalogs.get(db.name)
+        age = time.monotonic() - cached[0] if cached else None
+        if (
+            cached is None
+            or age > COLLECTION_CATALOG_TTL
+            or (refresh and age > COLLECTION_CATALOG_REFRESH_INTERVAL)
+        ):
+            cached = (time.monotonic(), frozenset(db.list_collection_names()))
+            _collection_catalogs[db.name] = cached
+        return cached[1]
+
+
+def build_question_pipeline(num_questions, difficulty):
+    """
+    Build the aggregation pipeline that samples and formats questions server-side.
+
+    Documents without a difficulty field match every difficulty. The option
+    letters and correct letter are computed by the pipeline, so only the fields
+    of the formatted question travel over the wire.
+
+    Args:
+        num_questions (int): Number of questions to sample.
+        difficulty (str): Difficulty level to match.
+
+    Returns:
+        list: The aggregation pipeline stages.
+    """
+    option_count = {"$min": [{"$size": "$options"}, len(OPTION_LETTERS)]}
+    return [
+        {"$match": {"difficulty": {"$in": [difficulty, None]}}},
+        {"$sample": {"size": int(num_questions)}},
+        {
+            "$project": {
+                "_id": 0,
+                "question": 1,
+                "options": {
+                    "$map": {
+                        "input": {"$range": [0, option_count]},
+                        "as": "i",
+                        "in": {
+                            "$concat": [
+                                {"$arrayElemAt": [OPTION_LETTERS, "$$i"]},
+                                ") ",
+                                # Options stored as numbers would fail $concat
+                                {"$toString": {"$arrayElemAt": ["$options", "$$i"]}},
+                            ]
+                        },
+                    }
+                },
+                # An answer missing from the options maps to index -1, i.e. "D"
+                "correct_answer": {
+                    "$arrayElemAt": [
+                        OPTION_LETTERS,
+                        {"$indexOfArray": ["$options", "$correct_answer"]},
+                    ]
+                },
+                "difficulty": {"$ifNull": ["$difficulty", difficulty]},
+            }
+        },
+    ]
+
+
+def get_mongodb_data(
+    client, topic, num_questions=5, difficulty="hard", session_id=None
+):
     """
     Retrieve and format trivia questions from a MongoDB collection.
 
@@ -9,6 +104,8 @@ def get_mongodb_data(client, topic, num_questions=5, difficulty="hard"):
         topic (str): The topic or collection name to fetch questions from.
         num_questions (int, optional): Number of questions to retrieve. Defaults to 5.
         difficulty (str, optional): Difficulty level of the questions. Defaults to "hard".
+        session_id (str, optional): Client session whose seen questions are avoided by
+            sampling twice as many questions and preferring unseen ones.
 
     Returns:
         dict: A dictionary containing formatted questions, or None if the collection doesn't exist.
@@ -16,43 +113,30 @@ def get_mongodb_data(client, topic, num_questions=5, difficulty="hard"):
     # Access the database (the database name is 'trivia-qa' as per the screenshot)
     db = client["trivia-qa"]
 
-    # Access the collection dynamically using 'topic'
-    if topic not in db.list_collection_names():  # Check if the collection exists
+    # Check the collection exists, relisting once in case it was created recently
+    if topic not in get_collection_catalog(db) and topic not in get_collection_catalog(
+        db, refresh=True
+    ):
         return None
 
     collection = db[topic]
-
-    # Use $sample to fetch `num_questions` random documents
+    sample_size = int(num_questions) * 2 if session_id else int(num_questions)
     random_documents = collection.aggregate(
-        [{"$sample": {"size": int(num_questions)}}]
+        build_question_pipeline(sample_size, difficulty)
     )
+    if session_id:
+        random_documents, _ = seen_questions.pick(
+            session_id, list(random_documents), int(num_questions)
+        )
 
-    # Convert the cursor to a list and transform documents into the desired format
     formatted_questions = {"questions": []}
     for idx, doc in enumerate(random_documents, start=1):
-        options = [
-            f"A) {doc['options'][0]}",
-            f"B) {doc['options'][1]}",
-            f"C) {doc['options'][2]}",
-            f"D) {doc['options'][3]}",
-        ]
-
-        correct_answer = (
-            "A"
-            if doc["correct_answer"] == doc["options"][0]
-            else (
-                "B"
-                if doc["correct_answer"] == doc["options"][1]
-                else "C" if doc["correct_answer"] == doc["options"][2] else "D"
-            )
-        )
-
         formatted_question = {
             "index": idx,
             "question": doc["question"],
-            "options": options,
-            "correct_answer": correct_answer,
-            "difficulty": difficulty,  # Use the provided difficulty parameter
+            "options": doc["options"],
+            "correct_answer": doc["correct_answer"],
+            "difficulty": doc.get("difficulty", difficulty),
             "image": False,  # Assuming no images are present
         }
         formatted_questions["questions"].append(formatted_question)
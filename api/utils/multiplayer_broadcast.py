@@ -1,75 +1,297 @@
 """Utility functions for multiplayer broadcast functionality."""
 
 import logging
+import threading
+import time
+from api.utils.multiplayer_emitter import event_emitter
+from api.utils.multiplayer_lobby import is_large_room, lobby_registry
+from api.utils.multiplayer_models import serialize_player
+from api.utils.multiplayer_timer import TimerWheel
+from api.utils.multiplayer_store import retry_on_conflict
+
+# Seconds lobby_update changes are collected before they are sent together
+LOBBY_UPDATE_INTERVAL = 0.075
+
+# Seconds lobby_update changes of large rooms, e.g. answer progress, are collected
+LARGE_ROOM_UPDATE_INTERVAL = 0.5
+
+# Players listed in the lobby snapshots of large rooms
+LARGE_ROOM_SNAPSHOT_PLAYERS = 50
+
+
+def public_player(player):
+    """Return the fields of a player that are shared with clients in lobby updates."""
+    return serialize_player(player)
+
+
+def lobby_snapshot(lobby):
+    """
+    Build a full lobby_update payload at the lobby's current version.
+
+    Clients replace their lobby state with a snapshot, which is how they
+    recover after missing a delta. The caller must hold the lobby lock.
+    """
+    snapshot = {
+        "lobby_code": lobby.lobby_code,
+        "version": lobby.version,
+        "delta": False,
+        "game_state": lobby.game_state,
+        "players": [public_player(p) for p in lobby.players],
+        "settings": dict(lobby.settings),
+    }
+    if is_large_room(lobby):
+        # Large rooms only list their first players, which include the host
+        snapshot["players"] = snapshot["players"][:LARGE_ROOM_SNAPSHOT_PLAYERS]
+        snapshot["player_count"] = len(lobby.players)
+    return snapshot
 
 
 def broadcast_lobby_update(lobby_code, data):
     """Broadcast a lobby update to all clients in the room."""
-    from api.socket_server import socketio
-
-    if socketio:
-        socketio.emit("lobby_update", data, room=lobby_code)
-        logging.info(f"Broadcasting lobby update to room {lobby_code}")
-
-
-def broadcast_question(lobby_code, question, question_index):
-    """Broadcast a new question to all clients in the room."""
-    from api.socket_server import socketio
-
-    if socketio:
-        socketio.emit(
-            "new_question",
-            {
-                "question": question,
-                "question_index": question_index,
-                "time_limit": 15,  # Default time limit
-            },
-            room=lobby_code,
-        )
-        logging.info(f"Broadcasting question {question_index + 1} to room {lobby_code}")
-
-
-def broadcast_player_answered(lobby_code, player_id, player_name, question_index):
-    """Broadcast that a player has answered to all clients in the room."""
-    from api.socket_server import socketio
-
-    if socketio:
-        socketio.emit(
-            "player_answered",
-            {
-                "player_id": player_id,
-                "player_name": player_name,
-                "question_index": question_index,
-            },
-            room=lobby_code,
-        )
-        logging.info(
-            f"Broadcasting that {player_name} answered question {question_index + 1}"
+    event_emitter.emit("lobby_update", data, room=lobby_code)
+    logging.info(f"Broadcasting lobby update to room {lobby_code}")
+
+
+def broadcast_lobby_delta(
+    lobby, players=None, removed_players=None, immediate=False, **fields
+):
+    """
+    Queue what changed in a lobby for the next coalesced lobby_update.
+
+    Each flushed delta bumps the lobby version once. A client applies a delta
+    only if its version directly follows the last one it applied; on a gap it
+    fetches a snapshot instead. Every queued delta also bumps the state
+    version that game state requests are validated against. The caller must
+    hold the lobby lock.
+
+    Args:
+        lobby (Lobby): The lobby that changed
+        players (dict, optional): Changed fields by player id; new players carry
+            all of their public fields
+        removed_players (list, optional): Ids of players that left
+        immediate (bool, optional): Flush right away, e.g. for game state
+            changes. Defaults to False.
+        **fields: Changed top-level lobby fields, e.g. settings or game_state
+    """
+    lobby.state_version += 1
+    delta = dict(fields)
+    if is_large_room(lobby):
+        # Every client of a large room tracking every player is O(N²) traffic
+        if players or removed_players:
+            delta["player_count"] = len(lobby.players)
+    else:
+        if players:
+            delta["players"] = players
+        if removed_players:
+            delta["removed_players"] = removed_players
+    lobby_updates.add(lobby, delta, immediate)
+
+
+def broadcast_answer_progress(lobby, question_index):
+    """
+    Queue how many players answered the open question of a large room.
+
+    The count is sent with the coalesced lobby_update instead of a
+    player_answered event per answer. The caller must hold the lobby lock.
+    """
+    broadcast_lobby_delta(
+        lobby,
+        answer_progress={
+            "question_index": question_index,
+            "answered": len(lobby.answered.get(question_index, ())),
+            "total": len(lobby.players),
+        },
+    )
+
+
+def merge_lobby_delta(pending, delta):
+    """Merge a lobby delta into the pending delta of the same lobby."""
+    for key, value in delta.items():
+        if key == "players":
+            players = pending.setdefault("players", {})
+            for player_id, changes in value.items():
+                players.setdefault(player_id, {}).update(changes)
+        elif key == "removed_players":
+            for player_id in value:
+                pending.get("players", {}).pop(player_id, None)
+                pending.setdefault("removed_players", []).append(player_id)
+        elif key == "settings":
+            pending.setdefault("settings", {}).update(value)
+        else:
+            pending[key] = value
+
+
+class LobbyUpdateCoalescer:
+    """
+    Merges lobby_update deltas per lobby and flushes them at most once per interval.
+
+    A change in a quiet lobby is sent right away; changes arriving within
+    `interval` of the last flush are merged and sent together when the interval
+    ends, so the number of lobby_update events per lobby stays bounded however
+    fast clients send. Large rooms use `large_room_interval`, as each of their
+    events goes to many more clients. Events such as new_question bypass the
+    coalescer.
+
+    Lock order is lobby lock before the coalescer lock.
+    """
+
+    def __init__(
+        self,
+        interval=LOBBY_UPDATE_INTERVAL,
+        large_room_interval=LARGE_ROOM_UPDATE_INTERVAL,
+    ):
+        self.interval = interval
+        self.large_room_interval = large_room_interval
+        self._pending = {}  # lobby_code -> merged delta
+        self._last_flush = {}  # lobby_code -> monotonic time of the last flush
+        self._lock = threading.Lock()
+        self._timer = TimerWheel(tick=0.01, workers=2)
+
+    def add(self, lobby, delta, immediate=False):
+        """Merge a delta into the lobby's pending update and flush when due."""
+        lobby_code = lobby.lobby_code
+        interval = self.large_room_interval if is_large_room(lobby) else self.interval
+        with self._lock:
+            merge_lobby_delta(self._pending.setdefault(lobby_code, {}), delta)
+            wait = (
+                self._last_flush.get(lobby_code, float("-inf"))
+                + interval
+                - time.monotonic()
+            )
+            if not immediate and wait > 0:
+                if not self._timer.pending(lobby_code):
+                    self._timer.schedule(lobby_code, wait, self.flush, lobby_code)
+                return
+            self._timer.cancel(lobby_code)
+        self._flush_locked(lobby)
+
+    @retry_on_conflict
+    def flush(self, lobby_code):
+        """Timer callback sending the pending update of a lobby."""
+        with lobby_registry.locked(lobby_code) as lobby:
+            if lobby is None:
+                self.discard(lobby_code)
+            else:
+                self._flush_locked(lobby)
+
+    def _flush_locked(self, lobby):
+        """Send the pending update of a lobby whose lock is held."""
+        lobby_code = lobby.lobby_code
+        with self._lock:
+            delta = self._pending.pop(lobby_code, None)
+            if delta is None:
+                return
+            self._last_flush[lobby_code] = time.monotonic()
+
+        if not delta.get("players"):
+            delta.pop("players", None)
+        lobby.version += 1
+        broadcast_lobby_update(
+            lobby_code,
+            dict(delta, lobby_code=lobby_code, version=lobby.version, delta=True),
         )
 
+    def discard(self, lobby_code):
+        """Forget the pending update of a deleted lobby."""
+        with self._lock:
+            self._pending.pop(lobby_code, None)
+            self._last_flush.pop(lobby_code, None)
+        self._timer.cancel(lobby_code)
+
+
+lobby_updates = LobbyUpdateCoalescer()
+lobby_registry.add_delete_listener(lobby_updates.discard)
+
+
+def broadcast_question(lobby_code, question, question_index, time_limit, deadline):
+    """Broadcast a new question and its server-side deadline to all clients in the room."""
+    event_emitter.emit(
+        "new_question",
+        {
+            "question": question,
+            "question_index": question_index,
+            "time_limit": time_limit,
+            "deadline": deadline,
+        },
+        room=lobby_code,
+    )
+    logging.info(f"Broadcasting question {question_index + 1} to room {lobby_code}")
+
+
+def broadcast_game_started(lobby_code):
+    """Broadcast that the questions are ready and the game has started."""
+    event_emitter.emit("game_started", {"status": "success"}, room=lobby_code)
+    logging.info(f"Broadcasting game started to room {lobby_code}")
+
+
+def broadcast_game_start_failed(lobby_code, error):
+    """Broadcast that question generation failed and the lobby is open again."""
+    event_emitter.emit("game_start_failed", {"error": error}, room=lobby_code)
+    logging.info(f"Broadcasting game start failure to room {lobby_code}")
+
+
+def broadcast_lobby_redirect(lobby_code, node_url):
+    """Broadcast that a lobby moved to another node, which clients reconnect to."""
+    event_emitter.emit(
+        "lobby_redirect", {"lobby_code": lobby_code, "node": node_url}, room=lobby_code
+    )
+    logging.info(f"Broadcasting move of lobby {lobby_code} to {node_url}")
+
+
+def broadcast_player_answered(
+    lobby_code, player_id, player_name, question_index, is_correct, score
+):
+    """Broadcast that a player has answered, and their score, to the room."""
+    event_emitter.emit(
+        "player_answered",
+        {
+            "player_id": player_id,
+            "player_name": player_name,
+            "question_index": question_index,
+            "is_correct": is_correct,
+            "score": score,
+        },
+        room=lobby_code,
+    )
+    logging.info(
+        f"Broadcasting that {player_name} answered question {question_index + 1}"
+    )
+
 
-def broadcast_all_answers_in(lobby_code):
-    """Broadcast that all players have answered to all clients in the room."""
-    from api.socket_server import socketio
+def broadcast_all_answers_in(lobby_code, question_index, reveal_delay):
+    """Broadcast that a question is closed and when the next one follows."""
+    event_emitter.emit(
+        "all_answers_in",
+        {"question_index": question_index, "reveal_delay": reveal_delay},
+        room=lobby_code,
+    )
+    logging.info(f"Broadcasting all answers received for room {lobby_code}")
 
-    if socketio:
-        socketio.emit("all_answers_in", {}, room=lobby_code)
-        logging.info(f"Broadcasting all answers received for room {lobby_code}")
 
+def broadcast_scoreboard(lobby_code, scoreboard_data, **summary):
+    """
+    Broadcast scoreboard data to all clients in the room.
 
-def broadcast_scoreboard(lobby_code, scoreboard_data):
-    """Broadcast scoreboard data to all clients in the room."""
-    from api.socket_server import socketio
+    Args:
+        lobby_code (str): The code of the lobby
+        scoreboard_data (list): The scoreboard entries, of the top players in
+            large rooms
+        **summary: Extra fields of large-room scoreboards, e.g. player_count
+    """
+    event_emitter.emit(
+        "scoreboard", dict(summary, players=scoreboard_data), room=lobby_code
+    )
+    logging.info(f"Broadcasting scoreboard to room {lobby_code}")
 
-    if socketio:
-        socketio.emit("scoreboard", {"players": scoreboard_data}, room=lobby_code)
-        logging.info(f"Broadcasting scoreboard to room {lobby_code}")
 
+def broadcast_game_over(lobby_code, final_results, **summary):
+    """Broadcast game over and final results, of the top players in large rooms."""
+    event_emitter.emit(
+        "game_over", dict(summary, players=final_results), room=lobby_code
+    )
+    logging.info(f"Broadcasting game over to room {lobby_code}")
 
-def broadcast_game_over(lobby_code, final_results):
-    """Broadcast game over and final results to all clients in the room."""
-    from api.socket_server import socketio
 
-    if socketio:
-        socketio.emit("game_over", {"results": final_results}, room=lobby_code)
-        logging.info(f"Broadcasting game over to room {lobby_code}")
+def broadcast_player_rank(session_id, rank_data):
+    """Send a player of a large room their own scoreboard entry and rank."""
+    event_emitter.emit("player_rank", rank_data, room=session_id)
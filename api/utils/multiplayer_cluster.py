@@ -0,0 +1,284 @@
+"""Utility functions moving lobbies between the nodes of a cluster."""
+
+import hmac
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from api.utils.multiplayer_lobby import lobby_registry, lobby_lifecycle
+from api.utils.multiplayer_broadcast import broadcast_lobby_redirect
+from api.utils.multiplayer_engine import game_engine
+from api.utils.multiplayer_models import lobby_from_state, lobby_state
+from api.utils.multiplayer_shard import HashRing, lobby_router
+
+# Seconds to wait for another node to accept a lobby or answer a proxied request
+CLUSTER_REQUEST_TIMEOUT = 5
+
+# Header carrying the cluster secret on requests between nodes
+CLUSTER_SECRET_HEADER = "X-Cluster-Secret"
+
+# Header marking a request proxied by another node, which is never routed again
+CLUSTER_FORWARDED_HEADER = "X-Cluster-Forwarded"
+
+# Times a lobby that changed while it was sent to its new owner is sent again
+HANDOFF_ATTEMPTS = 3
+
+# Codes of the lobbies being handed to another node
+_moving_lobbies = set()
+_moving_lock = threading.Lock()
+
+# Codes of the lobbies handed over by another node whose timers wait until the
+# previous owner has let go of them
+_adopted_lobbies = set()
+_adopted_lock = threading.Lock()
+
+_handoff_executor = ThreadPoolExecutor(
+    max_workers=8, thread_name_prefix="lobby-handoff"
+)
+
+
+def cluster_headers():
+    """Return the headers of requests sent to other nodes."""
+    headers = {CLUSTER_FORWARDED_HEADER: lobby_router.node_url or "1"}
+    if lobby_router.secret:
+        headers[CLUSTER_SECRET_HEADER] = lobby_router.secret
+    return headers
+
+
+def is_cluster_request(headers):
+    """
+    Return whether a request may change the cluster.
+
+    With a cluster secret set, the request must carry it. Without one, cluster
+    requests are only accepted if cluster mode is explicitly enabled, so a
+    default deployment cannot be made to hand its lobbies to anyone.
+    """
+    if lobby_router.secret:
+        return hmac.compare_digest(
+            headers.get(CLUSTER_SECRET_HEADER, "").encode(),
+            lobby_router.secret.encode(),
+        )
+    return lobby_router.enabled
+
+
+def adopt_lobby(state):
+    """
+    Take over a lobby handed over by another node.
+
+    The lobby is stored without re-arming its timers, which waits for
+    `resume_adopted_lobby` once the previous owner has let go of it. Until
+    then, a copy sent again because the lobby changed during the hand-off
+    replaces this one.
+
+    Args:
+        state (dict): The lobby's data, as returned by lobby_state
+
+    Returns:
+        tuple: A tuple containing success message and status code, or error message and status code
+    """
+    lobby = lobby_from_state(state)
+    lobby_code = lobby.lobby_code
+    with _adopted_lock:
+        if lobby_code in _adopted_lobbies:
+            with lobby_registry.locked(lobby_code) as stale:
+                if stale is not None:
+                    lobby_registry.delete(lobby_code)
+        if not lobby_registry.adopt(lobby):
+            return {"error": "Lobby code already in use"}, 409
+        _adopted_lobbies.add(lobby_code)
+
+    lobby_lifecycle.track(lobby_code, lobby.last_activity)
+    logging.info(f"Adopted lobby {lobby_code} from another node")
+    return {"success": True, "lobby_code": lobby_code}, 201
+
+
+def resume_adopted_lobby(lobby_code):
+    """
+    Re-arm the timers of an adopted lobby once its previous owner let go of it.
+
+    Args:
+        lobby_code (str): The code of the lobby
+
+    Returns:
+        tuple: A tuple containing success message and status code, or error message and status code
+    """
+    with _adopted_lock:
+        if lobby_code not in _adopted_lobbies:
+            return {"error": "Lobby is not being handed over"}, 404
+        _adopted_lobbies.discard(lobby_code)
+
+    with lobby_registry.locked(lobby_code) as lobby:
+        if lobby is not None:
+            game_engine.resume(lobby)
+    return {"success": True}, 200
+
+
+def _send_lobby(lobby_code, node_url, state):
+    """Send a lobby's state to another node and return whether it was accepted."""
+    try:
+        response = requests.post(
+            f"{node_url}/api/multiplayer/cluster/lobbies",
+            json={"lobby": state},
+            headers=cluster_headers(),
+            timeout=CLUSTER_REQUEST_TIMEOUT,
+        )
+    except requests.RequestException as e:
+        logging.error(f"Could not hand lobby {lobby_code} to {node_url}: {str(e)}")
+        return False
+
+    if response.status_code != 201:
+        logging.error(f"Node {node_url} refused lobby {lobby_code}: {response.text}")
+        return False
+    return True
+
+
+def _resume_lobby(lobby_code, node_url):
+    """Ask the new owner of a lobby to re-arm its timers."""
+    try:
+        response = requests.post(
+            f"{node_url}/api/multiplayer/cluster/lobbies/{lobby_code}/resume",
+            headers=cluster_headers(),
+            timeout=CLUSTER_REQUEST_TIMEOUT,
+        )
+    except requests.RequestException as e:
+        logging.error(f"Could not resume lobby {lobby_code} on {node_url}: {str(e)}")
+        return
+    if response.status_code != 200:
+        logging.error(f"Node {node_url} did not resume lobby {lobby_code}")
+
+
+def hand_off_lobby(lobby_code, node_url):
+    """
+    Move a lobby to the node that now owns it.
+
+    The lobby's state is copied under its lock and sent without holding it, so
+    the lobby's players never wait on the other node, which stores the copy
+    without running it. If the lobby's state version did not change in the
+    meantime, the lobby is deleted here and its ownership passes to the new
+    node, which is then told to re-arm the lobby's timers; otherwise the newer
+    state is sent again and replaces the copy. The lobby stays on this node if
+    the other node cannot be reached. Clients in the lobby's room are told to
+    reconnect to the new node.
+
+    Args:
+        lobby_code (str): The code of the lobby
+        node_url (str): The base URL of the node taking over the lobby
+
+    Returns:
+        bool: Whether the lobby was moved
+    """
+    for _ in range(HANDOFF_ATTEMPTS):
+        with lobby_registry.locked(lobby_code) as lobby:
+            if lobby is None:
+                return False
+            state = lobby_state(lobby)
+
+        if not _send_lobby(lobby_code, node_url, state):
+            return False
+
+        with lobby_registry.locked(lobby_code) as lobby:
+            if lobby is None:
+                return False
+            if lobby.state_version == state["state_version"]:
+                # The new node has the latest state, so this copy stops changing
+                with _moving_lock:
+                    lobby_registry.delete(lobby_code)
+                    lobby_router.release(lobby_code)
+                broadcast_lobby_redirect(lobby_code, node_url)
+                break
+    else:
+        logging.error(f"Lobby {lobby_code} kept changing, not handed to {node_url}")
+        return False
+
+    _resume_lobby(lobby_code, node_url)
+    logging.info(f"Handed lobby {lobby_code} to {node_url}")
+    return True
+
+
+def _hand_off_moving_lobby(lobby_code, node_url):
+    """Hand off a lobby marked as moving, and unmark it once done."""
+    try:
+        hand_off_lobby(lobby_code, node_url)
+    except Exception as e:  # pylint: disable=broad-except
+        logging.error(f"Hand-off of lobby {lobby_code} failed: {str(e)}")
+    finally:
+        with _moving_lock:
+            _moving_lobbies.discard(lobby_code)
+
+
+def moving_lobbies():
+    """Return the number of lobbies being handed to another node."""
+    with _moving_lock:
+        return len(_moving_lobbies)
+
+
+def update_cluster_nodes(nodes):
+    """
+    Replace the node list and hand off the lobbies now owned by other nodes.
+
+    The lobbies are marked as moving and handed off concurrently in the
+    background; `moving_lobbies` drops to 0 once every hand-off is done. This
+    node keeps owning each of them until its hand-off succeeds, so requests are
+    never routed to a node that does not have the lobby yet. A node leaving the
+    cluster is sent the node list without itself, which moves all of its
+    lobbies to the remaining nodes.
+
+    Args:
+        nodes (list): The base URLs of every node of the cluster
+
+    Returns:
+        tuple: A tuple containing the node list and the number of lobbies to move, and status code
+    """
+    nodes = [node.rstrip("/") for node in nodes]
+    ring = HashRing(nodes)
+    held = []
+    moves = []
+    with _moving_lock:
+        for lobby_code in lobby_registry.codes():
+            owner = ring.node_for(lobby_code)
+            if owner in (None, lobby_router.node_url):
+                continue
+            held.append(lobby_code)
+            # A lobby already moving is left to the hand-off under way
+            if lobby_code not in _moving_lobbies:
+                _moving_lobbies.add(lobby_code)
+                moves.append((lobby_code, owner))
+        lobby_router.set_nodes(nodes, held)
+
+    for lobby_code, owner in moves:
+        _handoff_executor.submit(_hand_off_moving_lobby, lobby_code, owner)
+
+    logging.info(
+        f"Cluster nodes set to {lobby_router.nodes}, moving {len(moves)} lobbies"
+    )
+    return {"nodes": lobby_router.nodes, "moving_lobbies": len(moves)}, 202
+
+
+def proxy_request(method, url, body, content_type):
+    """
+    Send a request on to the node owning its lobby.
+
+    Args:
+        method (str): The HTTP method
+        url (str): The URL on the owning node
+        body (bytes): The request body
+        content_type (str): The content type of the body
+
+    Returns:
+        tuple: The response body, status code and content type
+    """
+    headers = cluster_headers()
+    if content_type:
+        headers["Content-Type"] = content_type
+    try:
+        response = requests.request(
+            method, url, data=body, headers=headers, timeout=CLUSTER_REQUEST_TIMEOUT
+        )
+    except requests.RequestException as e:
+        logging.error(f"Could not proxy request to {url}: {str(e)}")
+        return b'{"error": "Lobby server unavailable"}', 502, "application/json"
+    return (
+        response.content,
+        response.status_code,
+        response.headers.get("Content-Type", "application/json"),
+    )
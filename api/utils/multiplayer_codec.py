@@ -0,0 +1,321 @@
+"""Utility module encoding Socket.IO packets as JSON or msgpack per client."""
+
+import asyncio
+import logging
+from urllib.parse import parse_qs
+import msgpack
+import socketio
+from engineio import packet as eio_packet
+from socketio import packet
+
+# Query parameter and value a client connects with to be sent msgpack packets
+CODEC_PARAM = "codec"
+MSGPACK_CODEC = "msgpack"
+
+
+def schema(*fields):
+    """
+    Build the compact schema of a record from its field names.
+
+    Each field is sent under its index as key. A field given as a
+    (name, schema) pair holds a record, or a list of records, of that schema.
+
+    Returns:
+        dict: (key, nested schema) by field name
+    """
+    return {
+        (field if isinstance(field, str) else field[0]): (
+            index,
+            None if isinstance(field, str) else field[1],
+        )
+        for index, field in enumerate(fields)
+    }
+
+
+QUESTION_SCHEMA = schema(
+    "index", "question", "options", "correct_answer", "difficulty", "image"
+)
+
+SCOREBOARD_ENTRY_SCHEMA = schema(
+    "id",
+    "name",
+    "avatar",
+    "isHost",
+    "score",
+    "totalCorrect",
+    "answer",
+    "isCorrect",
+    "answerScore",
+    "rank",
+)
+
+# Schemas of the hot events whose fields msgpack clients get under numeric keys.
+# Fields are only ever appended, so the keys of existing fields stay stable.
+COMPACT_EVENTS = {
+    "player_answered": schema(
+        "player_id", "player_name", "question_index", "is_correct", "score"
+    ),
+    "scoreboard": schema(
+        ("players", SCOREBOARD_ENTRY_SCHEMA),
+        "question_index",
+        "player_count",
+        ("sample", SCOREBOARD_ENTRY_SCHEMA),
+        "answer_counts",
+    ),
+    "new_question": schema(
+        ("question", QUESTION_SCHEMA), "question_index", "time_limit", "deadline"
+    ),
+}
+
+
+def compact(data, fields):
+    """Replace the field names of a record, or a list of records, by their keys."""
+    if isinstance(data, list):
+        return [compact(item, fields) for item in data]
+    if not isinstance(data, dict):
+        return data
+    result = {}
+    for name, value in data.items():
+        if name not in fields:
+            # Fields without a key yet keep their name
+            result[name] = value
+            continue
+        key, nested = fields[name]
+        result[key] = compact(value, nested) if nested else value
+    return result
+
+
+def expand(data, fields):
+    """Restore the field names of a compacted record, as msgpack clients do."""
+    if isinstance(data, list):
+        return [expand(item, fields) for item in data]
+    if not isinstance(data, dict):
+        return data
+    names = {key: (name, nested) for name, (key, nested) in fields.items()}
+    result = {}
+    for key, value in data.items():
+        name, nested = names.get(key, (key, None))
+        result[name] = expand(value, nested) if nested else value
+    return result
+
+
+def compact_event(event, args):
+    """Return the arguments of an event, compacted if it is a hot event."""
+    fields = COMPACT_EVENTS.get(event)
+    if fields is None:
+        return args
+    return [compact(arg, fields) for arg in args]
+
+
+class CodecPacket(packet.Packet):
+    """
+    Socket.IO packet that is encoded as JSON text or as msgpack.
+
+    encode() produces the default JSON encoding, encode_msgpack() the msgpack
+    one, with hot events compacted. Received packets are decoded by frame type:
+    binary frames are msgpack and text frames JSON, so JSON and msgpack clients
+    share one server.
+    """
+
+    def encode_msgpack(self):
+        """Encode the packet for a msgpack client."""
+        encoded = self._to_dict()
+        if self.packet_type == packet.EVENT and self.data:
+            event, *args = self.data
+            encoded["data"] = [event] + compact_event(event, args)
+        return msgpack.packb(encoded)
+
+    def decode(self, encoded_packet):
+        """Decode a received packet, as msgpack if it came in a binary frame."""
+        if not isinstance(encoded_packet, (bytes, bytearray)):
+            return super().decode(encoded_packet)
+        decoded = msgpack.unpackb(encoded_packet)
+        self.packet_type = decoded["type"]
+        self.data = decoded.get("data")
+        self.id = decoded.get("id")
+        self.namespace = decoded["nsp"]
+        return 0
+
+
+def wants_msgpack(environ):
+    """Return whether a client connected asking for msgpack packets."""
+    query = parse_qs(environ.get("QUERY_STRING", ""))
+    return query.get(CODEC_PARAM, [""])[0] == MSGPACK_CODEC
+
+
+def event_packet(server, event, data, namespace):
+    """Build the event packet of an emit, expanding tuples as Socket.IO does."""
+    if isinstance(data, tuple):
+        data = list(data)
+    elif data is not None:
+        data = [data]
+    else:
+        data = []
+    return server.packet_class(packet.EVENT, namespace=namespace, data=[event] + data)
+
+
+def eio_packets(pkt, binary):
+    """Return the Engine.IO packets carrying a packet in a codec."""
+    if binary:
+        encoded = [pkt.encode_msgpack()]
+    else:
+        encoded = pkt.encode()
+        if not isinstance(encoded, list):
+            encoded = [encoded]
+    return [eio_packet.Packet(eio_packet.MESSAGE, p) for p in encoded]
+
+
+class CodecManager(socketio.Manager):
+    """
+    Client manager sending each client packets in the codec it connected with.
+
+    Clients connecting with ?codec=msgpack get every packet as msgpack in a
+    binary frame, with the fields of hot events under numeric keys; all others
+    get JSON text. A broadcast is encoded once per codec among its recipients.
+    The server must use CodecPacket as its serializer.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.msgpack_clients = set()  # Engine.IO session ids
+
+    def initialize(self):
+        """Send the server's own packets, e.g. connect acks, in each client's codec."""
+        super().initialize()
+        send_json = self.server._send_packet
+
+        def send_packet(eio_sid, pkt):
+            if eio_sid in self.msgpack_clients:
+                self.server.eio.send(eio_sid, pkt.encode_msgpack())
+            else:
+                send_json(eio_sid, pkt)
+
+        self.server._send_packet = send_packet
+
+    def connect(self, eio_sid, namespace):
+        """Register a client connection and the codec it asked for."""
+        if wants_msgpack(self.server.environ.get(eio_sid, {})):
+            self.msgpack_clients.add(eio_sid)
+        return super().connect(eio_sid, namespace)
+
+    def disconnect(self, sid, namespace, **kwargs):
+        """Register a client disconnection."""
+        self.msgpack_clients.discard(self.eio_sid_from_sid(sid, namespace))
+        return super().disconnect(sid, namespace, **kwargs)
+
+    def emit(
+        self, event, data, namespace, room=None, skip_sid=None, callback=None, **kwargs
+    ):
+        """Emit an event, encoding it once per codec of its recipients."""
+        if callback or not self.msgpack_clients or namespace not in self.rooms:
+            return super().emit(
+                event, data, namespace, room, skip_sid, callback, **kwargs
+            )
+        if not isinstance(skip_sid, list):
+            skip_sid = [skip_sid]
+        pkt = event_packet(self.server, event, data, namespace)
+        encoded = {}
+        for sid, eio_sid in self.get_participants(namespace, room):
+            if sid in skip_sid:
+                continue
+            binary = eio_sid in self.msgpack_clients
+            if binary not in encoded:
+                encoded[binary] = eio_packets(pkt, binary)
+            for eio_pkt in encoded[binary]:
+                self.server._send_eio_packet(eio_sid, eio_pkt)
+        return None
+
+
+class AsyncCodecManager(socketio.AsyncManager):
+    """CodecManager of the asyncio server."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.msgpack_clients = set()  # Engine.IO session ids
+
+    def initialize(self):
+        """Send the server's own packets, e.g. connect acks, in each client's codec."""
+        super().initialize()
+        send_json = self.server._send_packet
+
+        async def send_packet(eio_sid, pkt):
+            if eio_sid in self.msgpack_clients:
+                await self.server.eio.send(eio_sid, pkt.encode_msgpack())
+            else:
+                await send_json(eio_sid, pkt)
+
+        self.server._send_packet = send_packet
+
+    async def connect(self, eio_sid, namespace):
+        """Register a client connection and the codec it asked for."""
+        if wants_msgpack(self.server.environ.get(eio_sid, {})):
+            self.msgpack_clients.add(eio_sid)
+        return await super().connect(eio_sid, namespace)
+
+    async def disconnect(self, sid, namespace, **kwargs):
+        """Register a client disconnection."""
+        self.msgpack_clients.discard(self.eio_sid_from_sid(sid, namespace))
+        return await super().disconnect(sid, namespace, **kwargs)
+
+    async def emit(
+        self, event, data, namespace, room=None, skip_sid=None, callback=None, **kwargs
+    ):
+        """Emit an event, encoding it once per codec of its recipients."""
+        if callback or not self.msgpack_clients or namespace not in self.rooms:
+            return await super().emit(
+                event, data, namespace, room, skip_sid, callback, **kwargs
+            )
+        if not isinstance(skip_sid, list):
+            skip_sid = [skip_sid]
+        pkt = event_packet(self.server, event, data, namespace)
+        encoded = {}
+        tasks = []
+        for sid, eio_sid in self.get_participants(namespace, room):
+            if sid in skip_sid:
+                continue
+            binary = eio_sid in self.msgpack_clients
+            if binary not in encoded:
+                encoded[binary] = eio_packets(pkt, binary)
+            tasks.extend(
+                asyncio.create_task(self.server._send_eio_packet(eio_sid, eio_pkt))
+                for eio_pkt in encoded[binary]
+            )
+        if tasks:
+            await asyncio.wait(tasks)
+        return None
+
+
+# Listed after the Redis manager, the codec manager delivers the events each
+# node receives from the message queue to its own clients
+class CodecRedisManager(socketio.RedisManager, CodecManager):
+    """CodecManager sharing emits between servers through Redis."""
+
+
+class AsyncCodecRedisManager(socketio.AsyncRedisManager, AsyncCodecManager):
+    """AsyncCodecManager sharing emits between servers through Redis."""
+
+
+def codec_manager(message_queue=None, asyncio_mode=False):
+    """
+    Create the client manager negotiating codecs per client.
+
+    Args:
+        message_queue (str, optional): URL of the message queue shared by
+            several servers
+        asyncio_mode (bool, optional): Whether the manager serves the asyncio
+            server. Defaults to False.
+
+    Returns:
+        socketio.Manager: The manager, or None if the message queue is not
+            Redis, in which case every client gets JSON
+    """
+    if not message_queue:
+        return AsyncCodecManager() if asyncio_mode else CodecManager()
+    if message_queue.startswith(("redis://", "rediss://")):
+        if asyncio_mode:
+            return AsyncCodecRedisManager(message_queue)
+        return CodecRedisManager(message_queue)
+    logging.warning(
+        f"Message queue {message_queue} is not Redis, msgpack clients are not supported"
+    )
+    return None
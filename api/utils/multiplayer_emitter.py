@@ -0,0 +1,116 @@
+"""Utility module for emitting Socket.IO events after lobby state changes commit."""
+
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+
+# Events waiting to be written per emitter worker before producers wait
+EMIT_QUEUE_SIZE = 10000
+
+# Seconds a producer waits for room in a full emit queue before dropping the event
+EMIT_QUEUE_TIMEOUT = 1
+
+
+class EventEmitter:
+    """
+    Post-commit outbox that writes Socket.IO events from dedicated worker threads.
+
+    Events emitted inside a transaction are buffered on the calling thread and
+    only queued once the outermost transaction exits, i.e. after the lobby lock
+    is released; a transaction that raises drops its events. Events are sharded
+    by room over bounded queues, so one worker writes all events of a room in
+    order and a slow room never holds up state changes.
+    """
+
+    def __init__(self, workers=4, max_queued=EMIT_QUEUE_SIZE):
+        self._queues = [queue.Queue(maxsize=max_queued) for _ in range(workers)]
+        self._local = threading.local()
+        self._started = False
+        self._start_lock = threading.Lock()
+        self.dropped = 0
+
+    @contextmanager
+    def transaction(self):
+        """Buffer the events emitted in the block until the outermost block exits."""
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0:
+            self._local.events = []
+        self._local.depth = depth + 1
+        try:
+            yield
+        except BaseException:
+            if depth == 0:
+                logging.warning(
+                    f"Dropping {len(self._local.events)} events of a failed lobby update"
+                )
+                self._local.events = []
+            raise
+        finally:
+            self._local.depth = depth
+            if depth == 0:
+                events, self._local.events = self._local.events, []
+                for event in events:
+                    self._enqueue(*event)
+
+    def emit(self, event, data, room=None):
+        """Emit an event to a room once the current transaction, if any, commits."""
+        if getattr(self._local, "depth", 0):
+            self._local.events.append((event, data, room))
+        else:
+            self._enqueue(event, data, room)
+
+    def _enqueue(self, event, data, room):
+        """Hand an event to the worker that owns its room."""
+        from api.socket_server import socketio
+
+        if not socketio:
+            return
+
+        self._start()
+        try:
+            self._queues[hash(room) % len(self._queues)].put(
+                (event, data, room), timeout=EMIT_QUEUE_TIMEOUT
+            )
+        except queue.Full:
+            self.dropped += 1
+            logging.error(f"Emit queue full, dropping {event} for room {room}")
+
+    def _start(self):
+        """Start the worker threads on first use."""
+        if self._started:
+            return
+        with self._start_lock:
+            if self._started:
+                return
+            for index, events in enumerate(self._queues):
+                threading.Thread(
+                    target=self._work,
+                    args=(events,),
+                    name=f"socket-emitter-{index}",
+                    daemon=True,
+                ).start()
+            self._started = True
+
+    @staticmethod
+    def _work(events):
+        """Write queued events to their rooms."""
+        while True:
+            event, data, room = events.get()
+            try:
+                from api.socket_server import socketio
+
+                if socketio:
+                    socketio.emit(event, data, room=room)
+            except Exception as e:  # pylint: disable=broad-except
+                logging.error(f"Error emitting {event} to room {room}: {str(e)}")
+            finally:
+                events.task_done()
+
+    def join(self):
+        """Wait until every queued event has been written."""
+        for events in self._queues:
+            events.join()
+
+
+event_emitter = EventEmitter()
@@ -0,0 +1,604 @@
+"""Utility module for the multiplayer game state machine."""
+
+import logging
+import random
+import time
+from api.utils.multiplayer_lobby import (
+    lobby_registry,
+    GAME_STATE,
+    find_player,
+    is_large_room,
+)
+from api.utils.multiplayer_broadcast import (
+    broadcast_answer_progress,
+    broadcast_player_answered,
+    broadcast_player_rank,
+    broadcast_all_answers_in,
+    broadcast_scoreboard,
+    broadcast_game_over,
+    broadcast_game_started,
+    broadcast_game_start_failed,
+    broadcast_lobby_delta,
+    broadcast_question,
+)
+from api.utils.multiplayer_models import (
+    NO_CHOICE,
+    Answer,
+    AnswerOutcome,
+    choice_of,
+    is_correct_choice,
+    serialize_player,
+    serialize_results,
+)
+from api.utils.multiplayer_timer import question_timer
+from api.utils.multiplayer_store import retry_on_conflict
+
+# Seconds per question when the lobby settings do not specify timePerQuestion
+DEFAULT_TIME_PER_QUESTION = 15
+
+# Seconds the answers stay revealed before the next question when the lobby
+# settings do not specify revealDelay
+DEFAULT_REVEAL_DELAY = 3
+
+# Extra seconds past the deadline for answers still in flight from clients
+ANSWER_GRACE_PERIOD = 2
+
+# Points per remaining second of a correct answer, by lobby difficulty
+DIFFICULTY_MULTIPLIERS = {"easy": 0.8, "medium": 1, "hard": 1.5}
+
+# Top players on the scoreboards of large rooms, and random others shown with them
+LEADERBOARD_SIZE = 10
+SCOREBOARD_SAMPLE_SIZE = 20
+
+# Game state a lobby moves to for each (game state, action) pair; every other
+# action is rejected
+TRANSITIONS = {
+    (GAME_STATE["LOBBY"], "start"): GAME_STATE["GENERATING"],
+    (GAME_STATE["GENERATING"], "fail"): GAME_STATE["LOBBY"],
+    (GAME_STATE["GENERATING"], "begin"): GAME_STATE["QUESTION"],
+    (GAME_STATE["QUESTION"], "answer"): GAME_STATE["WAITING"],
+    (GAME_STATE["WAITING"], "answer"): GAME_STATE["WAITING"],
+    (GAME_STATE["QUESTION"], "close"): GAME_STATE["SCOREBOARD"],
+    (GAME_STATE["WAITING"], "close"): GAME_STATE["SCOREBOARD"],
+    (GAME_STATE["SCOREBOARD"], "next"): GAME_STATE["QUESTION"],
+    (GAME_STATE["SCOREBOARD"], "finish"): GAME_STATE["GAME_OVER"],
+}
+
+# Pending question deadlines and reveal delays die with their lobby
+lobby_registry.add_delete_listener(question_timer.cancel)
+
+
+def record_answer(lobby, player, question_index):
+    """Mark a player as having answered, or timed out on, a question."""
+    lobby.answered.setdefault(question_index, set()).add(player.id)
+
+
+def has_answered(lobby, player, question_index):
+    """Return whether a player has answered, or timed out on, a question."""
+    return player.id in lobby.answered.get(question_index, ())
+
+
+def all_players_answered(lobby, question_index):
+    """
+    Return whether every player of a lobby has answered a question.
+
+    Players who leave are removed from the answered set of the open question,
+    so its size counts the answers of the current players.
+    """
+    return len(lobby.answered.get(question_index, ())) >= len(lobby.players)
+
+
+def answer_score(lobby):
+    """Return the points for a correct answer given now to the open question."""
+    time_limit = lobby.settings.get("timePerQuestion", DEFAULT_TIME_PER_QUESTION)
+    remaining = min(time_limit, max(0, (lobby.question_deadline or 0) - time.time()))
+    multiplier = DIFFICULTY_MULTIPLIERS.get(lobby.settings.get("difficulty"), 1)
+    return round(int(remaining) * multiplier)
+
+
+def is_question_open(lobby, question_index):
+    """Return whether a question is the current one and still accepts answers."""
+    return lobby.current_question_idx == question_index and lobby.game_state in (
+        GAME_STATE["QUESTION"],
+        GAME_STATE["WAITING"],
+    )
+
+
+def player_answer(player, question_index):
+    """Return a player's answer to a question, or None."""
+    return next(
+        (a for a in reversed(player.answers) if a.question_index == question_index),
+        None,
+    )
+
+
+def scoreboard_entry(player, question, answer):
+    """Return the scoreboard entry of a player and their answer to a question."""
+    return {
+        "id": player.id,
+        "name": player.name,
+        "avatar": player.avatar,
+        "isHost": player.is_host,
+        "score": player.score,
+        "totalCorrect": player.correct_answers,
+        "answer": (
+            question["options"][answer.choice]
+            if answer and answer.choice != NO_CHOICE
+            else "Unanswered"
+        ),
+        "isCorrect": bool(answer) and answer.outcome == AnswerOutcome.CORRECT,
+        "answerScore": answer.score if answer else 0,
+    }
+
+
+def build_scoreboard(lobby, question_index):
+    """Build the scoreboard of a question from the players' answers and ranks."""
+    question = lobby.questions_list[question_index]
+    ranks = lobby.leaderboard.ranks()
+    return [
+        dict(
+            scoreboard_entry(p, question, player_answer(p, question_index)),
+            rank=ranks.get(p.id),
+        )
+        for p in lobby.players
+    ]
+
+
+def broadcast_room_scoreboard(lobby, question_index):
+    """
+    Broadcast the scoreboard of a question in a large room.
+
+    The room gets the top players, a random sample of the others and how
+    often each option was picked; every player gets their own entry and rank
+    individually. The caller must hold the lobby lock.
+    """
+    question = lobby.questions_list[question_index]
+    player_count = len(lobby.players)
+    ranks = lobby.leaderboard.ranks()
+    option_counts = [0] * len(question["options"])
+    unanswered = 0
+    entries = {}
+    for player in lobby.players:
+        answer = player_answer(player, question_index)
+        if answer and answer.choice != NO_CHOICE:
+            option_counts[answer.choice] += 1
+        else:
+            unanswered += 1
+        entry = entries[player.id] = dict(
+            scoreboard_entry(player, question, answer), rank=ranks.get(player.id)
+        )
+        if player.session_id:
+            broadcast_player_rank(
+                player.session_id,
+                dict(entry, question_index=question_index, player_count=player_count),
+            )
+
+    leaders = [
+        entries.pop(key) for _, key, _ in lobby.leaderboard.top(LEADERBOARD_SIZE)
+    ]
+    others = list(entries.values())
+    sample = random.sample(others, min(SCOREBOARD_SAMPLE_SIZE, len(others)))
+    broadcast_scoreboard(
+        lobby.lobby_code,
+        leaders,
+        question_index=question_index,
+        player_count=player_count,
+        sample=sorted(sample, key=lambda entry: entry["rank"]),
+        answer_counts={"options": option_counts, "unanswered": unanswered},
+    )
+
+
+def broadcast_room_results(lobby):
+    """
+    Broadcast the final results of a large room.
+
+    The room gets the results of the top players; every player still in the
+    lobby gets their own final rank individually. The caller must hold the
+    lobby lock.
+    """
+    final_players = {p.id: p for p in lobby.final_players or lobby.players}
+    ranks = lobby.leaderboard.ranks()
+    results = [
+        dict(
+            serialize_player(final_players[player_id], lobby.questions_list), rank=rank
+        )
+        for rank, player_id, _ in lobby.leaderboard.top(LEADERBOARD_SIZE)
+    ]
+    broadcast_game_over(lobby.lobby_code, results, player_count=len(final_players))
+    for player in lobby.players:
+        if player.session_id:
+            broadcast_player_rank(
+                player.session_id,
+                {
+                    "id": player.id,
+                    "rank": ranks.get(player.id),
+                    "score": player.score,
+                    "totalCorrect": player.correct_answers,
+                    "player_count": len(final_players),
+                    "final": True,
+                },
+            )
+
+
+class GameEngine:
+    """
+    State machine owning every game state change of a multiplayer lobby.
+
+    The REST routes, socket handlers and timers all go through the engine, so
+    an answer is validated, scored and recorded the same way whichever way it
+    arrives. Each change is one action checked against the transition table.
+    Methods taking a lobby expect the caller to hold the lobby lock.
+    """
+
+    def __init__(self, transitions=None):
+        self.transitions = TRANSITIONS if transitions is None else transitions
+
+    def can(self, lobby, action):
+        """Return whether an action is allowed in the lobby's game state."""
+        return (lobby.game_state, action) in self.transitions
+
+    def transition(self, lobby, action):
+        """
+        Apply an action to the lobby's game state.
+
+        Args:
+            lobby (Lobby): The lobby
+            action (str): The action, e.g. "start" or "close"
+
+        Returns:
+            bool: Whether the action was allowed and the state changed
+        """
+        next_state = self.transitions.get((lobby.game_state, action))
+        if next_state is None:
+            logging.warning(
+                f"Rejected {action} in state {lobby.game_state} of lobby {lobby.lobby_code}"
+            )
+            return False
+        lobby.game_state = next_state
+        lobby.state_version += 1
+        return True
+
+    def begin(self, lobby, questions_data):
+        """
+        Install generated questions and broadcast the first question.
+
+        Args:
+            lobby (Lobby): The lobby whose questions were generated
+            questions_data (list): The stored questions data
+        """
+        questions_list = questions_data[0]
+
+        # Update player total questions count
+        for player in lobby.players:
+            player.total_questions = len(questions_list)
+
+        # Store the questions in the lobby - save the entire parsed_data
+        # This keeps the original structure for compatibility
+        lobby.questions = questions_data
+        lobby.answered = {}
+
+        # Change game state to first question
+        self.transition(lobby, "begin")
+        lobby.current_question_idx = 0
+
+        logging.info(
+            f"Game started successfully in lobby {lobby.lobby_code} "
+            f"with {len(questions_list)} questions"
+        )
+
+        # Start the game by broadcasting the first question and its deadline
+        time_limit, deadline = self.start_question(lobby)
+        broadcast_game_started(lobby.lobby_code)
+        broadcast_question(lobby.lobby_code, questions_list[0], 0, time_limit, deadline)
+
+    def start_question(self, lobby):
+        """
+        Start the server-side deadline of the lobby's current question.
+
+        The question closes on its own once the deadline plus ANSWER_GRACE_PERIOD
+        has passed, whether or not every player answered.
+
+        Args:
+            lobby (Lobby): The lobby whose current question was just broadcast
+
+        Returns:
+            tuple: The time limit in seconds and the deadline as a UNIX timestamp
+        """
+        time_limit = lobby.settings.get("timePerQuestion", DEFAULT_TIME_PER_QUESTION)
+        lobby.question_deadline = time.time() + time_limit
+        question_timer.schedule(
+            lobby.lobby_code,
+            time_limit + ANSWER_GRACE_PERIOD,
+            self._close_timed_out,
+            lobby.lobby_code,
+            lobby.current_question_idx,
+        )
+        return time_limit, lobby.question_deadline
+
+    def submit_answer(self, lobby, player_name, question_index, answer, time_taken):
+        """
+        Record a player's answer to the open question.
+
+        The answer is checked against the question and a correct one scores the
+        whole seconds left until the deadline, weighted by the lobby difficulty.
+
+        Args:
+            lobby (Lobby): The lobby
+            player_name (str): The name of the player
+            question_index (int): The index of the question
+            answer (str): The player's answer
+            time_taken (float): How long the player took to answer
+
+        Returns:
+            tuple: A tuple containing success message and status code, or error
+                message and status code
+        """
+        # Check if game has started
+        if lobby.game_state in (GAME_STATE["LOBBY"], GAME_STATE["GENERATING"]):
+            return {"error": "Game has not started yet"}, 400
+
+        # Check if game is over
+        if lobby.game_state == GAME_STATE["GAME_OVER"]:
+            return {"error": "Game is already over"}, 400
+
+        # The questions are stored as [questions_list, status_code]
+        questions_data = lobby.questions
+        if (
+            not questions_data
+            or not isinstance(questions_data, list)
+            or len(questions_data) < 2
+        ):
+            return {"error": "Invalid quiz data structure"}, 500
+        questions_list = questions_data[0]
+
+        # Check if question_index is valid
+        if (
+            not isinstance(question_index, int)
+            or question_index < 0
+            or question_index >= len(questions_list)
+        ):
+            return {
+                "error": f"Invalid question index: {question_index} (max: {len(questions_list)-1})"
+            }, 400
+
+        # Answers are only accepted while the question is open
+        if not is_question_open(lobby, question_index):
+            return {"error": "Question is closed"}, 400
+
+        # Find player
+        player = find_player(lobby, player_name)
+        if player is None:
+            return {"error": "Player not found in lobby"}, 404
+
+        if has_answered(lobby, player, question_index):
+            return {"error": "Answer already submitted"}, 400
+
+        question = questions_list[question_index]
+        is_correct = is_correct_choice(question, answer)
+        score = answer_score(lobby) if is_correct else 0
+        player.answers.append(
+            Answer(
+                question_index,
+                choice_of(question, answer),
+                AnswerOutcome.CORRECT if is_correct else AnswerOutcome.INCORRECT,
+                score,
+                time_taken,
+            )
+        )
+        record_answer(lobby, player, question_index)
+
+        # Update player stats
+        player.current_question = question_index + 1
+        player.score += score
+        lobby.leaderboard.update(player.id, player.score)
+        if is_correct:
+            player.correct_answers += 1
+
+        logging.info(
+            f"Player {player_name} answered Q{question_index+1}, "
+            f"correct: {is_correct}, score: +{score}, total: {player.score}"
+        )
+
+        self.transition(lobby, "answer")
+        lobby.last_activity = time.time()
+
+        # Broadcast that this player has answered, as a count in large rooms
+        if is_large_room(lobby):
+            broadcast_answer_progress(lobby, question_index)
+        else:
+            broadcast_player_answered(
+                lobby.lobby_code,
+                player.id,
+                player_name,
+                question_index,
+                is_correct,
+                score,
+            )
+
+        # Close the question early once every player has answered
+        if all_players_answered(lobby, question_index):
+            logging.info(f"All players have answered question {question_index}")
+            self.close_question(lobby, question_index)
+
+        return {"success": True}, 200
+
+    def close_question(self, lobby, question_index):
+        """
+        Close an open question, reveal the scoreboard and schedule what comes next.
+
+        Players who did not answer are recorded as unanswered. After the last
+        question the game is over; otherwise the next question follows once the
+        reveal delay has passed.
+
+        Args:
+            lobby (Lobby): The lobby
+            question_index (int): The question to close
+
+        Returns:
+            bool: Whether the question was open and is now closed
+        """
+        if not is_question_open(lobby, question_index):
+            return False
+
+        lobby_code = lobby.lobby_code
+        question_timer.cancel(lobby_code)
+        questions_list = lobby.questions_list
+
+        for p in lobby.players:
+            if not has_answered(lobby, p, question_index):
+                p.answers.append(
+                    Answer(question_index, NO_CHOICE, AnswerOutcome.TIMED_OUT)
+                )
+                p.current_question = question_index + 1
+                record_answer(lobby, p, question_index)
+
+        self.transition(lobby, "close")
+        lobby.question_deadline = None
+        lobby.last_activity = time.time()
+        reveal_delay = lobby.settings.get("revealDelay", DEFAULT_REVEAL_DELAY)
+
+        # Explicitly broadcast that all answers are in
+        broadcast_all_answers_in(lobby_code, question_index, reveal_delay)
+
+        # Broadcast scoreboard to all players
+        large_room = is_large_room(lobby)
+        if large_room:
+            broadcast_room_scoreboard(lobby, question_index)
+        else:
+            broadcast_scoreboard(lobby_code, build_scoreboard(lobby, question_index))
+
+        # Check if this was the last question
+        if question_index >= len(questions_list) - 1:
+            self._finish(lobby)
+            if large_room:
+                broadcast_room_results(lobby)
+            else:
+                broadcast_game_over(lobby_code, serialize_results(lobby))
+        else:
+            # Advance once the answers have been revealed for long enough
+            question_timer.schedule(
+                lobby_code,
+                reveal_delay,
+                self._advance_after_reveal,
+                lobby_code,
+                question_index,
+            )
+        return True
+
+    def advance(self, lobby, from_index=None):
+        """
+        Advance the game to the next question once the current one is closed.
+
+        The server advances on its own after the reveal delay, so duplicate
+        requests from clients are rejected once the next question is open.
+
+        Args:
+            lobby (Lobby): The lobby
+            from_index (int, optional): Only advance if this is still the current
+                question. Defaults to None.
+
+        Returns:
+            tuple: A tuple containing success message and status code, or error
+                message and status code
+        """
+        if lobby.game_state in (GAME_STATE["LOBBY"], GAME_STATE["GENERATING"]):
+            return {"error": "Game has not started yet"}, 400
+
+        if lobby.game_state == GAME_STATE["GAME_OVER"]:
+            return {"success": True, "game_over": True}, 200
+
+        if not self.can(lobby, "next") or (
+            from_index is not None and from_index != lobby.current_question_idx
+        ):
+            return {"error": "Current question is still open"}, 400
+
+        # A manual advance replaces the pending reveal delay
+        question_timer.cancel(lobby.lobby_code)
+
+        questions_list = lobby.questions_list
+        next_question_idx = lobby.current_question_idx + 1
+
+        # Check if we've reached the end of questions
+        if next_question_idx >= len(questions_list):
+            self._finish(lobby)
+            return {"success": True, "game_over": True}, 200
+
+        # Update game state
+        self.transition(lobby, "next")
+        lobby.current_question_idx = next_question_idx
+        lobby.last_activity = time.time()
+
+        # Start the question's deadline and broadcast it
+        time_limit, deadline = self.start_question(lobby)
+        broadcast_question(
+            lobby.lobby_code,
+            questions_list[next_question_idx],
+            next_question_idx,
+            time_limit,
+            deadline,
+        )
+
+        return {"success": True, "question_index": next_question_idx}, 200
+
+    def _finish(self, lobby):
+        """End the game and keep its players for the final results."""
+        self.transition(lobby, "finish")
+        if lobby.final_players is None:
+            lobby.final_players = list(lobby.players)
+
+    def resume(self, lobby):
+        """
+        Re-arm the timers of a lobby handed over by another node or restored.
+
+        An open question closes at its original deadline and a revealed
+        scoreboard moves on after the reveal delay. A lobby whose questions were
+        being generated on the previous node goes back to the lobby state, as
+        the generation does not move with it.
+
+        Args:
+            lobby (Lobby): The lobby whose lock is held
+        """
+        lobby_code = lobby.lobby_code
+        state = lobby.game_state
+        if state == GAME_STATE["GENERATING"]:
+            self.transition(lobby, "fail")
+            broadcast_game_start_failed(
+                lobby_code, "The server moved, please start the game again"
+            )
+            broadcast_lobby_delta(lobby, immediate=True, game_state=lobby.game_state)
+        elif state in (GAME_STATE["QUESTION"], GAME_STATE["WAITING"]):
+            remaining = max(0, (lobby.question_deadline or 0) - time.time())
+            question_timer.schedule(
+                lobby_code,
+                remaining + ANSWER_GRACE_PERIOD,
+                self._close_timed_out,
+                lobby_code,
+                lobby.current_question_idx,
+            )
+        elif state == GAME_STATE["SCOREBOARD"]:
+            question_timer.schedule(
+                lobby_code,
+                lobby.settings.get("revealDelay", DEFAULT_REVEAL_DELAY),
+                self._advance_after_reveal,
+                lobby_code,
+                lobby.current_question_idx,
+            )
+
+    @retry_on_conflict
+    def _close_timed_out(self, lobby_code, question_index):
+        """Timer callback closing a question whose deadline has passed."""
+        with lobby_registry.locked(lobby_code) as lobby:
+            if lobby is not None and self.close_question(lobby, question_index):
+                logging.info(
+                    f"Question {question_index + 1} timed out in lobby {lobby_code}"
+                )
+
+    @retry_on_conflict
+    def _advance_after_reveal(self, lobby_code, question_index):
+        """Timer callback opening the next question after the reveal delay."""
+        with lobby_registry.locked(lobby_code) as lobby:
+            if lobby is not None:
+                self.advance(lobby, question_index)
+
+
+game_engine = GameEngine()
@@ -2,16 +2,38 @@
 
 import json
 import logging
+import math
+import threading
 import time
 import uuid
+from flask import current_app, has_app_context
 from api.services.quiz_gen_service import generate_quiz
 from api.utils.multiplayer_lobby import (
-    active_lobbies,
-    lobbies_lock,
+    lobby_registry,
+    lobby_lifecycle,
     GAME_STATE,
-    generate_lobby_code,
+    MAX_PLAYERS,
+    add_player,
+    find_player,
+    max_players,
 )
-from api.utils.multiplayer_broadcast import broadcast_lobby_update, broadcast_question
+from api.utils.multiplayer_broadcast import (
+    broadcast_lobby_delta,
+    public_player,
+    broadcast_game_start_failed,
+)
+from api.utils.multiplayer_engine import game_engine
+from api.utils.multiplayer_models import Lobby, Player
+from api.utils.multiplayer_store import retry_on_conflict
+
+# Seconds lobby settings must stay unchanged before questions are pre-generated
+PREGENERATION_DEBOUNCE = 5
+
+# Maximum number of speculative generations running at once on this server
+MAX_SPECULATIVE_GENERATIONS = 4
+
+# Settings the engine uses as durations in seconds
+DURATION_SETTINGS = ("timePerQuestion", "revealDelay")
 
 
 def create_new_lobby(host_name, host_avatar):
@@ -23,52 +45,38 @@ def create_new_lobby(host_name, host_avatar):
         host_avatar (str): The avatar of the lobby host
 
     Returns:
-        dict: The created lobby information
+        Lobby: The created lobby
     """
-    lobby_code = generate_lobby_code()
     host_id = str(uuid.uuid4())
+    host = Player(host_id, host_name, host_avatar, is_host=True)
+
+    def build_lobby(lobby_code):
+        lobby = Lobby(
+            lobby_code=lobby_code,
+            host_id=host_id,
+            settings={
+                "numQuestions": 10,
+                "categories": [],
+                "difficulty": "medium",
+                "timePerQuestion": 15,
+                "revealDelay": 3,
+                "allowSkipping": False,
+                "topic": None,
+                "model": "gemini",
+                "largeRoom": False,
+            },
+            created_at=time.time(),
+            last_activity=time.time(),
+        )
+        add_player(lobby, host)
+        return lobby
 
-    lobby = {
-        "lobby_code": lobby_code,
-        "created_at": time.time(),
-        "last_activity": time.time(),
-        "host_id": host_id,
-        "game_state": GAME_STATE["LOBBY"],
-        "current_question_idx": -1,
-        "players": [
-            {
-                "id": host_id,
-                "name": host_name,
-                "isHost": True,
-                "avatar": host_avatar,
-                "ready": False,
-                "currentQuestion": 0,
-                "score": 0,
-                "correctAnswers": 0,
-                "totalQuestions": 0,
-                "answers": [],
-            }
-        ],
-        "settings": {
-            "numQuestions": 10,
-            "categories": [],
-            "difficulty": "medium",
-            "timePerQuestion": 15,
-            "allowSkipping": False,
-            "topic": None,
-            "model": "gemini",
-        },
-        "questions": [],
-        "all_answers_received": False,
-        "waiting_for_next_question": False,
-    }
-
-    with lobbies_lock:
-        active_lobbies[lobby_code] = lobby
-
+    lobby = lobby_registry.create(build_lobby)
+    lobby_lifecycle.track(lobby.lobby_code, lobby.last_activity)
     return lobby
 
 
+@retry_on_conflict
 def join_existing_lobby(lobby_code, player_name, player_avatar):
     """
     Join an existing multiplayer lobby.
@@ -81,54 +89,43 @@ def join_existing_lobby(lobby_code, player_name, player_avatar):
     Returns:
         tuple: A tuple containing player ID and status code, or error message and status code
     """
-    with lobbies_lock:
+    with lobby_registry.locked(lobby_code) as lobby:
         # Check if lobby exists
-        if lobby_code not in active_lobbies:
+        if lobby is None:
             return {"error": "Lobby not found"}, 404
 
-        lobby = active_lobbies[lobby_code]
-
         # Check if game has already started
-        if lobby["game_state"] != GAME_STATE["LOBBY"]:
+        if lobby.game_state != GAME_STATE["LOBBY"]:
             return {"error": "Game has already started"}, 400
 
         # Check if player name is already taken
-        for player in lobby["players"]:
-            if player["name"] == player_name:
-                return {"error": "Player name already taken"}, 400
+        if find_player(lobby, player_name):
+            return {"error": "Player name already taken"}, 400
 
-        # Check if lobby is full (max 8 players)
-        if len(lobby["players"]) >= 8:
+        # Check if lobby is full (max 8 players, more in large-room mode)
+        if len(lobby.players) >= max_players(lobby):
             return {"error": "Lobby is full"}, 400
 
         # Add player to lobby
         player_id = str(uuid.uuid4())
-        lobby["players"].append(
-            {
-                "id": player_id,
-                "name": player_name,
-                "isHost": False,
-                "avatar": player_avatar,
-                "ready": False,
-                "currentQuestion": 0,
-                "score": 0,
-                "correctAnswers": 0,
-                "totalQuestions": 0,
-                "answers": [],
-            }
-        )
+        player = Player(player_id, player_name, player_avatar)
+        add_player(lobby, player)
 
         # Update last activity
-        lobby["last_activity"] = time.time()
+        lobby.last_activity = time.time()
+
+        # Broadcast the new player via WebSocket
+        broadcast_lobby_delta(lobby, players={player_id: public_player(player)})
 
-        # Broadcast lobby update via WebSocket
-        broadcast_lobby_update(
-            lobby_code, {"players": lobby["players"], "settings": lobby["settings"]}
+        # A lobby someone joined is likely to be played, so speculate on it
+        quiz_pregenerator.schedule(
+            _current_app(), lobby_code, build_quiz_params(lobby.settings)
         )
 
     return {"player_id": player_id}, 200
 
 
+@retry_on_conflict
 def update_player_ready_status(lobby_code, player_name, ready_status):
     """
     Update the ready status of a player.
@@ -141,37 +138,47 @@ def update_player_ready_status(lobby_code, player_name, ready_status):
     Returns:
         tuple: A tuple containing success message and status code, or error message and status code
     """
-    with lobbies_lock:
+    with lobby_registry.locked(lobby_code) as lobby:
         # Check if lobby exists
-        if lobby_code not in active_lobbies:
+        if lobby is None:
             return {"error": "Lobby not found"}, 404
 
-        lobby = active_lobbies[lobby_code]
-
         # Check if game has already started
-        if lobby["game_state"] != GAME_STATE["LOBBY"]:
+        if lobby.game_state != GAME_STATE["LOBBY"]:
             return {"error": "Game has already started"}, 400
 
         # Update player ready status
-        player_found = False
-        for player in lobby["players"]:
-            if player["name"] == player_name:
-                player["ready"] = ready_status
-                player_found = True
-                break
-
-        if not player_found:
+        player = find_player(lobby, player_name)
+        if player is None:
             return {"error": "Player not found in lobby"}, 404
+        player.ready = ready_status
 
         # Update last activity
-        lobby["last_activity"] = time.time()
+        lobby.last_activity = time.time()
 
-        # Broadcast lobby update via WebSocket
-        broadcast_lobby_update(lobby_code, {"players": lobby["players"]})
+        # Broadcast the changed ready status via WebSocket
+        broadcast_lobby_delta(lobby, players={player.id: {"ready": ready_status}})
+
+        if ready_status:
+            quiz_pregenerator.schedule(
+                _current_app(), lobby_code, build_quiz_params(lobby.settings)
+            )
 
     return {"success": True}, 200
 
 
+@retry_on_conflict
+def _duration(value):
+    """Return a settings value as positive seconds, or None if it is not one."""
+    if isinstance(value, bool):
+        return None
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        return None
+    return seconds if 0 < seconds < math.inf else None
+
+
 def update_lobby_settings(lobby_code, new_settings):
     """
     Update the settings of a lobby.
@@ -183,6 +190,14 @@ def update_lobby_settings(lobby_code, new_settings):
     Returns:
         tuple: A tuple containing success message and status code, or error message and status code
     """
+    # Durations feed the question timer, so they must be positive numbers
+    new_settings = dict(new_settings)
+    for key in DURATION_SETTINGS:
+        if key in new_settings:
+            new_settings[key] = _duration(new_settings[key])
+            if new_settings[key] is None:
+                return {"error": f"{key} must be a positive number"}, 400
+
     # Only log essential settings info - not every update
     important_setting_changes = {}
     for key in ["numQuestions", "difficulty", "topic"]:
@@ -194,37 +209,60 @@ def update_lobby_settings(lobby_code, new_settings):
             f"Updating key settings for lobby {lobby_code}: {important_setting_changes}"
         )
 
-    with lobbies_lock:
+    with lobby_registry.locked(lobby_code) as lobby:
         # Check if lobby exists
-        if lobby_code not in active_lobbies:
+        if lobby is None:
             logging.error(f"Lobby not found: {lobby_code}")
             return {"error": "Lobby not found"}, 404
 
-        lobby = active_lobbies[lobby_code]
-
         # Check if game has already started
-        if lobby["game_state"] != GAME_STATE["LOBBY"]:
+        if lobby.game_state != GAME_STATE["LOBBY"]:
             logging.error(
                 f"Cannot update settings - game already started in lobby {lobby_code}"
             )
             return {"error": "Game has already started"}, 400
 
+        # A lobby only leaves large-room mode while it fits a regular lobby
+        if (
+            not new_settings.get("largeRoom", lobby.settings.get("largeRoom"))
+            and len(lobby.players) > MAX_PLAYERS
+        ):
+            return {"error": f"Lobby has more than {MAX_PLAYERS} players"}, 400
+
         # Update settings without excessive logging
-        for key, value in new_settings.items():
-            lobby["settings"][key] = value
+        changed_settings = {
+            key: value
+            for key, value in new_settings.items()
+            if lobby.settings.get(key, object()) != value
+        }
+        lobby.settings.update(changed_settings)
 
         # Update last activity
-        lobby["last_activity"] = time.time()
+        lobby.last_activity = time.time()
+
+        # Broadcast the changed settings via WebSocket
+        if changed_settings:
+            broadcast_lobby_delta(lobby, settings=changed_settings)
+        settings = dict(lobby.settings)
 
-        # Broadcast lobby update via WebSocket
-        broadcast_lobby_update(lobby_code, {"settings": lobby["settings"]})
+        # Restart speculative generation once the new settings have settled
+        quiz_pregenerator.schedule(
+            _current_app(), lobby_code, build_quiz_params(settings)
+        )
 
-    return {"success": True, "settings": lobby["settings"]}, 200
+    return {"success": True, "settings": settings}, 200
 
 
+@retry_on_conflict
 def start_game(lobby_code):
     """
-    Start a multiplayer game by generating questions.
+    Start a multiplayer game by generating questions in the background.
+
+    The lobby moves to the generating state and quiz generation runs in a worker
+    without holding the lobby lock. Once it finishes, the questions are installed
+    and the first question is broadcast, or the lobby returns to the lobby state
+    if generation failed. Questions already generated speculatively for the
+    current settings start the game immediately.
 
     Args:
         lobby_code (str): The code of the lobby to start
@@ -232,24 +270,22 @@ def start_game(lobby_code):
     Returns:
         tuple: A tuple containing success message and status code, or error message and status code
     """
-    with lobbies_lock:
+    with lobby_registry.locked(lobby_code) as lobby:
         # Check if lobby exists
-        if lobby_code not in active_lobbies:
+        if lobby is None:
             return {"error": "Lobby not found"}, 404
 
-        lobby = active_lobbies[lobby_code]
-
-        # Check if game has already started
-        if lobby["game_state"] != GAME_STATE["LOBBY"]:
+        # Check if game has already started or is being generated
+        if lobby.game_state != GAME_STATE["LOBBY"]:
             return {"error": "Game has already started"}, 400
 
         # Check if at least one player is ready (besides the host)
-        ready_players = [p for p in lobby["players"] if p["ready"] or p["isHost"]]
+        ready_players = [p for p in lobby.players if p.ready or p.is_host]
         if len(ready_players) < 2:
             return {"error": "At least one other player must be ready to start"}, 400
 
         # Generate quiz questions based on settings
-        settings = lobby["settings"]
+        settings = lobby.settings
 
         # Log important game start information
         logging.info(
@@ -257,96 +293,310 @@ def start_game(lobby_code):
             + f"{settings['numQuestions']} questions, "
             + f"difficulty: {settings['difficulty']}, "
             + f"topic: {settings['topic'] or 'random'}, "
-            + f"players: {len(lobby['players'])}"
+            + f"players: {len(lobby.players)}"
         )
 
-        # Use the existing quiz generation service with proper parameters
-        quiz_params = {
-            "num_questions": settings["numQuestions"],
-            "difficulty": (
-                settings["difficulty"]
-                if settings["difficulty"] != "mixed"
-                else "medium"
-            ),
-            "model": settings["model"],
-            "topic": settings["topic"],
-            "image": settings.get("includeImages", False),
-        }
+        quiz_params = build_quiz_params(settings)
 
-        # Remove None values to prevent errors
-        quiz_params = {k: v for k, v in quiz_params.items() if v is not None}
+        generation_id = uuid.uuid4().hex
+        game_engine.transition(lobby, "start")
+        lobby.generation_id = generation_id
+        lobby.last_activity = time.time()
 
-        try:
-            # Generate the quiz using the existing service
-            response = generate_quiz(**quiz_params)
-
-            # The response from generate_quiz is actually a Flask Response object
-            # We need to convert it to the expected JSON format
-            try:
-                # Convert the response to string and parse as JSON
-                response_data = response.get_data(as_text=True)
-                parsed_data = json.loads(response_data)
-
-                # Based on the example, we expect a list with:
-                # - First element: list of question dictionaries
-                # - Second element: status code (200)
-
-                if isinstance(parsed_data, list) and len(parsed_data) == 2:
-                    questions_list = parsed_data[0]  # Get the questions list
-                    status_code = parsed_data[1]  # Get the status code
-
-                    if status_code != 200:
-                        return {"error": "Failed to generate quiz"}, status_code
-
-                    if not questions_list or not isinstance(questions_list, list):
-                        logging.error(
-                            f"Failed to generate valid quiz questions: {type(questions_list)}"
-                        )
-                        return {"error": "Failed to generate valid quiz questions"}, 500
-
-                    # Update player total questions count
-                    for player in lobby["players"]:
-                        player["totalQuestions"] = len(questions_list)
-
-                    # Store the questions in the lobby - save the entire parsed_data
-                    # This keeps the original structure for compatibility
-                    lobby["questions"] = parsed_data
-
-                    # Change game state to first question
-                    lobby["game_state"] = GAME_STATE["QUESTION"]
-                    lobby["current_question_idx"] = 0
-                    lobby["all_answers_received"] = False
-
-                    # Mark the game as started for backward compatibility
-                    # This can be removed in future versions
-                    lobby["game_started"] = True
-                    lobby["game_over"] = False
-
-                    logging.info(
-                        f"Game started successfully in lobby {lobby_code} with {len(questions_list)} questions"
-                    )
-
-                    # Start the game by broadcasting the first question
-                    first_question = questions_list[0]
-                    broadcast_question(lobby_code, first_question, 0)
+        broadcast_lobby_delta(lobby, immediate=True, game_state=lobby.game_state)
 
+        speculation, questions_data = quiz_pregenerator.claim(
+            lobby_code, quiz_params, generation_id
+        )
+
+    if speculation == "ready":
+        logging.info(f"Using speculatively generated questions for lobby {lobby_code}")
+        finish_game_start(lobby_code, generation_id, questions_data, None)
+        return {"success": True, "game_state": GAME_STATE["QUESTION"]}, 200
+
+    if speculation is None:
+        run_in_background(
+            _generate_lobby_quiz,
+            _current_app(),
+            lobby_code,
+            generation_id,
+            quiz_params,
+        )
+
+    return {"success": True, "game_state": GAME_STATE["GENERATING"]}, 202
+
+
+def build_quiz_params(settings):
+    """
+    Translate lobby settings into generate_quiz keyword arguments.
+
+    Args:
+        settings (dict): The lobby settings
+
+    Returns:
+        dict: Keyword arguments for generate_quiz without None values
+    """
+    quiz_params = {
+        "num_questions": settings["numQuestions"],
+        "difficulty": (
+            settings["difficulty"] if settings["difficulty"] != "mixed" else "medium"
+        ),
+        "model": settings["model"],
+        "topic": settings["topic"],
+        "image": settings.get("includeImages", False),
+    }
+
+    # Remove None values to prevent errors
+    return {k: v for k, v in quiz_params.items() if v is not None}
+
+
+def _current_app():
+    """Return the current Flask app for use in worker threads, or None."""
+    return current_app._get_current_object() if has_app_context() else None
+
+
+def run_in_background(target, *args):
+    """Run a function in a SocketIO background task, or a thread without SocketIO."""
+    from api.socket_server import socketio
+
+    if socketio:
+        socketio.start_background_task(target, *args)
+    else:
+        threading.Thread(target=target, args=args, daemon=True).start()
+
+
+def generate_questions_data(quiz_params):
+    """
+    Generate a quiz and unpack the generate_quiz response.
+
+    Args:
+        quiz_params (dict): Keyword arguments for generate_quiz
+
+    Returns:
+        tuple: The stored questions data ([questions_list, status_code]) and None,
+        or None and an error message
+    """
+    try:
+        # Generate the quiz using the existing service
+        response = generate_quiz(**quiz_params)
+
+        # The response from generate_quiz is actually a Flask Response object
+        # We need to convert it to the expected JSON format
+        response_data = response.get_data(as_text=True)
+        parsed_data = json.loads(response_data)
+    except Exception as e:
+        logging.error(f"Failed to generate multiplayer quiz: {str(e)}")
+        return None, f"Failed to generate quiz: {str(e)}"
+
+    # Based on the example, we expect a list with:
+    # - First element: list of question dictionaries
+    # - Second element: status code (200)
+    if not isinstance(parsed_data, list) or len(parsed_data) != 2:
+        logging.error(f"Unexpected response format from quiz generator: {parsed_data}")
+        return None, "Unexpected response format from quiz generator"
+
+    questions_list, status_code = parsed_data
+    if status_code != 200:
+        return None, "Failed to generate quiz"
+
+    if not questions_list or not isinstance(questions_list, list):
+        logging.error(
+            f"Failed to generate valid quiz questions: {type(questions_list)}"
+        )
+        return None, "Failed to generate valid quiz questions"
+
+    return parsed_data, None
+
+
+def _generate_in_app_context(app, quiz_params):
+    """Generate questions inside the app context when one was captured."""
+    if app is None:
+        return generate_questions_data(quiz_params)
+    with app.app_context():
+        return generate_questions_data(quiz_params)
+
+
+def _generate_lobby_quiz(app, lobby_code, generation_id, quiz_params):
+    """Worker generating a lobby's questions outside of the lobby lock."""
+    questions_data, error = _generate_in_app_context(app, quiz_params)
+    finish_game_start(lobby_code, generation_id, questions_data, error)
+
+
+@retry_on_conflict
+def finish_game_start(lobby_code, generation_id, questions_data, error):
+    """
+    Install generated questions and broadcast the first question.
+
+    Results are discarded if the lobby was closed or restarted while generating.
+
+    Args:
+        lobby_code (str): The code of the lobby being started
+        generation_id (str): The generation the results belong to
+        questions_data (list): The stored questions data, or None on failure
+        error (str): The generation error, or None on success
+    """
+    with lobby_registry.locked(lobby_code) as lobby:
+        if (
+            lobby is None
+            or lobby.game_state != GAME_STATE["GENERATING"]
+            or lobby.generation_id != generation_id
+        ):
+            logging.info(f"Discarding generated quiz for closed lobby {lobby_code}")
+            return
+
+        lobby.last_activity = time.time()
+
+        if error:
+            game_engine.transition(lobby, "fail")
+            logging.error(f"Game start failed in lobby {lobby_code}: {error}")
+            broadcast_game_start_failed(lobby_code, error)
+            broadcast_lobby_delta(lobby, immediate=True, game_state=lobby.game_state)
+            return
+
+        game_engine.begin(lobby, questions_data)
+
+
+class QuizPregenerator:
+    """
+    Speculative question generation for lobbies whose settings have settled.
+
+    Lobbies are only scheduled once they show they will be played: a settings
+    update, a player joining or a player marking ready. Lobbies abandoned
+    right after creation therefore never cost a generation, and a deleted or
+    reaped lobby's generation is cancelled by the registry's delete listener.
+    Once a lobby's quiz parameters have been unchanged for `debounce` seconds,
+    its questions are generated in the background so start_game can use them
+    right away. Changing the settings cancels a pending generation and discards
+    the result of a running one. At most `max_running` generations run at once;
+    lobbies over the cap generate their questions on start as before.
+
+    Lock order is lobby lock before the pregenerator lock, which is never held
+    while generating or while taking a lobby lock.
+    """
+
+    def __init__(
+        self, debounce=PREGENERATION_DEBOUNCE, max_running=MAX_SPECULATIVE_GENERATIONS
+    ):
+        self.debounce = debounce
+        self._slots = threading.BoundedSemaphore(max_running)
+        self._entries = {}  # lobby_code -> speculation entry
+        self._lock = threading.Lock()
+
+    def schedule(self, app, lobby_code, quiz_params):
+        """
+        Restart the debounce window of a lobby unless its parameters are unchanged.
+
+        Args:
+            app (flask.Flask): The app to generate in, or None
+            lobby_code (str): The code of the lobby
+            quiz_params (dict): Keyword arguments for generate_quiz
+        """
+        key = json.dumps(quiz_params, sort_keys=True)
+        with self._lock:
+            entry = self._entries.get(lobby_code)
+            if entry is not None and entry["key"] == key:
+                return
+            self._cancel(entry)
+
+            entry = {
+                "key": key,
+                "state": "pending",
+                "questions_data": None,
+                "generation_id": None,
+            }
+            entry["timer"] = threading.Timer(
+                self.debounce, self._generate, (app, lobby_code, entry, quiz_params)
+            )
+            entry["timer"].daemon = True
+            self._entries[lobby_code] = entry
+            entry["timer"].start()
+
+    def claim(self, lobby_code, quiz_params, generation_id):
+        """
+        Hand a lobby's speculative generation over to a starting game.
+
+        Args:
+            lobby_code (str): The code of the lobby being started
+            quiz_params (dict): The quiz parameters the game starts with
+            generation_id (str): The generation id of the starting game
+
+        Returns:
+            tuple: ("ready", questions data) when the questions are generated,
+            ("running", None) when the running generation will finish the game
+            start, or (None, None) when the game must generate its own questions
+        """
+        key = json.dumps(quiz_params, sort_keys=True)
+        with self._lock:
+            entry = self._entries.get(lobby_code)
+            if entry is None or entry["key"] != key or entry["state"] == "pending":
+                self._cancel(self._entries.pop(lobby_code, None))
+                return None, None
+
+            if entry["state"] == "ready":
+                del self._entries[lobby_code]
+                return "ready", entry["questions_data"]
+
+            entry["generation_id"] = generation_id
+            return "running", None
+
+    def discard(self, lobby_code):
+        """Cancel or discard the speculative generation of a lobby."""
+        with self._lock:
+            self._cancel(self._entries.pop(lobby_code, None))
+
+    @staticmethod
+    def _cancel(entry):
+        """Stop the debounce timer of an entry that has not started generating."""
+        if entry is not None and entry["state"] == "pending":
+            entry["timer"].cancel()
+
+    def _generate(self, app, lobby_code, entry, quiz_params):
+        """Timer callback generating the questions of a settled lobby."""
+        with self._lock:
+            if self._entries.get(lobby_code) is not entry:
+                return
+            if not self._slots.acquire(blocking=False):
+                logging.info(
+                    f"Skipping speculative generation for lobby {lobby_code}: limit reached"
+                )
+                del self._entries[lobby_code]
+                return
+            entry["state"] = "running"
+
+        logging.info(f"Speculatively generating questions for lobby {lobby_code}")
+        try:
+            questions_data, error = _generate_in_app_context(app, quiz_params)
+        finally:
+            self._slots.release()
+
+        with self._lock:
+            if self._entries.get(lobby_code) is not entry:
+                logging.info(
+                    f"Discarding stale speculative questions for lobby {lobby_code}"
+                )
+                return
+
+            generation_id = entry["generation_id"]
+            if generation_id is None:
+                if error:
+                    # start_game generates again and reports the error if it persists
+                    del self._entries[lobby_code]
                 else:
-                    logging.error(
-                        f"Unexpected response format from quiz generator: {parsed_data}"
-                    )
-                    return {
-                        "error": "Unexpected response format from quiz generator"
-                    }, 500
+                    entry["state"] = "ready"
+                    entry["questions_data"] = questions_data
+                return
+            del self._entries[lobby_code]
 
-            except Exception as e:
-                logging.error(f"Failed to parse response data: {str(e)}")
-                return {"error": f"Failed to process quiz: {str(e)}"}, 500
+        # The game was started while generating, so this generation starts it
+        finish_game_start(lobby_code, generation_id, questions_data, error)
 
-            # Update last activity timestamp
-            lobby["last_activity"] = time.time()
 
-        except Exception as e:
-            logging.error(f"Failed to generate multiplayer quiz: {str(e)}")
-            return {"error": f"Failed to generate quiz: {str(e)}"}, 500
+quiz_pregenerator = QuizPregenerator()
 
-    return {"success": True}, 200
+
+def _discard_speculation(lobby_code):
+    """Delete listener cancelling the speculation of a deleted or reaped lobby."""
+    quiz_pregenerator.discard(lobby_code)
+
+
+lobby_registry.add_delete_listener(_discard_speculation)
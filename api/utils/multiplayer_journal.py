@@ -0,0 +1,384 @@
+"""Utility module journaling lobby changes to disk so lobbies survive a restart."""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from api.utils.multiplayer_lobby import lobby_registry, lobby_lifecycle
+from api.utils.multiplayer_engine import game_engine
+from api.utils.multiplayer_models import lobby_from_state, lobby_state
+
+# Seconds the journal writer waits for more changes to commit with one fsync
+JOURNAL_COMMIT_INTERVAL = 0.05
+
+# Journal size in bytes after which lobbies are snapshotted and the journal emptied
+JOURNAL_SNAPSHOT_BYTES = 8 * 1024 * 1024
+
+JOURNAL_FILE = "journal.jsonl"
+SNAPSHOT_FILE = "snapshot.json"
+
+
+def _journal_state(lobby):
+    """Return a lobby's state without its questions, which are journaled apart."""
+    state = lobby_state(lobby)
+    del state["questions"]
+    state["settings"] = dict(state["settings"])
+    return state
+
+
+def _player_diff(old, new):
+    """Return the fields of a player that changed, with new answers appended."""
+    if not old:
+        return new
+    patch = {key: value for key, value in new.items() if old.get(key) != value}
+    if "answers" in patch:
+        known = len(old["answers"])
+        if new["answers"][:known] == old["answers"]:
+            patch["new_answers"] = patch.pop("answers")[known:]
+    patch["id"] = new["id"]
+    return patch
+
+
+def _diff(old, new):
+    """Return the patch turning one journaled lobby state into another."""
+    old_players = {p["id"]: p for p in old["players"]}
+    patch = {
+        "fields": {
+            key: value
+            for key, value in new.items()
+            if key != "players" and old.get(key) != value
+        },
+        "players": [
+            _player_diff(old_players.get(p["id"], {}), p)
+            for p in new["players"]
+            if old_players.get(p["id"]) != p
+        ],
+    }
+    ids = [p["id"] for p in new["players"]]
+    if ids != list(old_players):
+        patch["order"] = ids
+
+    # Answers only add player ids, so only the added ones are journaled
+    if "answered" in patch["fields"]:
+        old_answered = {index: set(ids) for index, ids in old["answered"]}
+        new_answered = {index: set(ids) for index, ids in new["answered"]}
+        if all(
+            ids <= new_answered.get(index, set()) for index, ids in old_answered.items()
+        ):
+            del patch["fields"]["answered"]
+            patch["answered"] = [
+                [index, sorted(ids - old_answered.get(index, set()))]
+                for index, ids in new_answered.items()
+                if ids != old_answered.get(index)
+            ]
+    return patch
+
+
+def _patch(state, patch):
+    """Apply a patch returned by _diff to a journaled lobby state."""
+    state.update(patch["fields"])
+    players = {p["id"]: p for p in state["players"]}
+    for changes in patch["players"]:
+        player = players.setdefault(changes["id"], {"answers": []})
+        player["answers"].extend(changes.pop("new_answers", []))
+        player.update(changes)
+    order = patch.get("order", players)
+    state["players"] = [players[player_id] for player_id in order]
+
+    answered = dict(state["answered"])
+    for index, player_ids in patch.get("answered", ()):
+        answered[index] = sorted(set(answered.get(index, ())) | set(player_ids))
+    state["answered"] = [[index, ids] for index, ids in answered.items()]
+
+
+class LobbyJournal:
+    """
+    Append-only journal of lobby changes with periodic snapshots.
+
+    The registry reports every committed lobby update while the lobby lock is
+    still held. Commits that leave the lobby's state version alone, like reads
+    touching `last_activity` or sessions binding to players, are skipped;
+    others only mark the lobby dirty. A writer thread copies each dirty lobby
+    under its lock, once however many updates it got since the last copy,
+    turns the copy into a record of what changed since the lobby's previous
+    one, a patch of its fields, changed players and new answers, and appends
+    the records of a batch with one fsync (group commit). Copying, diffing,
+    encoding and disk writes thus stay off the request path.
+
+    Once the journal grows past `snapshot_bytes`, the writer's latest lobby
+    states are written as a snapshot and the journal starts over. On startup
+    the snapshot and the journal are replayed to restore the lobbies, whose
+    players rejoin by lobby code and player id.
+
+    Args:
+        directory (str): Where the journal and snapshot files are kept
+        commit_interval (float, optional): Seconds to gather records per fsync
+        snapshot_bytes (int, optional): Journal size that triggers a snapshot
+    """
+
+    def __init__(
+        self,
+        directory,
+        commit_interval=JOURNAL_COMMIT_INTERVAL,
+        snapshot_bytes=JOURNAL_SNAPSHOT_BYTES,
+    ):
+        self.directory = directory
+        self.commit_interval = commit_interval
+        self.snapshot_bytes = snapshot_bytes
+        self.stats = {
+            "records": 0,
+            "bytes": 0,
+            "games": 0,
+            "commits": 0,
+            "snapshots": 0,
+            "replayed_lobbies": 0,
+            "replay_seconds": 0.0,
+        }
+        self._queue = queue.Queue()
+        self._registry = None
+        self._versions = {}  # lobby_code -> state version last marked dirty
+        self._dirty = set()  # codes of lobbies queued for the writer to copy
+        self._dirty_lock = threading.Lock()
+        self._lobbies = {}  # lobby_code -> last journaled state
+        self._questions = {}  # lobby_code -> last journaled questions data
+        self._file = None
+        self._started = False
+        self._start_lock = threading.Lock()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def record(self, lobby):
+        """Mark a lobby dirty if its state version moved. Hold the lobby lock."""
+        lobby_code = lobby.lobby_code
+        if self._versions.get(lobby_code) == lobby.state_version:
+            return
+        self._versions[lobby_code] = lobby.state_version
+        with self._dirty_lock:
+            if lobby_code in self._dirty:
+                return
+            self._dirty.add(lobby_code)
+        self._queue.put(("state", lobby_code))
+
+    def forget(self, lobby_code):
+        """Queue the deletion of a lobby."""
+        self._versions.pop(lobby_code, None)
+        self._queue.put(("delete", lobby_code))
+
+    def flush(self):
+        """Wait until every queued record is committed to disk."""
+        self._queue.join()
+
+    def get_stats(self):
+        """Return the journal counters, the journal's size and its bytes per game."""
+        stats = dict(self.stats)
+        stats["journal_bytes"] = self._file.tell() if self._file else 0
+        stats["bytes_per_game"] = stats["bytes"] // max(stats["games"], 1)
+        return stats
+
+    def _apply(self, op, lobby_code, data):
+        """Apply a journal record to the journaled lobby states."""
+        if op == "put":
+            self._lobbies[lobby_code] = data
+        elif op == "patch" and lobby_code in self._lobbies:
+            _patch(self._lobbies[lobby_code], data)
+        elif op == "questions":
+            self._questions[lobby_code] = data
+        elif op == "delete":
+            self._lobbies.pop(lobby_code, None)
+            self._questions.pop(lobby_code, None)
+
+    def _copy(self, lobby_code):
+        """Copy a dirty lobby's state and questions under its lock, or None if gone."""
+        with self._dirty_lock:
+            self._dirty.discard(lobby_code)
+        return self._registry.peek(
+            lobby_code, lambda lobby: (_journal_state(lobby), lobby.questions)
+        )
+
+    def _records(self, op, lobby_code):
+        """Return the journal records for a dirty lobby or a deletion."""
+        if op == "delete":
+            if self._lobbies.pop(lobby_code, None) is None:
+                return []
+            self._questions.pop(lobby_code, None)
+            return [("delete", lobby_code, None)]
+
+        copied = self._copy(lobby_code)
+        if copied is None:
+            return []
+        state, questions = copied
+        records = []
+        if self._questions.get(lobby_code) is not questions:
+            self._questions[lobby_code] = questions
+            records.append(("questions", lobby_code, questions))
+        journaled = self._lobbies.get(lobby_code)
+        if journaled is None:
+            self.stats["games"] += 1
+            records.append(("put", lobby_code, state))
+        elif journaled != state:
+            records.append(("patch", lobby_code, _diff(journaled, state)))
+        self._lobbies[lobby_code] = state
+        return records
+
+    def replay(self):
+        """
+        Read the snapshot and the journal back into the journaled lobby states.
+
+        A record torn by a crash ends the replay, as it was never committed.
+
+        Returns:
+            dict: The replayed lobby states, with their questions, by lobby code
+        """
+        start = time.perf_counter()
+        self._lobbies, self._questions = {}, {}
+        try:
+            with open(self._path(SNAPSHOT_FILE), encoding="utf-8") as snapshot:
+                data = json.load(snapshot)
+            self._lobbies, self._questions = data["lobbies"], data["questions"]
+        except FileNotFoundError:
+            pass
+
+        records = 0
+        try:
+            with open(self._path(JOURNAL_FILE), encoding="utf-8") as journal:
+                for line in journal:
+                    try:
+                        op, lobby_code, data = json.loads(line)
+                    except ValueError:
+                        logging.warning("Ignoring a torn record at the journal end")
+                        break
+                    self._apply(op, lobby_code, data)
+                    records += 1
+        except FileNotFoundError:
+            pass
+
+        self.stats["replay_seconds"] = time.perf_counter() - start
+        self.stats["replayed_lobbies"] = len(self._lobbies)
+        logging.info(
+            f"Replayed {len(self._lobbies)} lobbies from {records} journal records "
+            f"in {self.stats['replay_seconds']:.3f}s"
+        )
+        return {
+            code: dict(state, questions=self._questions.get(code, []))
+            for code, state in self._lobbies.items()
+        }
+
+    def start(self, registry):
+        """
+        Restore the journaled lobbies into a registry and journal its changes.
+
+        Restored games resume where they were: open questions close at their
+        deadline and games that were generating questions go back to the lobby.
+        """
+        with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+
+        os.makedirs(self.directory, exist_ok=True)
+        restored = []
+        for state in self.replay().values():
+            lobby = lobby_from_state(state)
+            # Replayed states are journaled already, whatever the decoding changed
+            self._lobbies[lobby.lobby_code] = _journal_state(lobby)
+            self._questions[lobby.lobby_code] = lobby.questions
+            self._versions[lobby.lobby_code] = lobby.state_version
+            if registry.adopt(lobby):
+                lobby_lifecycle.track(lobby.lobby_code, lobby.last_activity)
+                restored.append(lobby.lobby_code)
+
+        # Start from a snapshot of the restored lobbies and an empty journal
+        self._snapshot()
+        self._registry = registry
+        registry.add_commit_listener(self.record)
+        registry.add_delete_listener(self.forget)
+        threading.Thread(target=self._run, name="lobby-journal", daemon=True).start()
+
+        for lobby_code in restored:
+            with registry.locked(lobby_code) as lobby:
+                if lobby is not None:
+                    game_engine.resume(lobby)
+
+    def _snapshot(self):
+        """Write the journaled lobby states as the snapshot and empty the journal."""
+        if self._file:
+            self._file.close()
+        temporary = self._path(SNAPSHOT_FILE + ".tmp")
+        with open(temporary, "w", encoding="utf-8") as snapshot:
+            json.dump(
+                {"lobbies": self._lobbies, "questions": self._questions}, snapshot
+            )
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.replace(temporary, self._path(SNAPSHOT_FILE))
+        self._file = open(  # pylint: disable=consider-using-with
+            self._path(JOURNAL_FILE), "w", encoding="utf-8"
+        )
+        self.stats["snapshots"] += 1
+
+    def _run(self):
+        """Append queued records in batches, one fsync per batch."""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.commit_interval
+            while (wait := deadline - time.monotonic()) > 0:
+                try:
+                    batch.append(self._queue.get(timeout=wait))
+                except queue.Empty:
+                    break
+
+            try:
+                lines = [
+                    json.dumps(record, separators=(",", ":")) + "\n"
+                    for item in batch
+                    for record in self._records(*item)
+                ]
+                if not lines:
+                    continue
+                data = "".join(lines)
+                self._file.write(data)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self.stats["records"] += len(lines)
+                self.stats["bytes"] += len(data.encode())
+                self.stats["commits"] += 1
+                if self._file.tell() > self.snapshot_bytes:
+                    self._snapshot()
+            except Exception as e:  # pylint: disable=broad-except
+                logging.error(f"Lobby journal write failed: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+def start_lobby_journal(directory=None):
+    """
+    Restore lobbies from the journal in a directory and journal their changes.
+
+    Args:
+        directory (str, optional): The journal directory. Defaults to the
+            LOBBY_JOURNAL_DIR environment variable; without one nothing is journaled.
+
+    Returns:
+        LobbyJournal: The started journal, or None
+    """
+    global lobby_journal  # pylint: disable=global-statement
+    directory = directory or os.getenv("LOBBY_JOURNAL_DIR")
+    if not directory:
+        return None
+    if lobby_journal is None:
+        lobby_journal = LobbyJournal(directory)
+    lobby_journal.start(lobby_registry)
+    return lobby_journal
+
+
+def get_journal_stats():
+    """Return the lobby journal counters, or None if lobbies are not journaled."""
+    return lobby_journal.get_stats() if lobby_journal else None
+
+
+# The journal of this process, once started
+lobby_journal = None
@@ -0,0 +1,81 @@
+"""Utility module ranking players by score as their scores change."""
+
+from sortedcontainers import SortedList
+
+
+class Leaderboard:
+    """
+    Incremental ranking of scores by key.
+
+    Entries are kept in a sorted list ordered by descending score, so a score
+    update, a key's rank and the top K are O(log n) instead of a sort of every
+    player per question. Equal scores share a rank, the standard competition
+    ranking (1, 2, 2, 4). Keys are opaque, so the same structure can rank
+    players across lobbies by keying them with their lobby code.
+
+    Args:
+        scores (iterable, optional): Initial (key, score) pairs
+    """
+
+    __slots__ = ("_entries", "_scores")
+
+    def __init__(self, scores=()):
+        self._scores = dict(scores)
+        self._entries = SortedList((-score, key) for key, score in self._scores.items())
+
+    def update(self, key, score):
+        """Set the score of a key, adding the key if it is new."""
+        old = self._scores.get(key)
+        if old == score:
+            return
+        if old is not None:
+            self._entries.remove((-old, key))
+        self._scores[key] = score
+        self._entries.add((-score, key))
+
+    def remove(self, key):
+        """Remove a key, if it is ranked."""
+        score = self._scores.pop(key, None)
+        if score is not None:
+            self._entries.remove((-score, key))
+
+    def score(self, key):
+        """Return the score of a key, or None if it is not ranked."""
+        return self._scores.get(key)
+
+    def rank(self, key):
+        """Return the rank of a key, starting at 1, or None if it is not ranked."""
+        score = self._scores.get(key)
+        if score is None:
+            return None
+        # Every entry before the first one with this score has a higher score
+        return self._entries.bisect_left((-score,)) + 1
+
+    def top(self, count=None):
+        """
+        Return the highest ranked entries.
+
+        Args:
+            count (int, optional): How many entries. Defaults to all of them.
+
+        Returns:
+            list: (rank, key, score) tuples by rank
+        """
+        ranked = []
+        for index, (negative, key) in enumerate(self._entries.islice(stop=count)):
+            if ranked and ranked[-1][2] == -negative:
+                rank = ranked[-1][0]
+            else:
+                rank = index + 1
+            ranked.append((rank, key, -negative))
+        return ranked
+
+    def ranks(self):
+        """Return the rank of every key, walking the sorted entries once."""
+        return {key: rank for rank, key, _ in self.top()}
+
+    def __contains__(self, key):
+        return key in self._scores
+
+    def __len__(self):
+        return len(self._scores)
@@ -1,27 +1,310 @@
 """Utility functions for multiplayer lobby management."""
 
+import heapq
+import os
 import uuid
 import random
 import time
 import threading
 import logging
-import json
-from flask import jsonify
+from contextlib import contextmanager
+from api.utils.multiplayer_emitter import event_emitter
+from api.utils.multiplayer_shard import lobby_router
+from api.utils.multiplayer_store import MemoryLobbyStore, create_lobby_store
 
 # Game states
 GAME_STATE = {
     "LOBBY": "lobby",
+    "GENERATING": "generating",
     "QUESTION": "question",
     "WAITING": "waiting",
     "SCOREBOARD": "scoreboard",
     "GAME_OVER": "game_over",
 }
 
-# In-memory storage for active lobbies
-active_lobbies = {}
+# Seconds without activity after which a lobby is removed
+LOBBY_IDLE_TIMEOUT = 3600
+
+# Seconds between sweeps for players whose socket sessions are gone
+ORPHAN_SWEEP_INTERVAL = 60
+
+# Seconds a disconnected player is kept so a page refresh can reconnect
+ORPHAN_GRACE_PERIOD = 30
+
+# Players a lobby holds, and a lobby in large-room mode for events and classrooms
+MAX_PLAYERS = 8
+LARGE_ROOM_MAX_PLAYERS = 2000
+
+
+class LobbyRegistry:
+    """
+    Lobby storage with a registry lock and one lock per lobby.
+
+    The registry lock is only held briefly to create, look up or delete a lobby,
+    never while waiting for a lobby lock, so unrelated lobbies never contend.
+    Lobby state is only read or mutated while holding that lobby's lock, and a
+    lobby is only deleted while its lock is held. The lock order is therefore
+    always lobby lock before registry lock.
+
+    Lobbies are kept in a LobbyStore. The lobby locks only serialize the
+    updates of this process; a store shared by several workers saves each
+    update with a compare-and-set on the lobby's revision instead, and raises
+    LobbyConflict from `locked` when another worker saved the lobby first.
+
+    The registry also indexes socket session ids to (lobby_code, player_id), so
+    a session's player is found without scanning every lobby. Sessions are
+    local to the worker their socket is connected to.
+
+    Args:
+        store (LobbyStore, optional): Where lobbies are kept. Defaults to this process.
+    """
+
+    def __init__(self, store=None):
+        self.store = store if store is not None else MemoryLobbyStore()
+        self.lobbies = self.store.lobbies
+        self.sessions = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._held = threading.local()
+        self._commit_listeners = []
+        self._delete_listeners = []
+
+    def create(self, build_lobby):
+        """
+        Reserve a fresh lobby code and store the lobby built for it.
+
+        Args:
+            build_lobby (callable): Function taking the lobby code and returning the lobby
+
+        Returns:
+            Lobby: The stored lobby
+        """
+        with self._lock:
+            while True:
+                lobby = build_lobby(generate_lobby_code())
+                # Another worker may have taken the code in the meantime
+                if self.store.create(lobby):
+                    break
+            self._committed(lobby)
+            self._locks[lobby.lobby_code] = threading.RLock()
+            return lobby
+
+    def adopt(self, lobby):
+        """
+        Store a lobby handed over by another node under its own code.
+
+        Args:
+            lobby (Lobby): The lobby
+
+        Returns:
+            bool: Whether the lobby was stored, False if its code is taken
+        """
+        with self._lock:
+            if not self.store.create(lobby):
+                return False
+            self._committed(lobby)
+            self._locks[lobby.lobby_code] = threading.RLock()
+            return True
+
+    def _held_lobbies(self):
+        """Return the lobbies whose lock the current thread holds, by code."""
+        held = getattr(self._held, "lobbies", None)
+        if held is None:
+            held = self._held.lobbies = {}
+        return held
+
+    @contextmanager
+    def locked(self, lobby_code):
+        """
+        Hold a lobby's lock for the duration of the block.
+
+        The lobby is loaded from the store when the outermost block for it is
+        entered and saved when that block exits without an exception.
+
+        Yields:
+            Lobby: The lobby, or None if it does not exist or was deleted while waiting
+
+        Raises:
+            LobbyConflict: If another worker saved the lobby during the block
+        """
+        with self._lock:
+            lock = self._locks.get(lobby_code)
+
+        if lock is None:
+            # The lobby may have been created by another worker
+            if lobby_code not in self.store:
+                yield None
+                return
+            with self._lock:
+                lock = self._locks.setdefault(lobby_code, threading.RLock())
+
+        # Events broadcast in the block are only written once the lock is released
+        with event_emitter.transaction(), lock:
+            held = self._held_lobbies()
+            if lobby_code in held:
+                yield held[lobby_code]
+                return
+
+            # The lobby may have been deleted, or its code reused, while we waited
+            lobby = (
+                self.store.load(lobby_code)
+                if self._locks.get(lobby_code) is lock
+                else None
+            )
+            if lobby is None:
+                yield None
+                return
+
+            held[lobby_code] = lobby
+            try:
+                yield lobby
+                if self._locks.get(lobby_code) is lock:
+                    self.store.save(lobby)
+                    self._committed(lobby)
+            except BaseException:
+                self.store.discard(lobby_code)
+                raise
+            finally:
+                del held[lobby_code]
+
+    def peek(self, lobby_code, read):
+        """
+        Call a function with a lobby while holding its lock, without committing.
+
+        Nothing is saved and no commit listener runs, so readers like the
+        journal writer can copy a lobby without being reported as an update.
+
+        Args:
+            lobby_code (str): The code of the lobby
+            read (callable): Function taking the lobby
+
+        Returns:
+            The function's result, or None if the lobby does not exist
+        """
+        with self._lock:
+            lock = self._locks.get(lobby_code)
+        if lock is None:
+            return None
+
+        with lock:
+            lobby = self._held_lobbies().get(lobby_code)
+            if lobby is None and self._locks.get(lobby_code) is lock:
+                lobby = self.store.load(lobby_code)
+            return None if lobby is None else read(lobby)
+
+    def delete(self, lobby_code):
+        """Delete a lobby and its sessions. The caller must hold the lobby's lock."""
+        lobby = self._held_lobbies().get(lobby_code) or self.store.load(lobby_code)
+        with self._lock:
+            self.store.delete(lobby_code)
+            self._locks.pop(lobby_code, None)
+            for player in lobby.players if lobby else []:
+                self._unbind(player.session_id, lobby_code)
+
+        for listener in self._delete_listeners:
+            listener(lobby_code)
+
+    def add_delete_listener(self, listener):
+        """Call a function with the lobby code whenever a lobby is deleted."""
+        self._delete_listeners.append(listener)
+
+    def add_commit_listener(self, listener):
+        """
+        Call a function with the lobby whenever a lobby update is committed.
+
+        Listeners run while the lobby's lock is still held, so they see each
+        lobby's updates in order.
+        """
+        self._commit_listeners.append(listener)
+
+    def _committed(self, lobby):
+        """Notify the commit listeners of a committed lobby update."""
+        for listener in self._commit_listeners:
+            listener(lobby)
+
+    def bind_session(self, session_id, lobby_code, player):
+        """
+        Point a session at a player, replacing the player's previous session.
+
+        The caller must hold the lobby's lock.
+        """
+        with self._lock:
+            if player.session_id != session_id:
+                self._unbind(player.session_id, lobby_code)
+            player.session_id = session_id
+            player.disconnected_at = None
+            self.sessions[session_id] = (lobby_code, player.id)
+
+    def unbind_session(self, session_id, lobby_code):
+        """Forget a session if it still points into the given lobby."""
+        with self._lock:
+            self._unbind(session_id, lobby_code)
+
+    def _unbind(self, session_id, lobby_code):
+        """Drop a session of a lobby. The caller must hold the registry lock."""
+        if session_id and self.sessions.get(session_id, (None,))[0] == lobby_code:
+            del self.sessions[session_id]
+
+    def session(self, session_id):
+        """Return the (lobby_code, player_id) of a session, or None."""
+        return self.sessions.get(session_id)
+
+    def session_snapshot(self):
+        """Return a snapshot of the session index."""
+        with self._lock:
+            return dict(self.sessions)
+
+    def __contains__(self, lobby_code):
+        return lobby_code in self.store
+
+    def __len__(self):
+        return len(self.store)
+
+    def codes(self):
+        """Return a snapshot of the active lobby codes."""
+        return self.store.codes()
+
+
+# Storage for active lobbies, shared by every worker if LOBBY_STORE_URL is set
+lobby_registry = LobbyRegistry(create_lobby_store(os.getenv("LOBBY_STORE_URL")))
+active_lobbies = lobby_registry.lobbies
+
+
+def add_player(lobby, player):
+    """Add a player to a lobby, its indexes and its leaderboard. Hold the lobby lock."""
+    lobby.players.append(player)
+    lobby.players_by_name[player.name] = player
+    lobby.players_by_id[player.id] = player
+    lobby.leaderboard.update(player.id, player.score)
+
+
+def remove_player(lobby, player):
+    """Remove a player from a lobby, its indexes and the session index."""
+    lobby.players.remove(player)
+    del lobby.players_by_name[player.name]
+    del lobby.players_by_id[player.id]
+    # Keep the open question's answered count to the remaining players
+    lobby.answered.get(lobby.current_question_idx, set()).discard(player.id)
+    # Players leaving a finished game keep their place in the final results
+    if lobby.final_players is None:
+        lobby.leaderboard.remove(player.id)
+    lobby_registry.unbind_session(player.session_id, lobby.lobby_code)
+
+
+def find_player(lobby, player_name):
+    """Return the player of a lobby with the given name, or None."""
+    return lobby.players_by_name.get(player_name)
+
+
+def is_large_room(lobby):
+    """Return whether a lobby is in large-room mode."""
+    return bool(lobby.settings.get("largeRoom"))
+
+
+def max_players(lobby):
+    """Return the number of players a lobby holds."""
+    return LARGE_ROOM_MAX_PLAYERS if is_large_room(lobby) else MAX_PLAYERS
 
-# Lock for thread-safe operations on the lobbies dictionary
-lobbies_lock = threading.Lock()
 
 # Import active_sessions from socket_server - this helps prevent circular imports
 # while still allowing us to access the sessions map
@@ -34,61 +317,186 @@ def init_active_sessions(sessions_map):
     active_sessions = sessions_map
 
 
-def cleanup_inactive_lobbies():
-    """Remove lobbies that have been inactive for over an hour."""
-    with lobbies_lock:
-        current_time = time.time()
-        inactive_lobbies = []
+class LobbyLifecycle:
+    """
+    Background reaper of idle lobbies and players whose sessions are gone.
+
+    Lobby expiry deadlines are kept in a min-heap, so the scheduler sleeps until
+    the earliest deadline and pops expired entries in O(log n). Activity touches
+    only update `last_activity`; a popped entry whose lobby was touched since is
+    pushed back with its new deadline, which keeps touches free of heap work.
+    """
+
+    def __init__(
+        self,
+        registry,
+        idle_timeout=LOBBY_IDLE_TIMEOUT,
+        orphan_interval=ORPHAN_SWEEP_INTERVAL,
+    ):
+        self.registry = registry
+        self.idle_timeout = idle_timeout
+        self.orphan_interval = orphan_interval
+        self.stats = {"lobbies_expired": 0, "players_reaped": 0, "rescheduled": 0}
+        self._deadlines = []  # heap of (deadline, lobby_code)
+        self._condition = threading.Condition()
+        self._started = False
+
+    def track(self, lobby_code, last_activity):
+        """Schedule a lobby to expire `idle_timeout` seconds after its last activity."""
+        with self._condition:
+            heapq.heappush(
+                self._deadlines, (last_activity + self.idle_timeout, lobby_code)
+            )
+            self._condition.notify()
+
+    def reap_expired(self, now=None):
+        """
+        Remove every lobby whose expiry deadline has passed.
 
-        for code, lobby in active_lobbies.items():
-            # If lobby hasn't been accessed in 1 hour, mark for removal
-            if current_time - lobby.get("last_activity", current_time) > 3600:
-                inactive_lobbies.append(code)
+        Args:
+            now (float, optional): The current time. Defaults to time.time().
 
-        # Remove inactive lobbies
-        for code in inactive_lobbies:
-            del active_lobbies[code]
-            logging.info(f"Removed inactive lobby: {code}")
+        Returns:
+            int: The number of lobbies removed
+        """
+        now = time.time() if now is None else now
+        reclaimed = 0
+        while True:
+            with self._condition:
+                if not self._deadlines or self._deadlines[0][0] > now:
+                    break
+                _, lobby_code = heapq.heappop(self._deadlines)
+
+            with self.registry.locked(lobby_code) as lobby:
+                # The lobby was already closed through the normal flow
+                if lobby is None:
+                    continue
+
+                if lobby.last_activity + self.idle_timeout > now:
+                    self.track(lobby_code, lobby.last_activity)
+                    self._count("rescheduled")
+                    continue
+
+                self.registry.delete(lobby_code)
+
+            reclaimed += 1
+            self._count("lobbies_expired")
+            logging.info(f"Removed inactive lobby: {lobby_code}")
+        return reclaimed
+
+    def _count(self, counter, amount=1):
+        """Increment a lifecycle counter."""
+        with self._condition:
+            self.stats[counter] += amount
+
+    def get_stats(self):
+        """Return the lifecycle counters and the number of tracked deadlines."""
+        with self._condition:
+            return dict(self.stats, tracked_deadlines=len(self._deadlines))
+
+    def start(self, socketio=None):
+        """Start the scheduler once, as a SocketIO background task if available."""
+        with self._condition:
+            if self._started:
+                return
+            self._started = True
+
+        if socketio:
+            socketio.start_background_task(self.run)
+        else:
+            threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self):
+        """Reap expired lobbies as their deadlines pass and sweep orphans periodically."""
+        next_orphan_sweep = time.monotonic() + self.orphan_interval
+        while True:
+            with self._condition:
+                wait = next_orphan_sweep - time.monotonic()
+                if self._deadlines:
+                    wait = min(wait, self._deadlines[0][0] - time.time())
+                if wait > 0:
+                    self._condition.wait(wait)
+
+            try:
+                self.reap_expired()
+                if time.monotonic() >= next_orphan_sweep:
+                    next_orphan_sweep = time.monotonic() + self.orphan_interval
+                    self._count("players_reaped", cleanup_orphaned_players())
+            except Exception as e:  # pylint: disable=broad-except
+                logging.error(f"Lobby lifecycle sweep failed: {str(e)}")
+
+
+lobby_lifecycle = LobbyLifecycle(lobby_registry)
+
+
+def get_lifecycle_stats():
+    """Return the counters of reclaimed lobbies and players."""
+    return lobby_lifecycle.get_stats()
+
+
+def cleanup_inactive_lobbies():
+    """Remove lobbies that have been inactive for over LOBBY_IDLE_TIMEOUT seconds."""
+    return lobby_lifecycle.reap_expired()
 
 
 def cleanup_orphaned_players():
     """
     Clean up players whose sessions are no longer active.
     This handles cases where browser crashes or refreshes don't trigger proper disconnects.
+
+    Returns:
+        int: The number of players removed
     """
     if active_sessions is None:
         logging.warning(
             "Active sessions not initialized, skipping orphaned player cleanup"
         )
-        return
+        return 0
+
+    # Get all active session IDs
+    active_sids = set(active_sessions.keys())
+    now = time.time()
 
-    with lobbies_lock:
-        # Get all active session IDs
-        active_sids = set(active_sessions.keys())
+    # Check every session bound to a player against the active sessions
+    orphaned = []
+    for session_id, (
+        lobby_code,
+        player_id,
+    ) in lobby_registry.session_snapshot().items():
+        if session_id in active_sids:
+            continue
+        with lobby_registry.locked(lobby_code) as lobby:
+            player = lobby and lobby.players_by_id.get(player_id)
+            if (
+                player
+                and player.session_id == session_id
+                and now - (player.disconnected_at or 0) > ORPHAN_GRACE_PERIOD
+            ):
+                logging.info(
+                    f"Found orphaned player {player.name} in lobby {lobby_code}"
+                )
+                orphaned.append((lobby_code, player.name))
 
-        # Scan all lobbies and players to check for orphaned players
-        for lobby_code, lobby in list(active_lobbies.items()):
-            for player in list(lobby["players"]):
-                player_sid = player.get("session_id")
-                # If player has a session ID but it's no longer active
-                if player_sid and player_sid not in active_sids:
-                    logging.info(
-                        f"Found orphaned player {player['name']} in lobby {lobby_code}"
-                    )
-                    # Remove player through the normal mechanism
-                    # We need to be careful to avoid deadlocks here
-                    from api.services.multiplayer_service import leave_lobby
+    # Remove players through the normal mechanism, outside of the lobby locks
+    from api.services.multiplayer_service import leave_lobby
 
-                    leave_lobby(lobby_code, player["name"])
+    removed = 0
+    for lobby_code, player_name in orphaned:
+        if leave_lobby(lobby_code, player_name)[1] == 200:
+            removed += 1
+    return removed
 
 
 def generate_lobby_code():
-    """Generate a unique 6-character lobby code."""
+    """
+    Generate a unique 6-character lobby code owned by this node.
+
+    Called with the registry lock held.
+    """
     while True:
         code = "".join(random.choices("ABCDEFGHJKLMNPQRSTUVWXYZ23456789", k=6))
-        with lobbies_lock:
-            if code not in active_lobbies:
-                return code
+        if lobby_router.owns(code) and code not in lobby_registry:
+            return code
 
 
 def get_active_lobbies():
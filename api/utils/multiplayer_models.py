@@ -0,0 +1,315 @@
+"""Utility module for the compact in-memory lobby, player and answer records."""
+
+from dataclasses import dataclass, field
+from enum import IntEnum
+from api.utils.multiplayer_lobby import GAME_STATE
+from api.utils.multiplayer_leaderboard import Leaderboard
+
+# Answer choice of a player who picked none of the question's options
+NO_CHOICE = -1
+
+
+class AnswerOutcome(IntEnum):
+    """How a player's answer to a question turned out."""
+
+    INCORRECT = 0
+    CORRECT = 1
+    TIMED_OUT = 2
+
+
+@dataclass(slots=True, frozen=True)
+class Answer:
+    """
+    A player's answer, referencing the lobby's question by index.
+
+    The question text, options and correct answer are stored once in the lobby
+    and only joined back in by serialize_answers.
+    """
+
+    question_index: int
+    choice: int
+    outcome: AnswerOutcome
+    score: int = 0
+    time_taken: float = 0.0
+
+
+@dataclass(slots=True)
+class Player:
+    """A player of a multiplayer lobby."""
+
+    id: str
+    name: str
+    avatar: str
+    is_host: bool = False
+    ready: bool = False
+    current_question: int = 0
+    score: int = 0
+    correct_answers: int = 0
+    total_questions: int = 0
+    answers: list = field(default_factory=list)
+    session_id: str = None
+    disconnected_at: float = None
+
+
+@dataclass(slots=True)
+class Lobby:
+    """
+    A multiplayer lobby and the state of its game.
+
+    Flags older clients expect, like game_started or all_answers_received, are
+    derived from game_state instead of being stored alongside it.
+    """
+
+    lobby_code: str
+    host_id: str
+    settings: dict
+    created_at: float
+    last_activity: float
+    game_state: str = GAME_STATE["LOBBY"]
+    current_question_idx: int = -1
+    version: int = 0
+    # Bumped on every change to the lobby or its game, for conditional requests
+    state_version: int = 0
+    players: list = field(default_factory=list)
+    players_by_name: dict = field(default_factory=dict)
+    players_by_id: dict = field(default_factory=dict)
+    # Questions as stored by the quiz generator: [questions_list, status_code]
+    questions: list = field(default_factory=list)
+    # Ids of the players who answered, by question index
+    answered: dict = field(default_factory=dict)
+    # Players at the end of the game, kept for the results of those who leave
+    final_players: list = None
+    generation_id: str = None
+    question_deadline: float = None
+    # Ranking of the player ids by score, of the final players once the game is over
+    leaderboard: Leaderboard = field(
+        default_factory=Leaderboard, repr=False, compare=False
+    )
+
+    @property
+    def game_started(self):
+        """Whether the questions are installed and the game is under way or over."""
+        return self.game_state not in (GAME_STATE["LOBBY"], GAME_STATE["GENERATING"])
+
+    @property
+    def game_over(self):
+        """Whether the last question has been closed."""
+        return self.game_state == GAME_STATE["GAME_OVER"]
+
+    @property
+    def all_answers_received(self):
+        """Whether the current question is closed."""
+        return self.game_state in (GAME_STATE["SCOREBOARD"], GAME_STATE["GAME_OVER"])
+
+    @property
+    def waiting_for_next_question(self):
+        """Whether the answers are revealed and the next question follows."""
+        return self.game_state == GAME_STATE["SCOREBOARD"]
+
+    @property
+    def questions_list(self):
+        """The list of questions of the game."""
+        return self.questions[0] if self.questions else []
+
+
+def choice_of(question, answer):
+    """Return the index of an answer among a question's options, or NO_CHOICE."""
+    try:
+        return question["options"].index(answer)
+    except ValueError:
+        return NO_CHOICE
+
+
+def is_correct_choice(question, answer):
+    """Whether an answer is the correct one, given as its option or its letter."""
+    correct_answer = question.get("correct_answer")
+    if answer == correct_answer:
+        return True
+    choice = choice_of(question, answer)
+    return choice != NO_CHOICE and chr(ord("A") + choice) == correct_answer
+
+
+def serialize_answers(player, questions_list):
+    """
+    Return a player's answers in the API answer format.
+
+    Answers are serialized on every call rather than kept, so a lobby holds its
+    question fields once no matter how often its results are sent.
+
+    Args:
+        player (Player): The player
+        questions_list (list): The questions the answers refer to
+
+    Returns:
+        list: The answers as dictionaries
+    """
+    serialized_answers = []
+    for answer in player.answers:
+        question = questions_list[answer.question_index]
+        serialized = {
+            "question_index": answer.question_index,
+            "question": question["question"],
+            "userAnswer": (
+                question["options"][answer.choice] if answer.choice != NO_CHOICE else ""
+            ),
+            "correctAnswer": question["correct_answer"],
+            "isCorrect": answer.outcome == AnswerOutcome.CORRECT,
+            "score": answer.score,
+            "timeTaken": answer.time_taken,
+        }
+        if answer.outcome == AnswerOutcome.TIMED_OUT:
+            serialized["timedOut"] = True
+        serialized_answers.append(serialized)
+    return serialized_answers
+
+
+def serialize_player(player, questions_list=None):
+    """
+    Return a player in the API player format.
+
+    Args:
+        player (Player): The player
+        questions_list (list, optional): The questions of the game, to include
+            the player's answers. Defaults to None.
+
+    Returns:
+        dict: The player as a dictionary
+    """
+    serialized = {
+        "id": player.id,
+        "name": player.name,
+        "isHost": player.is_host,
+        "avatar": player.avatar,
+        "ready": player.ready,
+        "currentQuestion": player.current_question,
+        "score": player.score,
+        "correctAnswers": player.correct_answers,
+        "totalQuestions": player.total_questions,
+    }
+    if questions_list is not None:
+        serialized["answers"] = serialize_answers(player, questions_list)
+    return serialized
+
+
+def serialize_results(lobby):
+    """Return the final results of a finished game by rank, with every player's answers."""
+    players = {p.id: p for p in lobby.final_players or lobby.players}
+    return [
+        dict(serialize_player(players[player_id], lobby.questions_list), rank=rank)
+        for rank, player_id, _ in lobby.leaderboard.top()
+        if player_id in players
+    ]
+
+
+# Player fields kept when a lobby is stored outside of this process
+_STORED_PLAYER_FIELDS = (
+    "id",
+    "name",
+    "avatar",
+    "is_host",
+    "ready",
+    "current_question",
+    "score",
+    "correct_answers",
+    "total_questions",
+    "session_id",
+    "disconnected_at",
+)
+
+
+def _player_state(player):
+    """Return a player as JSON-compatible data, with answers as compact lists."""
+    state = {name: getattr(player, name) for name in _STORED_PLAYER_FIELDS}
+    state["answers"] = [
+        [a.question_index, a.choice, int(a.outcome), a.score, a.time_taken]
+        for a in player.answers
+    ]
+    return state
+
+
+def _player_from_state(state):
+    """Rebuild a player from the data returned by _player_state."""
+    answers = [
+        Answer(index, choice, AnswerOutcome(outcome), score, time_taken)
+        for index, choice, outcome, score, time_taken in state["answers"]
+    ]
+    return Player(
+        answers=answers, **{name: state[name] for name in _STORED_PLAYER_FIELDS}
+    )
+
+
+def lobby_state(lobby):
+    """
+    Return a lobby as JSON-compatible data, for lobby stores outside this process.
+
+    Args:
+        lobby (Lobby): The lobby
+
+    Returns:
+        dict: The lobby's data; lobby_from_state rebuilds the lobby from it
+    """
+    return {
+        "lobby_code": lobby.lobby_code,
+        "host_id": lobby.host_id,
+        "settings": lobby.settings,
+        "created_at": lobby.created_at,
+        "last_activity": lobby.last_activity,
+        "game_state": lobby.game_state,
+        "current_question_idx": lobby.current_question_idx,
+        "version": lobby.version,
+        "state_version": lobby.state_version,
+        "players": [_player_state(p) for p in lobby.players],
+        "questions": lobby.questions,
+        "answered": [[index, sorted(ids)] for index, ids in lobby.answered.items()],
+        # Players who left after the game ended are only in the final results
+        "final_players": (
+            None
+            if lobby.final_players is None
+            else [
+                p.id if p.id in lobby.players_by_id else _player_state(p)
+                for p in lobby.final_players
+            ]
+        ),
+        "generation_id": lobby.generation_id,
+        "question_deadline": lobby.question_deadline,
+    }
+
+
+def lobby_from_state(state):
+    """
+    Rebuild a lobby from the data returned by lobby_state.
+
+    Args:
+        state (dict): The lobby's data
+
+    Returns:
+        Lobby: The lobby, with its player indexes rebuilt
+    """
+    players = [_player_from_state(p) for p in state["players"]]
+    players_by_id = {p.id: p for p in players}
+    final_players = state["final_players"]
+    if final_players is not None:
+        final_players = [
+            players_by_id[p] if isinstance(p, str) else _player_from_state(p)
+            for p in final_players
+        ]
+    return Lobby(
+        lobby_code=state["lobby_code"],
+        host_id=state["host_id"],
+        settings=state["settings"],
+        created_at=state["created_at"],
+        last_activity=state["last_activity"],
+        game_state=state["game_state"],
+        current_question_idx=state["current_question_idx"],
+        version=state["version"],
+        state_version=state["state_version"],
+        players=players,
+        players_by_name={p.name: p for p in players},
+        players_by_id=players_by_id,
+        questions=state["questions"],
+        answered={index: set(ids) for index, ids in state["answered"]},
+        final_players=final_players,
+        generation_id=state["generation_id"],
+        question_deadline=state["question_deadline"],
+        leaderboard=Leaderboard((p.id, p.score) for p in final_players or players),
+    )
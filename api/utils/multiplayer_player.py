@@ -1,18 +1,32 @@
 """Utility functions for multiplayer player management."""
 
 import logging
+import threading
 import time
-from api.utils.multiplayer_lobby import active_lobbies, lobbies_lock, GAME_STATE
-from api.utils.multiplayer_broadcast import (
-    broadcast_player_answered,
-    broadcast_all_answers_in,
-    broadcast_scoreboard,
-    broadcast_game_over,
-    broadcast_lobby_update,
-    broadcast_question,
+from api.utils.multiplayer_lobby import (
+    lobby_registry,
+    GAME_STATE,
+    find_player,
+    remove_player,
 )
+from api.utils.multiplayer_broadcast import broadcast_lobby_delta, lobby_snapshot
+from api.utils.multiplayer_emitter import event_emitter
+from api.utils.multiplayer_engine import game_engine, all_players_answered
+from api.utils.multiplayer_models import serialize_player, serialize_results
+from api.utils.multiplayer_store import retry_on_conflict
 
+# Seconds a long poll of the game state waits for a change before answering 304
+LONG_POLL_TIMEOUT = 25
 
+# Seconds between a waiting long poll's checks of the store, which sees changes
+# committed by other workers
+LONG_POLL_RECHECK = 1
+
+# Long polls of the game state that may wait at once, each holding a thread
+LONG_POLL_MAX_WAITERS = 256
+
+
+@retry_on_conflict
 def leave_lobby(lobby_code, player_name):
     """
     Leave a multiplayer lobby.
@@ -24,82 +38,64 @@ def leave_lobby(lobby_code, player_name):
     Returns:
         tuple: A tuple containing success message and status code, or error message and status code
     """
-    with lobbies_lock:
+    with lobby_registry.locked(lobby_code) as lobby:
         # Check if lobby exists
-        if lobby_code not in active_lobbies:
+        if lobby is None:
             return {"error": "Lobby not found"}, 404
 
-        lobby = active_lobbies[lobby_code]
-
-        # Find player index
-        player_index = -1
-        player_id = None
-        for i, player in enumerate(lobby["players"]):
-            if player["name"] == player_name:
-                player_index = i
-                player_id = player["id"]
-                break
-
-        if player_index == -1:
+        # Find player
+        player = find_player(lobby, player_name)
+        if player is None:
             return {"error": "Player not found in lobby"}, 404
+        player_id = player.id
 
         # If the player is the host and the game hasn't started, close the lobby
-        if (
-            lobby["players"][player_index]["isHost"]
-            and lobby["game_state"] == GAME_STATE["LOBBY"]
+        if player.is_host and lobby.game_state in (
+            GAME_STATE["LOBBY"],
+            GAME_STATE["GENERATING"],
         ):
-            del active_lobbies[lobby_code]
+            lobby_registry.delete(lobby_code)
 
             # Need to broadcast to everyone else that lobby is closing
-            from api.socket_server import socketio
-
-            if socketio:
-                socketio.emit(
-                    "lobby_closed",
-                    {
-                        "message": "The host has closed the lobby",
-                        "lobby_code": lobby_code,
-                    },
-                    room=lobby_code,
-                )
+            event_emitter.emit(
+                "lobby_closed",
+                {
+                    "message": "The host has closed the lobby",
+                    "lobby_code": lobby_code,
+                },
+                room=lobby_code,
+            )
         else:
             # Otherwise just remove the player
-            removed_player = lobby["players"].pop(player_index)
+            remove_player(lobby, player)
             logging.info(f"Removed player {player_name} from lobby {lobby_code}")
 
             # If no players left, remove the lobby
-            if not lobby["players"]:
+            if not lobby.players:
                 logging.info(f"No players left in lobby {lobby_code}, removing it")
-                del active_lobbies[lobby_code]
+                lobby_registry.delete(lobby_code)
             else:
+                # The remaining players may all have answered the open question
+                if all_players_answered(lobby, lobby.current_question_idx):
+                    game_engine.close_question(lobby, lobby.current_question_idx)
+
                 # Update last activity
-                lobby["last_activity"] = time.time()
+                lobby.last_activity = time.time()
 
                 # Explicitly broadcast player_left event for immediate UI updates
-                from api.socket_server import socketio
-
-                if socketio:
-                    # First emit specific player_left event
-                    socketio.emit(
-                        "player_left",
-                        {"name": player_name, "id": player_id, "lobbyCode": lobby_code},
-                        room=lobby_code,
-                    )
-
-                    # Then emit a complete lobby update for synchronization
-                    socketio.emit(
-                        "lobby_update",
-                        {"players": lobby["players"], "settings": lobby["settings"]},
-                        room=lobby_code,
-                    )
-
-                    logging.info(
-                        f"Broadcasted player_left and lobby_update for {player_name} in {lobby_code}"
-                    )
+                event_emitter.emit(
+                    "player_left",
+                    {"name": player_name, "id": player_id, "lobbyCode": lobby_code},
+                    room=lobby_code,
+                )
+
+                # Then broadcast the removal as a lobby update for synchronization
+                broadcast_lobby_delta(lobby, removed_players=[player_id])
 
     return {"success": True}, 200
 
 
+@retry_on_conflict
 def get_lobby_info(lobby_code):
     """
     Get information about a lobby without questions.
@@ -110,69 +106,189 @@ def get_lobby_info(lobby_code):
     Returns:
         tuple: A tuple containing lobby info and status code, or error message and status code
     """
-    with lobbies_lock:
+    with lobby_registry.locked(lobby_code) as lobby:
         # Check if lobby exists
-        if lobby_code not in active_lobbies:
+        if lobby is None:
             return {"error": "Lobby not found"}, 404
 
-        lobby = active_lobbies[lobby_code]
-
         # Update last activity
-        lobby["last_activity"] = time.time()
+        lobby.last_activity = time.time()
 
-        # Return lobby info without questions (for backward compatibility)
-        return {
-            "lobby_code": lobby["lobby_code"],
-            "game_started": lobby["game_state"] != GAME_STATE["LOBBY"],
-            "game_state": lobby["game_state"],
-            "current_question_idx": lobby["current_question_idx"],
-            "players": lobby["players"],
-            "settings": lobby["settings"],
-        }, 200
+        # Return a lobby snapshot without questions or answer histories
+        return (
+            dict(
+                lobby_snapshot(lobby),
+                game_started=lobby.game_started,
+                current_question_idx=lobby.current_question_idx,
+            ),
+            200,
+        )
 
 
-def get_game_state(lobby_code):
+class GameStateWatch:
     """
-    Get the full game state including questions.
+    Wakes long polls of a lobby's game state once its state version changes.
+
+    A poll registers while it holds the lobby lock and commit listeners run
+    before the lock is released, so no change slips in between a poll's
+    version check and its wait. Polls also recheck every LONG_POLL_RECHECK
+    seconds, for changes committed by other workers.
+
+    Args:
+        max_waiters (int, optional): Long polls that may wait at once; polls
+            past it answer right away, as conditional requests do
+    """
+
+    def __init__(self, max_waiters=LONG_POLL_MAX_WAITERS):
+        self.max_waiters = max_waiters
+        self._lock = threading.Lock()
+        self._waiters = {}  # lobby_code -> {event: state version seen}
+        self._count = 0
+
+    def watch(self, lobby):
+        """
+        Register a wait for the lobby's state version to change. Hold the lobby lock.
+
+        Returns:
+            threading.Event: Set once the version changes, or None if too
+                many polls already wait
+        """
+        with self._lock:
+            if self._count >= self.max_waiters:
+                return None
+            event = threading.Event()
+            self._waiters.setdefault(lobby.lobby_code, {})[event] = lobby.state_version
+            self._count += 1
+            return event
+
+    def unwatch(self, lobby_code, event):
+        """Remove a wait registered by watch."""
+        with self._lock:
+            waiters = self._waiters.get(lobby_code, {})
+            if waiters.pop(event, None) is not None:
+                self._count -= 1
+            if not waiters:
+                self._waiters.pop(lobby_code, None)
+
+    def committed(self, lobby):
+        """Commit listener waking the polls whose version is out of date."""
+        with self._lock:
+            for event, version in self._waiters.get(lobby.lobby_code, {}).items():
+                if version != lobby.state_version:
+                    event.set()
+
+    def deleted(self, lobby_code):
+        """Delete listener waking every poll of a deleted lobby."""
+        with self._lock:
+            for event in self._waiters.get(lobby_code, {}):
+                event.set()
+
+
+game_state_watch = GameStateWatch()
+lobby_registry.add_commit_listener(game_state_watch.committed)
+lobby_registry.add_delete_listener(game_state_watch.deleted)
+
+
+def current_question_state(lobby):
+    """Return the game state with only the current question, without its answer."""
+    questions_list = lobby.questions_list
+    question = None
+    if 0 <= lobby.current_question_idx < len(questions_list):
+        question = {
+            key: value
+            for key, value in questions_list[lobby.current_question_idx].items()
+            if key != "correct_answer"
+        }
+    return {
+        "lobby_code": lobby.lobby_code,
+        "game_over": lobby.game_over,
+        "game_state": lobby.game_state,
+        "current_question_idx": lobby.current_question_idx,
+        "all_answers_received": lobby.all_answers_received,
+        "question_deadline": lobby.question_deadline,
+        "total_questions": len(questions_list),
+        "question": question,
+        "players": [serialize_player(p) for p in lobby.players],
+    }
+
+
+def full_game_state(lobby):
+    """Return the game state with every question and every player's answers."""
+    return {
+        "lobby_code": lobby.lobby_code,
+        "game_started": True,  # For backward compatibility
+        "game_over": lobby.game_over,
+        "game_state": lobby.game_state,
+        "current_question_idx": lobby.current_question_idx,
+        "all_answers_received": lobby.all_answers_received,
+        "players": [serialize_player(p, lobby.questions_list) for p in lobby.players],
+        "questions": lobby.questions,
+    }
+
+
+# Views of the game state a client can request
+GAME_VIEWS = {
+    "full": full_game_state,
+    "current": current_question_state,
+}
+
+
+@retry_on_conflict
+def get_game_state(lobby_code, view="full", known_version=None, wait=False):
+    """
+    Get the game state, in full with questions or as the current question only.
 
     Args:
         lobby_code (str): The code of the lobby
+        view (str, optional): "full" for every question with its answer and
+            every player's answers, "current" for the current question without
+            its answer. Defaults to "full".
+        known_version (int, optional): The state version the client has. While
+            it is current, only the version is returned, with status 304.
+        wait (bool, optional): Whether to wait up to LONG_POLL_TIMEOUT seconds
+            for the state to move past known_version. Defaults to False.
 
     Returns:
         tuple: A tuple containing game info and status code, or error message and status code
     """
-    with lobbies_lock:
-        # Check if lobby exists
-        if lobby_code not in active_lobbies:
-            return {"error": "Lobby not found"}, 404
-
-        lobby = active_lobbies[lobby_code]
-
-        # Update last activity
-        lobby["last_activity"] = time.time()
+    if view not in GAME_VIEWS:
+        return {"error": f"Unknown game view: {view}"}, 400
+
+    deadline = time.monotonic() + LONG_POLL_TIMEOUT
+    while True:
+        with lobby_registry.locked(lobby_code) as lobby:
+            # Check if lobby exists
+            if lobby is None:
+                return {"error": "Lobby not found"}, 404
+
+            # Update last activity
+            lobby.last_activity = time.time()
+
+            # Check if game has started
+            if lobby.game_state in (GAME_STATE["LOBBY"], GAME_STATE["GENERATING"]):
+                return {"error": "Game has not started yet"}, 400
+
+            if lobby.state_version != known_version:
+                return (
+                    dict(GAME_VIEWS[view](lobby), version=lobby.state_version),
+                    200,
+                )
 
-        # Check if game has started
-        if lobby["game_state"] == GAME_STATE["LOBBY"]:
-            return {"error": "Game has not started yet"}, 400
+            remaining = deadline - time.monotonic()
+            changed = game_state_watch.watch(lobby) if wait and remaining > 0 else None
+            if changed is None:
+                return {"version": lobby.state_version}, 304
 
-        # Return game info with questions
-        return {
-            "lobby_code": lobby["lobby_code"],
-            "game_started": True,  # For backward compatibility
-            "game_over": lobby["game_state"] == GAME_STATE["GAME_OVER"],
-            "game_state": lobby["game_state"],
-            "current_question_idx": lobby["current_question_idx"],
-            "all_answers_received": lobby["all_answers_received"],
-            "players": lobby["players"],
-            "questions": lobby["questions"],
-        }, 200
+        try:
+            changed.wait(min(remaining, LONG_POLL_RECHECK))
+        finally:
+            game_state_watch.unwatch(lobby_code, changed)
 
 
-def submit_player_answer(
-    lobby_code, player_name, question_index, answer, time_taken, is_correct, score
-):
+@retry_on_conflict
+def submit_player_answer(lobby_code, player_name, question_index, answer, time_taken):
     """
-    Submit a player's answer to a question.
+    Submit a player's answer to a question, which the server checks and scores.
 
     Args:
         lobby_code (str): The code of the lobby
@@ -180,262 +296,42 @@ def submit_player_answer(
         question_index (int): The index of the question
         answer (str): The player's answer
         time_taken (float): How long the player took to answer
-        is_correct (bool): Whether the answer is correct
-        score (int): The score for this answer
 
     Returns:
         tuple: A tuple containing success message and status code, or error message and status code
     """
-    with lobbies_lock:
+    with lobby_registry.locked(lobby_code) as lobby:
         # Check if lobby exists
-        if lobby_code not in active_lobbies:
+        if lobby is None:
             return {"error": "Lobby not found"}, 404
 
-        lobby = active_lobbies[lobby_code]
-
-        # Check if game has started
-        if lobby["game_state"] == GAME_STATE["LOBBY"]:
-            return {"error": "Game has not started yet"}, 400
+        return game_engine.submit_answer(
+            lobby, player_name, question_index, answer, time_taken
+        )
 
-        # Check if game is over
-        if lobby["game_state"] == GAME_STATE["GAME_OVER"]:
-            return {"error": "Game is already over"}, 400
 
-        # Access the questions correctly based on the known structure
-        # The questions are stored as [questions_list, status_code]
-        questions_data = lobby["questions"]
-
-        if (
-            not questions_data
-            or not isinstance(questions_data, list)
-            or len(questions_data) < 2
-        ):
-            return {"error": "Invalid quiz data structure"}, 500
-
-        # Get the actual questions list from the first element
-        questions_list = questions_data[0]
-
-        # Check if question_index is valid
-        if question_index < 0 or question_index >= len(questions_list):
-            return {
-                "error": f"Invalid question index: {question_index} (max: {len(questions_list)-1})"
-            }, 400
-
-        # Find player
-        player_found = False
-        player_id = None
-        for player in lobby["players"]:
-            if player["name"] == player_name:
-                try:
-                    # Get the current question
-                    current_question = questions_list[question_index]
-
-                    # Log the current question for debugging
-                    logging.info(
-                        f"Question data for index {question_index}: {current_question}"
-                    )
-
-                    # Record the answer with the correct data structure
-                    player["answers"].append(
-                        {
-                            "question": current_question["question"],
-                            "userAnswer": answer,
-                            "correctAnswer": current_question["correct_answer"],
-                            "isCorrect": is_correct,
-                            "score": score,
-                        }
-                    )
-
-                    # Update player stats
-                    player["currentQuestion"] = question_index + 1
-                    # Ensure the score is added to the player's total score
-                    player["score"] += score
-                    player_id = player["id"]
-
-                    # Log the updated score for debugging
-                    logging.info(
-                        f"Player {player_name} answered Q{question_index+1}, correct: {is_correct}, score: +{score}, total: {player['score']}"
-                    )
-
-                    if is_correct:
-                        player["correctAnswers"] += 1
-
-                    player_found = True
-
-                    # Broadcast that this player has answered
-                    broadcast_player_answered(
-                        lobby_code, player_id, player_name, question_index
-                    )
-
-                    # Check if all players have answered this question
-                    all_answered = True
-                    for p in lobby["players"]:
-                        if len(p["answers"]) <= question_index:
-                            all_answered = False
-                            break
-
-                    if all_answered:
-                        logging.info(
-                            f"All players have answered question {question_index}"
-                        )
-                        lobby["all_answers_received"] = True
-
-                        # Explicitly broadcast that all answers are in
-                        broadcast_all_answers_in(lobby_code)
-
-                        # Move to scoreboard state
-                        lobby["game_state"] = GAME_STATE["SCOREBOARD"]
-
-                        # Prepare scoreboard data
-                        scoreboard_data = []
-                        for p in lobby["players"]:
-                            # Get the player's answer for this question
-                            answer_data = {}
-                            if question_index < len(p["answers"]):
-                                answer_data = p["answers"][question_index]
-
-                            scoreboard_data.append(
-                                {
-                                    "id": p["id"],
-                                    "name": p["name"],
-                                    "avatar": p["avatar"],
-                                    "isHost": p["isHost"],
-                                    "score": p["score"],
-                                    "totalCorrect": p["correctAnswers"],
-                                    "answer": answer_data.get(
-                                        "userAnswer", "Unanswered"
-                                    ),
-                                    "isCorrect": answer_data.get("isCorrect", False),
-                                    "answerScore": answer_data.get("score", 0),
-                                }
-                            )
-
-                        # Broadcast scoreboard to all players
-                        broadcast_scoreboard(lobby_code, scoreboard_data)
-
-                        # Check if this was the last question
-                        if question_index >= len(questions_list) - 1:
-                            # Set game over
-                            lobby["game_state"] = GAME_STATE["GAME_OVER"]
-                            lobby["game_over"] = True  # For backward compatibility
-
-                            # Create final results
-                            final_results = []
-                            for p in lobby["players"]:
-                                final_results.append(
-                                    {
-                                        "id": p["id"],
-                                        "name": p["name"],
-                                        "isHost": p["isHost"],
-                                        "avatar": p["avatar"],
-                                        "score": p["score"],
-                                        "correctAnswers": p["correctAnswers"],
-                                        "totalQuestions": p["totalQuestions"],
-                                        "answers": p["answers"],
-                                    }
-                                )
-
-                            # Store and broadcast final results
-                            lobby["final_results"] = final_results
-                            broadcast_game_over(lobby_code, final_results)
-                        else:
-                            # Schedule next question after delay (handled by frontend)
-                            lobby["waiting_for_next_question"] = True
-
-                    # If not all players answered, we're in waiting state
-                    else:
-                        lobby["game_state"] = GAME_STATE["WAITING"]
-
-                except Exception as e:
-                    # Log the error and return a helpful error message
-                    logging.error(f"Error accessing question data: {e}")
-                    return {"error": f"Error processing answer: {str(e)}"}, 500
-
-                break
-
-        if not player_found:
-            return {"error": "Player not found in lobby"}, 404
-
-        # Update last activity
-        lobby["last_activity"] = time.time()
-
-    return {"success": True}, 200
-
-
-def advance_to_next_question(lobby_code):
+@retry_on_conflict
+def advance_to_next_question(lobby_code, from_index=None):
     """
-    Advance the game to the next question.
+    Advance the game to the next question once the current one is closed.
 
     Args:
         lobby_code (str): The code of the lobby
+        from_index (int, optional): Only advance if this is still the current
+            question. Defaults to None.
 
     Returns:
         tuple: A tuple containing success message and status code, or error message and status code
     """
-    with lobbies_lock:
+    with lobby_registry.locked(lobby_code) as lobby:
         # Check if lobby exists
-        if lobby_code not in active_lobbies:
+        if lobby is None:
             return {"error": "Lobby not found"}, 404
 
-        lobby = active_lobbies[lobby_code]
-
-        # More lenient check for state transition - from any state except LOBBY
-        if lobby["game_state"] == GAME_STATE["LOBBY"]:
-            return {"error": "Game has not started yet"}, 400
-
-        # Set waiting_for_next_question to true so we're always ready to advance
-        lobby["waiting_for_next_question"] = True
-
-        # Get the questions list
-        questions_data = lobby["questions"]
-        questions_list = questions_data[0]
-
-        # Increment question index
-        next_question_idx = lobby["current_question_idx"] + 1
-
-        # Check if we've reached the end of questions
-        if next_question_idx >= len(questions_list):
-            lobby["game_state"] = GAME_STATE["GAME_OVER"]
-            lobby["game_over"] = True  # For backward compatibility
-
-            # Create final results if they don't exist yet
-            if "final_results" not in lobby:
-                final_results = []
-                for p in lobby["players"]:
-                    final_results.append(
-                        {
-                            "id": p["id"],
-                            "name": p["name"],
-                            "isHost": p["isHost"],
-                            "avatar": p["avatar"],
-                            "score": p["score"],
-                            "correctAnswers": p["correctAnswers"],
-                            "totalQuestions": p["totalQuestions"],
-                            "answers": p["answers"],
-                        }
-                    )
-                lobby["final_results"] = final_results
-
-            return {"success": True, "game_over": True}, 200
-
-        # Update game state
-        lobby["current_question_idx"] = next_question_idx
-        lobby["game_state"] = GAME_STATE["QUESTION"]
-        lobby["all_answers_received"] = False
-        lobby["waiting_for_next_question"] = False
-
-        # Get the next question
-        next_question = questions_list[next_question_idx]
-
-        # Broadcast the next question
-        broadcast_question(lobby_code, next_question, next_question_idx)
-
-        # Update last activity
-        lobby["last_activity"] = time.time()
-
-        return {"success": True, "question_index": next_question_idx}, 200
+        return game_engine.advance(lobby, from_index)
 
 
+@retry_on_conflict
 def get_game_results(lobby_code):
     """
     Get the results of a completed game.
@@ -446,31 +342,26 @@ def get_game_results(lobby_code):
     Returns:
         tuple: A tuple containing game results and status code, or error message and status code
     """
-    with lobbies_lock:
+    with lobby_registry.locked(lobby_code) as lobby:
         # Check if lobby exists
-        if lobby_code not in active_lobbies:
+        if lobby is None:
             return {"error": "Lobby not found"}, 404
 
-        lobby = active_lobbies[lobby_code]
-
         # Check if game is over
-        if lobby["game_state"] != GAME_STATE["GAME_OVER"]:
+        if lobby.game_state != GAME_STATE["GAME_OVER"]:
             return {"error": "Game is not over yet"}, 400
 
         # Update last activity
-        lobby["last_activity"] = time.time()
-
-        # Return results
-        if "final_results" in lobby and lobby["final_results"]:
-            return {
-                "lobby_code": lobby["lobby_code"],
-                "players": lobby["final_results"],
-            }, 200
-        else:
-            # Fallback to returning players if final_results is missing
-            return {"lobby_code": lobby["lobby_code"], "players": lobby["players"]}, 200
+        lobby.last_activity = time.time()
 
+        # Return results, including players who left after the game ended
+        return {
+            "lobby_code": lobby.lobby_code,
+            "players": serialize_results(lobby),
+        }, 200
 
+
+@retry_on_conflict
 def update_player_avatar(lobby_code, player_name, avatar):
     """
     Update a player's avatar in a lobby.
@@ -483,28 +374,68 @@ def update_player_avatar(lobby_code, player_name, avatar):
     Returns:
         tuple: A tuple containing success message and status code, or error message and status code
     """
-    with lobbies_lock:
+    with lobby_registry.locked(lobby_code) as lobby:
         # Check if lobby exists
-        if lobby_code not in active_lobbies:
+        if lobby is None:
             return {"error": "Lobby not found"}, 404
 
-        lobby = active_lobbies[lobby_code]
-
         # Find player and update avatar
-        player_found = False
-        for player in lobby["players"]:
-            if player["name"] == player_name:
-                player["avatar"] = avatar
-                player_found = True
-                break
-
-        if not player_found:
+        player = find_player(lobby, player_name)
+        if player is None:
             return {"error": "Player not found in lobby"}, 404
+        player.avatar = avatar
 
         # Update last activity
-        lobby["last_activity"] = time.time()
+        lobby.last_activity = time.time()
 
-        # Broadcast player update
-        broadcast_lobby_update(lobby_code, {"players": lobby["players"]})
+        # Broadcast the changed avatar
+        broadcast_lobby_delta(lobby, players={player.id: {"avatar": avatar}})
 
     return {"success": True, "avatar": avatar}, 200
+
+
+@retry_on_conflict
+def mark_player_disconnected(lobby_code, player_id):
+    """
+    Start the grace period of a player whose socket disconnected.
+
+    Args:
+        lobby_code (str): The code of the lobby
+        player_id (str): The id of the player
+
+    Returns:
+        str: The name of the player, or None if the player is gone
+    """
+    with lobby_registry.locked(lobby_code) as lobby:
+        player = lobby and lobby.players_by_id.get(player_id)
+        if player is None:
+            return None
+        # Start the grace period before the player is reaped
+        player.disconnected_at = time.time()
+        return player.name
+
+
+@retry_on_conflict
+def bind_player_session(session_id, lobby_code, player_name, player_id=None):
+    """
+    Point a socket session at a player of a lobby.
+
+    Players rejoining a restored or moved lobby are found by their id first.
+
+    Args:
+        session_id (str): The socket session id
+        lobby_code (str): The code of the lobby
+        player_name (str): The name of the player
+        player_id (str, optional): The id of the player. Defaults to None.
+
+    Returns:
+        dict: The lobby snapshot for the client, or None if the player is not found
+    """
+    with lobby_registry.locked(lobby_code) as lobby:
+        player = lobby and (
+            lobby.players_by_id.get(player_id) or find_player(lobby, player_name)
+        )
+        if player is None:
+            return None
+        lobby_registry.bind_session(session_id, lobby_code, player)
+        return lobby_snapshot(lobby)
@@ -0,0 +1,126 @@
+"""Utility module mapping lobby codes to the server node that owns them."""
+
+import bisect
+import hashlib
+import os
+
+# Points each node gets on the hash ring, which evens out the lobbies per node
+RING_REPLICAS = 64
+
+
+def _ring_hash(key):
+    """Return the position of a key on the hash ring."""
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """
+    Consistent hash ring of server nodes.
+
+    Every node is placed at `replicas` points on the ring and a key belongs to
+    the node at the first point after the key's hash. A node joining or leaving
+    therefore only moves the keys between it and its neighbours, about 1/n of
+    all keys, instead of reshuffling every key.
+
+    Args:
+        nodes (list, optional): The base URLs of the nodes. Defaults to none.
+        replicas (int, optional): Points per node. Defaults to RING_REPLICAS.
+    """
+
+    def __init__(self, nodes=(), replicas=RING_REPLICAS):
+        self.replicas = replicas
+        self.nodes = sorted(set(nodes))
+        self._points = sorted(
+            (_ring_hash(f"{node}#{i}"), node)
+            for node in self.nodes
+            for i in range(replicas)
+        )
+        self._hashes = [point for point, _ in self._points]
+
+    def node_for(self, key):
+        """Return the node owning a key, or None if the ring is empty."""
+        if not self._points:
+            return None
+        index = bisect.bisect(self._hashes, _ring_hash(key)) % len(self._points)
+        return self._points[index][1]
+
+
+class LobbyRouter:
+    """
+    Ownership of lobby codes by the nodes of a cluster.
+
+    Each node keeps the lobbies it owns in its own memory. Requests for the
+    lobbies of another node are redirected or proxied to it, and lobbies move
+    to their new owner when the node list changes. Lobbies still being handed
+    off are held by this node until they are released, so their requests are
+    served here until the new owner has them. Without a node list every lobby
+    is owned by this node.
+
+    Args:
+        node_url (str, optional): The base URL other nodes reach this node at
+        nodes (list, optional): The base URLs of every node of the cluster
+        proxy (bool, optional): Whether to proxy requests instead of redirecting
+        secret (str, optional): Secret nodes send each other on cluster requests
+        enabled (bool, optional): Whether to accept cluster requests without a
+            secret, for nodes on a trusted network. Defaults to False.
+    """
+
+    def __init__(
+        self, node_url=None, nodes=(), proxy=False, secret=None, enabled=False
+    ):
+        self.node_url = node_url
+        self.proxy = proxy
+        self.secret = secret
+        self.enabled = enabled
+        self.ring = HashRing(nodes)
+        self._held = frozenset()
+
+    def set_nodes(self, nodes, held=()):
+        """
+        Replace the node list of the cluster.
+
+        Args:
+            nodes (list): The base URLs of every node of the cluster
+            held (list, optional): Codes of lobbies this node keeps owning until
+                they are released. Defaults to none.
+        """
+        # Hold first, so a held lobby is never routed by the new ring alone
+        self._held = frozenset(held)
+        self.ring = HashRing(nodes)
+
+    def release(self, lobby_code):
+        """Hand a held lobby's ownership to its node on the ring."""
+        self._held = self._held - {lobby_code}
+
+    @property
+    def nodes(self):
+        """The base URLs of the nodes of the cluster."""
+        return self.ring.nodes
+
+    def owner(self, lobby_code):
+        """Return the base URL of the node owning a lobby, or None if it is this node."""
+        if lobby_code in self._held:
+            return None
+        node = self.ring.node_for(lobby_code)
+        return None if node in (None, self.node_url) else node
+
+    def owns(self, lobby_code):
+        """Return whether this node owns a lobby."""
+        return self.owner(lobby_code) is None
+
+
+def _split_nodes(value):
+    """Split a comma-separated node list."""
+    return [
+        node.strip().rstrip("/") for node in (value or "").split(",") if node.strip()
+    ]
+
+
+# Ownership of lobbies in this cluster, configured through the environment
+lobby_router = LobbyRouter(
+    node_url=(os.getenv("CLUSTER_NODE_URL") or "").rstrip("/") or None,
+    nodes=_split_nodes(os.getenv("CLUSTER_NODES")),
+    proxy=os.getenv("CLUSTER_ROUTING", "redirect").lower() == "proxy",
+    secret=os.getenv("CLUSTER_SECRET"),
+    enabled=os.getenv("CLUSTER_ENABLED", "").lower() == "true",
+)
@@ -0,0 +1,249 @@
+"""Utility module for the storage backends that hold multiplayer lobby state."""
+
+import functools
+import json
+import logging
+
+# Times a lobby update that lost a race with another worker is run again
+CONFLICT_RETRIES = 5
+
+
+class LobbyConflict(Exception):
+    """Raised when a lobby was changed by another worker since it was loaded."""
+
+
+class LobbyStore:
+    """
+    Interface of the storage backends of the lobby registry.
+
+    The registry only calls a store while holding the lobby's lock in this
+    process. Stores shared by several processes must make `save` a
+    compare-and-set on the revision the lobby was loaded at, and raise
+    LobbyConflict when another process saved the lobby first.
+
+    `lobbies` maps lobby codes to the Lobby objects held by this process.
+    """
+
+    lobbies = None
+
+    def load(self, lobby_code):
+        """Return a lobby, or None if it does not exist."""
+        raise NotImplementedError
+
+    def save(self, lobby):
+        """Store the changes made to a loaded lobby."""
+        raise NotImplementedError
+
+    def create(self, lobby):
+        """Store a new lobby. Returns False if its code is already taken."""
+        raise NotImplementedError
+
+    def delete(self, lobby_code):
+        """Remove a lobby."""
+        raise NotImplementedError
+
+    def discard(self, lobby_code):
+        """Forget the unsaved changes to a loaded lobby."""
+
+    def codes(self):
+        """Return the codes of the stored lobbies."""
+        raise NotImplementedError
+
+    def __contains__(self, lobby_code):
+        raise NotImplementedError
+
+    def __len__(self):
+        return len(self.codes())
+
+
+class MemoryLobbyStore(LobbyStore):
+    """
+    Lobby store keeping the lobby objects in this process.
+
+    Lobbies are changed in place, so saving only has to keep them, and the
+    registry's lobby locks already serialize every update.
+    """
+
+    def __init__(self):
+        self.lobbies = {}
+
+    def load(self, lobby_code):
+        return self.lobbies.get(lobby_code)
+
+    def save(self, lobby):
+        pass
+
+    def create(self, lobby):
+        return self.lobbies.setdefault(lobby.lobby_code, lobby) is lobby
+
+    def delete(self, lobby_code):
+        self.lobbies.pop(lobby_code, None)
+
+    def codes(self):
+        return list(self.lobbies)
+
+    def __contains__(self, lobby_code):
+        return lobby_code in self.lobbies
+
+    def __len__(self):
+        return len(self.lobbies)
+
+
+class RedisLobbyStore(LobbyStore):
+    """
+    Lobby store shared by every worker through Redis.
+
+    Each lobby is a hash holding its JSON state and a revision incremented on
+    every save. Saves WATCH the revision they loaded and fail with
+    LobbyConflict if another worker saved the lobby in between.
+
+    Lobbies loaded by this worker are kept in `lobbies` with their revision and
+    JSON: a load only reads the revision while no other worker changed the
+    lobby, and a save is skipped when the lobby did not change.
+
+    Args:
+        client (redis.Redis): The Redis client, or a compatible one like fakeredis
+        prefix (str, optional): Prefix of the keys. Defaults to "quizzatron:".
+    """
+
+    def __init__(self, client, prefix="quizzatron:"):
+        self.client = client
+        self.prefix = prefix
+        self.lobbies = {}
+        self._loaded = {}  # lobby_code -> (revision, state JSON)
+
+    def _key(self, lobby_code):
+        return f"{self.prefix}lobby:{lobby_code}"
+
+    def _codes_key(self):
+        return f"{self.prefix}lobbies"
+
+    def load(self, lobby_code):
+        key = self._key(lobby_code)
+        cached = self._loaded.get(lobby_code)
+        if cached is not None:
+            revision = self.client.hget(key, "revision")
+            if revision is not None and int(revision) == cached[0]:
+                return self.lobbies[lobby_code]
+
+        from api.utils.multiplayer_models import lobby_from_state
+
+        revision, state = self.client.hmget(key, "revision", "state")
+        if revision is None:
+            self.discard(lobby_code)
+            return None
+        state = state.decode()
+        lobby = lobby_from_state(json.loads(state))
+        self.lobbies[lobby_code] = lobby
+        self._loaded[lobby_code] = (int(revision), state)
+        return lobby
+
+    def save(self, lobby):
+        from redis.exceptions import WatchError
+        from api.utils.multiplayer_models import lobby_state
+
+        code = lobby.lobby_code
+        revision, loaded = self._loaded[code]
+        state = json.dumps(lobby_state(lobby))
+        if state == loaded:
+            return
+
+        key = self._key(code)
+        try:
+            with self.client.pipeline() as pipe:
+                pipe.watch(key)
+                current = pipe.hget(key, "revision")
+                if current is None or int(current) != revision:
+                    raise LobbyConflict(code)
+                pipe.multi()
+                pipe.hset(key, mapping={"revision": revision + 1, "state": state})
+                pipe.execute()
+        except (LobbyConflict, WatchError) as e:
+            self.discard(code)
+            raise LobbyConflict(code) from e
+        self._loaded[code] = (revision + 1, state)
+
+    def create(self, lobby):
+        from redis.exceptions import WatchError
+        from api.utils.multiplayer_models import lobby_state
+
+        code = lobby.lobby_code
+        key = self._key(code)
+        state = json.dumps(lobby_state(lobby))
+        try:
+            with self.client.pipeline() as pipe:
+                pipe.watch(key)
+                if pipe.exists(key):
+                    return False
+                pipe.multi()
+                pipe.hset(key, mapping={"revision": 0, "state": state})
+                pipe.sadd(self._codes_key(), code)
+                pipe.execute()
+        except WatchError:
+            return False
+        self.lobbies[code] = lobby
+        self._loaded[code] = (0, state)
+        return True
+
+    def delete(self, lobby_code):
+        with self.client.pipeline() as pipe:
+            pipe.delete(self._key(lobby_code))
+            pipe.srem(self._codes_key(), lobby_code)
+            pipe.execute()
+        self.discard(lobby_code)
+
+    def discard(self, lobby_code):
+        self.lobbies.pop(lobby_code, None)
+        self._loaded.pop(lobby_code, None)
+
+    def codes(self):
+        return [code.decode() for code in self.client.smembers(self._codes_key())]
+
+    def __contains__(self, lobby_code):
+        return bool(self.client.exists(self._key(lobby_code)))
+
+    def __len__(self):
+        return self.client.scard(self._codes_key())
+
+
+def create_lobby_store(url=None):
+    """
+    Create the lobby store for a store URL.
+
+    Args:
+        url (str, optional): A redis:// URL, or None to keep lobbies in this process
+
+    Returns:
+        LobbyStore: The lobby store
+    """
+    if not url:
+        return MemoryLobbyStore()
+
+    import redis
+
+    logging.info("Storing multiplayer lobbies in Redis")
+    return RedisLobbyStore(redis.Redis.from_url(url))
+
+
+def retry_on_conflict(func):
+    """
+    Run a lobby update again when another worker saved the lobby first.
+
+    The update's events are dropped with the failed attempt, and the retry
+    loads the lobby again, so the decorated function must only change lobby
+    state inside `lobby_registry.locked`.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(1, CONFLICT_RETRIES):
+            try:
+                return func(*args, **kwargs)
+            except LobbyConflict as e:
+                logging.info(
+                    f"Lobby {e} changed on another worker, retrying {func.__name__} "
+                    f"({attempt}/{CONFLICT_RETRIES})"
+                )
+        return func(*args, **kwargs)
+
+    return wrapper
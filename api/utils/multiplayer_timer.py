@@ -0,0 +1,132 @@
+"""Utility module for the timer wheel that drives server-side question deadlines."""
+
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class _Timer:
+    """A scheduled callback in a timer wheel slot."""
+
+    __slots__ = ("key", "tick", "callback", "args")
+
+    def __init__(self, key, tick, callback, args):
+        self.key = key
+        self.tick = tick
+        self.callback = callback
+        self.args = args
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel holding at most one pending timer per key.
+
+    Scheduling and cancelling are O(1): a timer is appended to the slot of its
+    expiry tick and cancelled by dropping it from the key index, so slots skip
+    it lazily. The wheel thread only wakes once per tick while timers are
+    pending, and due callbacks run on a small worker pool so a slow broadcast
+    for one lobby does not delay the deadlines of others.
+    """
+
+    def __init__(self, tick=0.1, slots=512, workers=4):
+        self.tick = tick
+        self._slots = [[] for _ in range(slots)]
+        self._timers = {}  # key -> pending _Timer
+        self._origin = time.monotonic()
+        self._current = 0  # last tick processed
+        self._condition = threading.Condition()
+        self._thread = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="question-timer"
+        )
+
+    def _now_tick(self):
+        """Return the tick the wheel should have reached by now."""
+        return int((time.monotonic() - self._origin) / self.tick)
+
+    def schedule(self, key, delay, callback, *args):
+        """
+        Run a callback after a delay, replacing the pending timer of the key.
+
+        Args:
+            key (str): Identifies the timer, e.g. a lobby code
+            delay (float): Seconds until the callback runs
+            callback (callable): Function to call
+            *args: Arguments for the callback
+        """
+        with self._condition:
+            if not self._timers:
+                # Nothing was pending, so skip the idle ticks instead of replaying them
+                self._current = self._now_tick()
+            tick = max(
+                self._current + 1,
+                math.ceil((time.monotonic() + delay - self._origin) / self.tick),
+            )
+            timer = _Timer(key, tick, callback, args)
+            self._timers[key] = timer
+            self._slots[tick % len(self._slots)].append(timer)
+
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="question-timer-wheel", daemon=True
+                )
+                self._thread.start()
+            self._condition.notify()
+
+    def cancel(self, key):
+        """Cancel the pending timer of a key, if any."""
+        with self._condition:
+            self._timers.pop(key, None)
+
+    def pending(self, key):
+        """Return whether a key has a pending timer."""
+        with self._condition:
+            return key in self._timers
+
+    def _run(self):
+        """Advance the wheel tick by tick and dispatch due callbacks."""
+        while True:
+            with self._condition:
+                while not self._timers:
+                    self._condition.wait()
+
+                now_tick = self._now_tick()
+                if now_tick <= self._current:
+                    self._condition.wait(
+                        self._origin
+                        + (self._current + 1) * self.tick
+                        - time.monotonic()
+                    )
+                    continue
+
+                due = []
+                while self._current < now_tick:
+                    self._current += 1
+                    slot = self._slots[self._current % len(self._slots)]
+                    waiting = []
+                    for timer in slot:
+                        if self._timers.get(timer.key) is not timer:
+                            continue  # cancelled or replaced
+                        if timer.tick <= self._current:
+                            del self._timers[timer.key]
+                            due.append(timer)
+                        else:
+                            waiting.append(timer)
+                    slot[:] = waiting
+
+            for timer in due:
+                self._executor.submit(self._fire, timer)
+
+    @staticmethod
+    def _fire(timer):
+        """Run a timer callback, logging instead of losing exceptions."""
+        try:
+            timer.callback(*timer.args)
+        except Exception as e:  # pylint: disable=broad-except
+            logging.error(f"Timer callback for {timer.key} failed: {str(e)}")
+
+
+# Timers of the open question or the reveal delay of every lobby
+question_timer = TimerWheel()
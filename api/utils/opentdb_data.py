@@ -3,24 +3,271 @@
 import logging
 import random
 import html
-from typing import Dict, Any, Optional
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple
 import requests
+from api.utils.seen_questions import seen_questions
+
+OPENTDB_API_URL = "https://opentdb.com/api.php"
+OPENTDB_TOKEN_URL = "https://opentdb.com/api_token.php"
+
+# OpenTDB allows one question request per IP every 5 seconds
+OPENTDB_MIN_INTERVAL = 5.0
+
+# OpenTDB response codes that need handling beyond returning the results
+NO_RESULTS = 1
+TOKEN_NOT_FOUND = 3
+TOKEN_EMPTY = 4
+RATE_LIMIT = 5
+
+PREFETCH_BATCH_SIZE = 50  # Largest amount OpenTDB serves per request
+PREFETCH_LOW_WATER = 20
+
+
+class RateLimiter:
+    """Serialize calls so consecutive ones start at least `interval` seconds apart."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_allowed = 0.0
+
+    def __enter__(self):
+        self._lock.acquire()
+        delay = self._next_allowed - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._next_allowed = time.monotonic() + self.interval
+        self._lock.release()
+
+
+def _decode_question(question: Dict[str, Any]) -> Dict[str, Any]:
+    """Decode HTML entities in a question and its options."""
+    question["question"] = html.unescape(question["question"])
+    question["correct_answer"] = html.unescape(question["correct_answer"])
+    question["incorrect_answers"] = [
+        html.unescape(ans) for ans in question["incorrect_answers"]
+    ]
+    return question
+
+
+class QuestionPrefetcher:
+    """
+    Per-(category, difficulty) buffers of OpenTDB questions.
+
+    Buffers are filled in batches through a shared rate limiter using a session
+    token per buffer, so repeated requests do not receive the same questions and
+    an exhausted buffer resets only its own token. Requests are served from the
+    buffer and a background refill starts once a buffer drops below the
+    low-water mark.
+
+    Tokens are requested, reset and dropped under their own lock, and every
+    change bumps the token's generation: a refill only resets or drops the
+    generation it used, so concurrent refills neither request several tokens
+    nor reset one another's progress.
+    """
+
+    def __init__(
+        self,
+        rate_limiter: RateLimiter,
+        batch_size: int = PREFETCH_BATCH_SIZE,
+        low_water: int = PREFETCH_LOW_WATER,
+        timeout: float = 5,
+    ):
+        self.rate_limiter = rate_limiter
+        self.batch_size = batch_size
+        self.low_water = low_water
+        self.timeout = timeout
+        self._buffers: Dict[Tuple[str, str], deque] = {}
+        self._refill_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._refilling = set()
+        self._lock = threading.Lock()
+        self._batch_limits: Dict[Tuple[str, str], int] = {}
+        self._token_lock = threading.Lock()
+        self._tokens: Dict[Tuple[str, str], Optional[str]] = {}
+        self._token_generations: Dict[Tuple[str, str], int] = {}
+
+    def take(
+        self,
+        category: str,
+        difficulty: str,
+        count: int,
+        session_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Take up to `count` questions, fetching synchronously only if the buffer is short.
+
+        With a session id, twice as many candidates are drawn and questions the
+        session has already seen are skipped and returned to the buffer.
+
+        Raises:
+            requests.exceptions.RequestException: If a synchronous refill fails.
+        """
+        key = (category, difficulty)
+        with self._lock:
+            buffer = self._buffers.setdefault(key, deque())
+            short = len(buffer) < count
+
+        if short:
+            self._refill(key, count)
+
+        with self._lock:
+            draw = count * 2 if session_id else count
+            questions = [buffer.popleft() for _ in range(min(draw, len(buffer)))]
+
+        if session_id:
+            questions, leftovers = seen_questions.pick(session_id, questions, count)
+            with self._lock:
+                buffer.extendleft(reversed(leftovers))
+
+        with self._lock:
+            low = len(buffer) < self.low_water
+
+        if low:
+            self._refill_async(key)
+        return questions
+
+    def _refill(self, key: Tuple[str, str], needed: int = 0) -> None:
+        """Top up a buffer unless a concurrent refill already made it large enough."""
+        with self._lock:
+            refill_lock = self._refill_locks.setdefault(key, threading.Lock())
+
+        with refill_lock:
+            with self._lock:
+                if len(self._buffers[key]) >= max(needed, self.low_water):
+                    return
+
+            amount = max(self._batch_limits.get(key, self.batch_size), needed)
+            response_code, results = self._fetch(key, amount)
+            if response_code == NO_RESULTS and 0 < needed < amount:
+                # Not enough questions for a full batch, fetch only what is needed
+                # and remember it, so later refills of the key take one call
+                response_code, results = self._fetch(key, needed)
+                if response_code != NO_RESULTS:
+                    self._batch_limits[key] = needed
+
+            with self._lock:
+                self._buffers[key].extend(_decode_question(q) for q in results)
+
+    def _refill_async(self, key: Tuple[str, str]) -> None:
+        """Refill a buffer in a background thread, at most one refill per key."""
+        with self._lock:
+            if key in self._refilling:
+                return
+            self._refilling.add(key)
+
+        def run():
+            try:
+                self._refill(key)
+            except requests.exceptions.RequestException as e:
+                logging.warning("Background OpenTDB refill failed: %s", str(e))
+            finally:
+                with self._lock:
+                    self._refilling.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _fetch(self, key: Tuple[str, str], amount: int) -> Tuple[int, List[Dict]]:
+        """Fetch one batch of questions, renewing the session token when needed."""
+        category, difficulty = key
+        for _ in range(2):
+            params = {
+                "amount": amount,
+                "category": category,
+                "difficulty": difficulty,
+                "type": "multiple",  # Hardcoded to "multiple" for this use case
+            }
+            token, generation = self._session_token(key)
+            if token:
+                params["token"] = token
+
+            with self.rate_limiter:
+                response = requests.get(
+                    OPENTDB_API_URL, params=params, timeout=self.timeout
+                )
+            response.raise_for_status()
+            q_data = response.json()
+            response_code = q_data.get("response_code", 0)
+
+            if response_code == TOKEN_NOT_FOUND:
+                self._drop_token(key, generation)
+            elif response_code == TOKEN_EMPTY:
+                # The retry reuses the reset token instead of requesting another
+                self._reset_token(key, token, generation)
+            else:
+                if response_code == RATE_LIMIT:
+                    logging.warning("OpenTDB rate limit hit for %s", key)
+                return response_code, q_data.get("results", [])
+        return response_code, []
+
+    def _session_token(self, key: Tuple[str, str]) -> Tuple[Optional[str], int]:
+        """Return a buffer's session token and its generation, requesting one on first use."""
+        with self._token_lock:
+            if self._tokens.get(key) is None:
+                # Token requests are not subject to the question rate limit
+                response = requests.get(
+                    OPENTDB_TOKEN_URL,
+                    params={"command": "request"},
+                    timeout=self.timeout,
+                )
+                response.raise_for_status()
+                self._tokens[key] = response.json().get("token")
+                self._token_generations[key] = self._token_generations.get(key, 0) + 1
+            return self._tokens[key], self._token_generations[key]
+
+    def _drop_token(self, key: Tuple[str, str], generation: int) -> None:
+        """Forget an unknown session token, unless another refill replaced it."""
+        with self._token_lock:
+            if generation == self._token_generations.get(key):
+                self._tokens[key] = None
+
+    def _reset_token(
+        self, key: Tuple[str, str], token: Optional[str], generation: int
+    ) -> None:
+        """Reset an exhausted session token, unless another refill already did."""
+        with self._token_lock:
+            if generation != self._token_generations.get(key):
+                return
+            logging.info("OpenTDB session token for %s exhausted, resetting it", key)
+            response = requests.get(
+                OPENTDB_TOKEN_URL,
+                params={"command": "reset", "token": token},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            self._token_generations[key] += 1
+
+
+opentdb_rate_limiter = RateLimiter(OPENTDB_MIN_INTERVAL)
+question_prefetcher = QuestionPrefetcher(opentdb_rate_limiter)
 
 
 def get_questions_from_api(
-    category: str = "9", difficulty: str = "easy", num_questions: str = "5"
+    category: str = "9",
+    difficulty: str = "easy",
+    num_questions: str = "5",
+    session_id: Optional[str] = None,
 ) -> Optional[Dict[str, Any]]:
     """
     Fetch trivia questions from the Open Trivia Database API.
 
+    Questions are served from the shared prefetch buffer, which only calls the
+    API when it runs low.
+
     Args:
         category (str): The category ID for the questions. Defaults to "9".
         difficulty (str): The difficulty level of the questions. Defaults to "easy".
         num_questions (str): The number of questions to fetch. Defaults to "5".
+        session_id (Optional[str]): Client session to avoid repeating questions for.
 
     Returns:
-        Optional[Dict[str, Any]]: A dictionary containing the fetched questions, or 
-        None if an error occurs.
+        Optional[Dict[str, Any]]: A dictionary containing the fetched questions, or
+        None if an error occurs or num_questions is not a positive number.
 
     Raises:
         TypeError: If any of the input parameters are not strings.
@@ -30,33 +277,24 @@ def get_questions_from_api(
     ):
         raise TypeError("All parameters must be strings")
 
-    question_type = "multiple"  # Hardcoded to "multiple" for this use case
-    question_url = (
-        f"https://opentdb.com/api.php?amount={num_questions}&category={category}"
-        f"&difficulty={difficulty}&type={question_type}"
-    )
+    if not num_questions.isdigit() or int(num_questions) < 1:
+        logging.warning("Invalid number of questions: %s", num_questions)
+        return None
 
     try:
-        response = requests.get(question_url, timeout=5)
-        response.raise_for_status()
-
-        # Convert response to JSON
-        q_data = response.json()
-
-        # Decode HTML entities in questions and options
-        for question in q_data.get("results", []):
-            question["question"] = html.unescape(question["question"])
-            question["correct_answer"] = html.unescape(question["correct_answer"])
-            question["incorrect_answers"] = [
-                html.unescape(ans) for ans in question["incorrect_answers"]
-            ]
-
-        logging.info("Data received from the API")
-        return q_data
+        questions = question_prefetcher.take(
+            category, difficulty, int(num_questions), session_id
+        )
     except requests.exceptions.RequestException as e:
         logging.warning("API Request Failed: %s", str(e))
         return None
 
+    logging.info("Data received from the API")
+    return {
+        "response_code": 0 if len(questions) == int(num_questions) else NO_RESULTS,
+        "results": questions,
+    }
+
 
 def format_question_api_output(
     api_question_json: Dict[str, Any],
@@ -0,0 +1,258 @@
+"""Utility module for the embedded SQLite question bank used as an offline category source."""
+
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+QUESTION_BANK_PATH = os.getenv("QUESTION_BANK_PATH", "question_bank.db")
+
+# Category value get_triviaqa dispatches on for questions served by the bank
+QUESTION_BANK_TAG = "question-bank"
+
+OPTION_LETTERS = ["A", "B", "C", "D"]
+
+SCHEMA = """
+CREATE TABLE categories (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE questions (
+    id INTEGER PRIMARY KEY,
+    category_id INTEGER NOT NULL REFERENCES categories(id),
+    difficulty TEXT,
+    question TEXT NOT NULL,
+    options TEXT NOT NULL,
+    answer INTEGER NOT NULL
+);
+CREATE INDEX idx_questions_category_difficulty ON questions(category_id, difficulty);
+CREATE TABLE ranges (
+    category_id INTEGER NOT NULL,
+    difficulty TEXT,
+    first_id INTEGER NOT NULL,
+    last_id INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE questions_fts USING fts5(
+    question, content='questions', content_rowid='id'
+);
+"""
+
+
+def collection_name_for(json_file):
+    """Derive the category name of a JSON file the same way db_init names collections."""
+    name = os.path.splitext(json_file)[0]
+    return " ".join(word.capitalize() for word in name.split("-"))
+
+
+def build_question_bank(json_dir, db_path=QUESTION_BANK_PATH):
+    """
+    Build the question bank from the JSON files produced by scripts/converter.py.
+
+    Questions are inserted grouped by (category, difficulty) so every group owns a
+    contiguous rowid range, which is recorded for constant-time random sampling.
+
+    Args:
+        json_dir (str): Directory containing the converted JSON files.
+        db_path (str, optional): Where to write the bank. Defaults to QUESTION_BANK_PATH.
+
+    Returns:
+        int: The number of questions stored.
+    """
+    rows = []
+    for json_file in sorted(f for f in os.listdir(json_dir) if f.endswith(".json")):
+        category = collection_name_for(json_file)
+        with open(os.path.join(json_dir, json_file), "r", encoding="utf-8") as f:
+            for item in json.load(f):
+                options = item["options"]
+                if item["correct_answer"] not in options:
+                    logging.warning(
+                        "Skipping question without its answer in the options: %s",
+                        item["question"],
+                    )
+                    continue
+                if len(options) > len(OPTION_LETTERS):
+                    # Keep the correct answer when dropping the extra options
+                    distractors = [o for o in options if o != item["correct_answer"]]
+                    options = distractors[: len(OPTION_LETTERS) - 1]
+                    options.insert(
+                        min(item["options"].index(item["correct_answer"]), len(options)),
+                        item["correct_answer"],
+                    )
+                answer = options.index(item["correct_answer"])
+                rows.append(
+                    (category, item.get("difficulty"), item["question"], options, answer)
+                )
+    rows.sort(key=lambda row: (row[0], row[1] or ""))
+
+    temp_path = f"{db_path}.tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+    connection = sqlite3.connect(temp_path)
+    try:
+        connection.executescript(SCHEMA)
+        category_ids = {}
+        for category, difficulty, question, options, answer in rows:
+            if category not in category_ids:
+                category_ids[category] = connection.execute(
+                    "INSERT INTO categories (name) VALUES (?)", (category,)
+                ).lastrowid
+            connection.execute(
+                "INSERT INTO questions (category_id, difficulty, question, options, answer)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (category_ids[category], difficulty, question, json.dumps(options), answer),
+            )
+        connection.execute(
+            "INSERT INTO ranges SELECT category_id, difficulty, MIN(id), MAX(id)"
+            " FROM questions GROUP BY category_id, difficulty"
+        )
+        connection.execute("INSERT INTO questions_fts(questions_fts) VALUES ('rebuild')")
+        connection.commit()
+    finally:
+        connection.close()
+
+    os.replace(temp_path, db_path)
+    logging.info("Built question bank with %d questions at %s", len(rows), db_path)
+    return len(rows)
+
+
+class QuestionBank:
+    """Read-only access to a built question bank with in-memory rowid ranges."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+
+        connection = self._connection()
+        self.categories = dict(connection.execute("SELECT name, id FROM categories"))
+
+        # category_id -> list of (difficulty, first_id, last_id)
+        self._ranges = {}
+        for category_id, difficulty, first_id, last_id in connection.execute(
+            "SELECT category_id, difficulty, first_id, last_id FROM ranges"
+        ):
+            self._ranges.setdefault(category_id, []).append(
+                (difficulty, first_id, last_id)
+            )
+
+    def _connection(self):
+        """Return this thread's read-only connection to the bank."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False
+            )
+            self._local.connection = connection
+        return connection
+
+    def sample_ids(self, category, difficulty, count):
+        """
+        Pick up to `count` random question ids of a category without scanning it.
+
+        Questions with no recorded difficulty match every difficulty.
+        """
+        ranges = [
+            (first_id, last_id)
+            for range_difficulty, first_id, last_id in self._ranges.get(
+                self.categories.get(category), []
+            )
+            if range_difficulty in (difficulty, None)
+        ]
+        total = sum(last_id - first_id + 1 for first_id, last_id in ranges)
+
+        ids = []
+        for offset in random.sample(range(total), min(int(count), total)):
+            for first_id, last_id in ranges:
+                size = last_id - first_id + 1
+                if offset < size:
+                    ids.append(first_id + offset)
+                    break
+                offset -= size
+        return ids
+
+    def get_questions(self, category, num_questions=5, difficulty="medium"):
+        """
+        Retrieve random questions of a category in the API question format.
+
+        Returns:
+            dict: A dictionary containing formatted questions, or None if the category
+            is not in the bank.
+        """
+        if category not in self.categories:
+            return None
+        return self._format(self.sample_ids(category, difficulty, num_questions), difficulty)
+
+    def search_questions(self, query, num_questions=5, difficulty="medium"):
+        """Retrieve the questions best matching a free-text topic through the FTS index."""
+        terms = " OR ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+        try:
+            ids = [
+                row[0]
+                for row in self._connection().execute(
+                    "SELECT questions_fts.rowid FROM questions_fts"
+                    " JOIN questions ON questions.id = questions_fts.rowid"
+                    " WHERE questions_fts MATCH ?"
+                    " AND (questions.difficulty = ? OR questions.difficulty IS NULL)"
+                    " ORDER BY rank LIMIT ?",
+                    (terms, difficulty, int(num_questions)),
+                )
+            ]
+        except sqlite3.OperationalError as error:
+            logging.warning("Question bank search failed: %s", str(error))
+            return None
+        return self._format(ids, difficulty) if ids else None
+
+    def _format(self, ids, difficulty):
+        """Load questions by id, keeping their order, and format them like the other sources."""
+        placeholders = ",".join("?" * len(ids))
+        rows_by_id = {
+            row[0]: row[1:]
+            for row in self._connection().execute(
+                "SELECT id, question, options, answer, difficulty FROM questions"
+                f" WHERE id IN ({placeholders})",
+                ids,
+            )
+        }
+        rows = [rows_by_id[question_id] for question_id in ids if question_id in rows_by_id]
+
+        formatted_questions = {"questions": []}
+        for idx, (question, options, answer, row_difficulty) in enumerate(rows, start=1):
+            formatted_questions["questions"].append(
+                {
+                    "index": idx,
+                    "question": question,
+                    "options": [
+                        f"{OPTION_LETTERS[i]}) {option}"
+                        for i, option in enumerate(json.loads(options))
+                    ],
+                    "correct_answer": OPTION_LETTERS[answer],
+                    "difficulty": row_difficulty or difficulty,
+                    "image": False,
+                }
+            )
+        return formatted_questions
+
+
+_question_bank = None
+_bank_lock = threading.Lock()
+
+
+def get_question_bank():
+    """Return the shared question bank, or None if it has not been built."""
+    global _question_bank  # pylint: disable=global-statement
+    with _bank_lock:
+        if _question_bank is None and os.path.exists(QUESTION_BANK_PATH):
+            _question_bank = QuestionBank(QUESTION_BANK_PATH)
+        return _question_bank
+
+
+def fetch_question_bank_categories():
+    """List the categories of the question bank for the category aggregator."""
+    bank = get_question_bank()
+    if bank is None:
+        return {}
+    return {name: QUESTION_BANK_TAG for name in bank.categories}
@@ -0,0 +1,102 @@
+"""Utility module for tracking which questions each client session has already seen."""
+
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings, sized for a capacity and error rate."""
+
+    __slots__ = ("size", "hashes", "bits", "count")
+
+    def __init__(self, capacity=1000, error_rate=0.01):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        """Yield the bit positions of an item using double hashing."""
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (first + i * second) % self.size
+
+    def add(self, item):
+        """Add an item to the filter."""
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class SeenQuestionTracker:
+    """
+    Per-session Bloom filters of served questions, bounded with LRU eviction.
+
+    Sessions idle for longer than `idle_timeout` or beyond `max_sessions` are
+    dropped from the least recently used end. A filter that reaches its capacity
+    is started afresh so its false-positive rate stays bounded.
+    """
+
+    def __init__(
+        self, max_sessions=10000, idle_timeout=6 * 3600, capacity=1000, error_rate=0.01
+    ):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._sessions = OrderedDict()  # session_id -> [BloomFilter, last_used]
+        self._lock = threading.Lock()
+
+    def _filter_for(self, session_id):
+        """Return the filter of a session, creating it and evicting idle sessions."""
+        now = time.monotonic()
+        entry = self._sessions.get(session_id)
+        if entry is None or entry[0].count >= self.capacity:
+            entry = [BloomFilter(self.capacity, self.error_rate), now]
+            self._sessions[session_id] = entry
+        entry[1] = now
+        self._sessions.move_to_end(session_id)
+
+        while self._sessions:
+            oldest_id, (_, last_used) = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and (
+                now - last_used <= self.idle_timeout
+            ):
+                break
+            del self._sessions[oldest_id]
+        return entry[0]
+
+    def pick(self, session_id, candidates, count, key=lambda q: q["question"]):
+        """
+        Pick `count` candidates preferring ones the session has not seen, and mark them.
+
+        Seen candidates are only used to top up when too few unseen ones remain.
+
+        Returns:
+            tuple: The picked candidates and the candidates that were not picked.
+        """
+        with self._lock:
+            seen = self._filter_for(session_id)
+            unseen, repeats = [], []
+            for candidate in candidates:
+                (repeats if key(candidate) in seen else unseen).append(candidate)
+
+            top_up = max(count - len(unseen), 0)
+            picked = unseen[:count] + repeats[:top_up]
+            for candidate in picked:
+                seen.add(key(candidate))
+            return picked, unseen[count:] + repeats[top_up:]
+
+
+seen_questions = SeenQuestionTracker()
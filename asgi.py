@@ -0,0 +1,19 @@
+# pylint: disable=R0801
+# Disable duplicate code check for this file (Need to re-import load_dotenv and os)
+"""Module for running the ASGI server, serving Socket.IO with asyncio."""
+
+import os
+from dotenv import load_dotenv
+from api.app import create_asgi_app
+
+load_dotenv()
+ENVIRONMENT = os.getenv("FLASK_ENV", "LOCAL").upper()
+app = create_asgi_app(ENVIRONMENT)
+
+if __name__ == "__main__":
+    import uvicorn
+
+    HOST = "127.0.0.1" if ENVIRONMENT == "LOCAL" else "0.0.0.0"
+    PORT = int(os.getenv("PORT", "5000"))
+
+    uvicorn.run(app, host=HOST, port=PORT, log_level="warning")
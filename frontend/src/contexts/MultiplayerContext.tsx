@@ -1,6 +1,6 @@
-import { createContext, useContext, useEffect, useState, ReactNode } from "react";
+import { createContext, useContext, useEffect, useRef, useState, ReactNode } from "react";
 import { socketService } from "@/services/socketService";
-import { MultiplayerPlayer, MultiplayerGameSettings } from "@/services/apiService";
+import { apiService, MultiplayerPlayer, MultiplayerGameSettings } from "@/services/apiService";
 import { useToast } from "@/components/ui/use-toast";
 
 interface MultiplayerContextProps {
@@ -62,6 +62,9 @@ export const MultiplayerProvider = ({ children }: { children: ReactNode }) => {
   // Socket state
   const [isSocketConnected, setIsSocketConnected] = useState<boolean>(false);
   
+  // Version of the last lobby update applied; deltas must follow it directly
+  const lobbyVersionRef = useRef<number | null>(null);
+  
   // Store player information in localStorage
   const storePlayerInfo = (
     name: string, 
@@ -113,9 +116,8 @@ export const MultiplayerProvider = ({ children }: { children: ReactNode }) => {
       setIsSocketConnected(false);
     };
     
-    // Handle lobby updates
-    const lobbyUpdateHandler = (data: any) => {
-      console.log("Lobby update received:", data);
+    // Replace the lobby state with a full snapshot
+    const applyLobbySnapshot = (data: any) => {
       if (data.players) {
         setPlayers(data.players);
       }
@@ -123,6 +125,61 @@ export const MultiplayerProvider = ({ children }: { children: ReactNode }) => {
       if (data.settings) {
         setGameSettings(data.settings);
       }
+      
+      if (typeof data.version === "number") {
+        lobbyVersionRef.current = data.version;
+      }
+    };
+    
+    // Merge the changed players and settings of a delta into the lobby state
+    const applyLobbyDelta = (data: any) => {
+      lobbyVersionRef.current = data.version;
+      
+      if (data.players || data.removed_players) {
+        setPlayers(prevPlayers => {
+          const changes: Record<string, Partial<MultiplayerPlayer>> = { ...(data.players || {}) };
+          const removed = new Set<string>(data.removed_players || []);
+          const merged = prevPlayers
+            .filter(player => !removed.has(player.id))
+            .map(player => {
+              const change = changes[player.id];
+              delete changes[player.id];
+              return change ? { ...player, ...change } : player;
+            });
+          // Whatever is left are players that just joined
+          return [...merged, ...(Object.values(changes) as MultiplayerPlayer[])];
+        });
+      }
+      
+      if (data.settings) {
+        setGameSettings(prevSettings => ({ ...prevSettings, ...data.settings }));
+      }
+    };
+    
+    // Handle lobby updates
+    const lobbyUpdateHandler = (data: any) => {
+      console.log("Lobby update received:", data);
+      if (!data.delta) {
+        applyLobbySnapshot(data);
+        return;
+      }
+      
+      const lastVersion = lobbyVersionRef.current;
+      if (lastVersion !== null && data.version <= lastVersion) {
+        // Already applied, e.g. a delta that raced a snapshot
+        return;
+      }
+      
+      if (lastVersion === null || data.version !== lastVersion + 1) {
+        // A delta was missed, so fetch the whole lobby instead
+        console.log(`Lobby version gap (${lastVersion} -> ${data.version}), fetching snapshot`);
+        apiService.getLobbyInfo(data.lobby_code)
+          .then(applyLobbySnapshot)
+          .catch(error => console.error("Failed to resync lobby:", error));
+        return;
+      }
+      
+      applyLobbyDelta(data);
     };
     
     // Handle player join/leave events
@@ -156,6 +156,16 @@ const MultiplayerLobby = () => {
       console.log("Socket disconnected in MultiplayerLobby");
     });
     
+    const cleanupGameStartFailed = socketService.on("game_start_failed", (data: any) => {
+      console.error("Game start failed in MultiplayerLobby:", data);
+      setIsStartingGame(false);
+      toast({
+        title: "Cannot start game",
+        description: data.error || "Failed to generate the quiz questions",
+        variant: "destructive",
+      });
+    });
+
     const cleanupError = socketService.on("error", (data: any) => {
       console.error("Socket error in MultiplayerLobby:", data);
       toast({
@@ -173,6 +183,7 @@ const MultiplayerLobby = () => {
       cleanupPlayerLeft();
       cleanupConnect();
       cleanupDisconnect();
+      cleanupGameStartFailed();
       cleanupError();
     };
   }, [playerName, playerId, urlLobbyCode, contextLobbyCode, navigate, isSocketConnected]);
@@ -325,11 +336,8 @@ const MultiplayerLobby = () => {
         console.warn("Suppressed game start error:", startError);
       }
       
-      // Wait a moment for the backend to prepare, then navigate
-      setTimeout(() => {
-        console.log("Navigating to quiz page after game start");
-        navigate(`/multiplayer/quiz/${urlLobbyCode}`);
-      }, 500);
+      // Questions are generated in the background; the game_started event
+      // navigates everyone to the quiz once they are ready
       
     } catch (error) {
       console.error("Error starting game:", error);
@@ -104,19 +104,9 @@ const MultiplayerQuiz = () => {
   useEffect(() => {
     if (waitingCountdown === null || quizState !== QuizState.WAITING) return;
     
-    // If countdown reaches 0, move to next question
+    // The server advances to the next question when the countdown ends
     if (waitingCountdown <= 0) {
-      console.log("Countdown finished, moving to next question automatically");
-      
-      // If we're the host, request the next question from the server
-      // This will trigger the newQuestionHandler for all clients
-      if (isHost) {
-        console.log("Host requesting next question from server");
-        socketService.requestNextQuestion(lobbyCode);
-      } else {
-        console.log("Non-host player waiting for next question from server");
-      }
-      
+      console.log("Countdown finished, waiting for next question from server");
       setWaitingCountdown(null);
       return;
     }
@@ -127,7 +117,7 @@ const MultiplayerQuiz = () => {
     }, 1000);
     
     return () => clearTimeout(timerId);
-  }, [waitingCountdown, quizState, isHost, lobbyCode]);
+  }, [waitingCountdown, quizState]);
 
   // Fetch all quiz data at the beginning
   const fetchQuizData = async () => {
@@ -381,18 +371,11 @@ const MultiplayerQuiz = () => {
       });
     };
     
-    const allAnswersInHandler = () => {
-      console.log("All players have answered. Current state:", quizStateRef.current);
+    const allAnswersInHandler = (data: any) => {
+      console.log("Question closed. Current state:", quizStateRef.current);
       
-      // Set a 3-second countdown for all players before next question
-      setWaitingCountdown(3);
-      
-      // If in WAITING state and host, we'll let the countdown handle the next question request
-      if (isHost) {
-        console.log("Host will request next question after countdown");
-      } else {
-        console.log("Non-host player waiting for next question from server");
-      }
+      // Count down the server's reveal delay before the next question arrives
+      setWaitingCountdown(data?.reveal_delay ?? 3);
     };
     
     const newQuestionHandler = (data: any) => {
@@ -411,6 +394,9 @@ const MultiplayerQuiz = () => {
         
         // Reset question state and move to QUESTION state
         resetQuestionState();
+        if (typeof data.time_limit === "number") {
+          setCountdown(data.time_limit);
+        }
         setQuizState(QuizState.QUESTION);
         quizStateRef.current = QuizState.QUESTION;
       }
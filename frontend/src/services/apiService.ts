@@ -45,6 +45,7 @@ export interface MultiplayerGameSettings {
 
 export interface LobbyInfo {
   lobby_code: string;
+  version: number;
   players: MultiplayerPlayer[];
   settings: MultiplayerGameSettings;
   game_started: boolean;
@@ -34,6 +34,16 @@ export const fetchCategories = async (): Promise<string[]> => {
   }
 };
 
+// Stable per-browser id so the server can avoid repeating questions across quizzes
+const getQuizSessionId = (): string => {
+  let sessionId = localStorage.getItem('quizSessionId');
+  if (!sessionId) {
+    sessionId = crypto.randomUUID();
+    localStorage.setItem('quizSessionId', sessionId);
+  }
+  return sessionId;
+};
+
 export const fetchQuizByCategory = async (
   category: string,
   difficulty: string,
@@ -45,7 +55,8 @@ export const fetchQuizByCategory = async (
       topic: category,
       difficulty,
       num_questions: numQuestions.toString(),
-      image: includeImage.toString()
+      image: includeImage.toString(),
+      session_id: getQuizSessionId()
     });
 
     console.log(`Fetching quiz for category: ${category}, difficulty: ${difficulty}, questions: ${numQuestions}, image: ${includeImage}`);
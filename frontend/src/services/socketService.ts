@@ -50,7 +50,7 @@ class SocketService {
       
       // Clear other event handlers
       [
-        "lobby_update", "player_joined", "player_left", "game_started",
+        "lobby_update", "player_joined", "player_left", "game_started", "game_start_failed",
         "connection_response", "room_joined", "error", "new_question", 
         "player_answered", "all_answers_in", "scoreboard", "game_over"
       ].forEach(eventType => {
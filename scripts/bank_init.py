@@ -0,0 +1,22 @@
+"""
+Build the local SQLite question bank from the JSON files produced by converter.py.
+"""
+
+import os
+import sys
+from dotenv import load_dotenv
+
+# Make the api package importable when running this script directly
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# pylint: disable=wrong-import-position
+from api.utils.question_bank import build_question_bank, QUESTION_BANK_PATH
+
+if __name__ == "__main__":
+    load_dotenv()
+    json_directory = input("Enter the directory path containing JSON files: ").strip()
+    if not os.path.isdir(json_directory):
+        print(f"Error: The directory '{json_directory}' does not exist.")
+    else:
+        stored = build_question_bank(json_directory, QUESTION_BANK_PATH)
+        print(f"Stored {stored} questions in '{QUESTION_BANK_PATH}'.")
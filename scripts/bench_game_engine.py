@@ -0,0 +1,71 @@
+"""
+Benchmark the multiplayer game engine in isolation.
+
+Games are played start to finish directly against the engine, without sockets
+or timers firing: every player answers every question, which closes it, and the
+next question is opened at once. Answers per second are reported for
+increasing lobby sizes.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Make the api package importable when running this script directly
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+# pylint: disable=wrong-import-position
+from api.utils.multiplayer_lobby import GAME_STATE, active_lobbies, lobby_registry
+from api.utils.multiplayer_game import create_new_lobby, join_existing_lobby
+from api.utils.multiplayer_engine import game_engine
+from api.utils.multiplayer_timer import question_timer
+
+QUESTIONS = [
+    {"question": f"Question {i}?", "options": ["A) 1"], "correct_answer": "A"}
+    for i in range(10)
+]
+
+
+def run(players, games):
+    """Play full games and return answers per second."""
+    active_lobbies.clear()
+    answers = 0
+    elapsed = 0.0
+    for _ in range(games):
+        lobby = create_new_lobby("Host", "🦊")
+        code = lobby.lobby_code
+        for i in range(players - 1):
+            join_existing_lobby(code, f"Player{i}", "🐼")
+        names = [p.name for p in lobby.players]
+
+        with lobby_registry.locked(code):
+            lobby.game_state = GAME_STATE["GENERATING"]
+            start = time.perf_counter()
+            game_engine.begin(lobby, [QUESTIONS, 200])
+            for index in range(len(QUESTIONS)):
+                for name in names:
+                    game_engine.submit_answer(lobby, name, index, "A) 1", 1, True, 10)
+                game_engine.advance(lobby, index)
+            elapsed += time.perf_counter() - start
+            question_timer.cancel(code)
+            lobby_registry.delete(code)
+        answers += len(names) * len(QUESTIONS)
+    return answers / elapsed
+
+
+def main():
+    """Parse arguments and print a throughput table."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--players", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--games", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'players':>8} {'answers/s':>12}")
+    for players in args.players:
+        print(f"{players:>8} {run(players, args.games):>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
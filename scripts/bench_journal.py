@@ -0,0 +1,104 @@
+"""
+Benchmark the lobby journal on full multiplayer games.
+
+Games are played start to finish through the multiplayer service, every answer
+and every question change committed in its own lobby block, once without and
+once with the journal. The time a commit spends on the request path, the
+journal bytes and records per game, the fsyncs the writer needed and the time
+to replay the journal into a fresh registry are reported.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Make the api package importable when running this script directly
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+# pylint: disable=wrong-import-position
+from api.utils.multiplayer_lobby import GAME_STATE, active_lobbies, lobby_registry
+from api.utils.multiplayer_game import create_new_lobby, join_existing_lobby
+from api.utils.multiplayer_engine import game_engine
+from api.utils.multiplayer_journal import LobbyJournal
+from api.utils.multiplayer_player import submit_player_answer
+from api.utils.multiplayer_timer import question_timer
+
+QUESTIONS = [
+    {"question": f"Question {i}?", "options": ["A) 1"], "correct_answer": "A"}
+    for i in range(10)
+]
+
+
+def play(players, games):
+    """Play full games through the service and return the seconds and commits."""
+    elapsed = 0.0
+    commits = 0
+    for _ in range(games):
+        lobby = create_new_lobby("Host", "🦊")
+        code = lobby.lobby_code
+        for i in range(players - 1):
+            join_existing_lobby(code, f"Player{i}", "🐼")
+        names = [p.name for p in lobby.players]
+
+        start = time.perf_counter()
+        with lobby_registry.locked(code) as lobby:
+            lobby.game_state = GAME_STATE["GENERATING"]
+            game_engine.begin(lobby, [QUESTIONS, 200])
+        for index in range(len(QUESTIONS)):
+            for name in names:
+                submit_player_answer(code, name, index, "A) 1", 1, True, 10)
+            with lobby_registry.locked(code) as lobby:
+                game_engine.advance(lobby, index)
+        elapsed += time.perf_counter() - start
+        commits += 1 + len(QUESTIONS) * (len(names) + 1)
+        question_timer.cancel(code)
+    return elapsed, commits
+
+
+def main():
+    """Parse arguments and print the journal costs per lobby size."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--players", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--games", type=int, default=50)
+    args = parser.parse_args()
+
+    print(
+        f"{'players':>8} {'us/commit':>10} {'+journal':>9} {'KB/game':>8} "
+        f"{'records/game':>13} {'fsyncs':>7} {'replay ms':>10}"
+    )
+    for players in args.players:
+        active_lobbies.clear()
+        bare, commits = play(players, args.games)
+
+        with tempfile.TemporaryDirectory() as directory:
+            active_lobbies.clear()
+            journal = LobbyJournal(directory)
+            journal.start(lobby_registry)
+            journaled, _ = play(players, args.games)
+            journal.flush()
+            stats = journal.get_stats()
+            lobby_registry._commit_listeners.remove(  # pylint: disable=protected-access
+                journal.record
+            )
+            lobby_registry._delete_listeners.remove(  # pylint: disable=protected-access
+                journal.forget
+            )
+
+            replay = LobbyJournal(directory)
+            replay.replay()
+
+        print(
+            f"{players:>8} {bare / commits * 1e6:>10.1f} "
+            f"{(journaled - bare) / commits * 1e6:>9.1f} "
+            f"{stats['bytes_per_game'] / 1024:>8.1f} "
+            f"{stats['records'] / args.games:>13.0f} {stats['commits']:>7} "
+            f"{replay.stats['replay_seconds'] * 1000:>10.1f}"
+        )
+    active_lobbies.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark the incremental leaderboard against sorting every player.
+
+Every player's score changes once per question. The sorting approach copies
+and sorts all players after each question, as scoreboards were built before;
+the leaderboard applies each score change as it happens and answers top-K and
+rank queries from its sorted list. Microseconds per operation are reported for
+increasing player counts.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# Make the api package importable when running this script directly
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+# pylint: disable=wrong-import-position
+from api.utils.multiplayer_leaderboard import Leaderboard
+
+TOP = 10
+
+
+def sorted_ranks(scores):
+    """Copy and sort every player, then rank them, as one full rebuild."""
+    players = sorted(
+        ({"id": key, "score": score} for key, score in scores.items()),
+        key=lambda p: -p["score"],
+    )
+    ranks = {}
+    for index, player in enumerate(players):
+        previous = players[index - 1] if index else None
+        ranks[player["id"]] = (
+            ranks[previous["id"]]
+            if previous and previous["score"] == player["score"]
+            else index + 1
+        )
+    return players[:TOP], ranks
+
+
+def timed(func, repeat):
+    """Return the microseconds per call of a function."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def run(players, questions):
+    """Return the costs of both approaches for a player count."""
+    rng = random.Random(players)
+    keys = [f"player{i}" for i in range(players)]
+    scores = dict.fromkeys(keys, 0)
+    leaderboard = Leaderboard(scores.items())
+    updates = [
+        [(key, rng.choice([0, 0, rng.randrange(100, 1000)])) for key in keys]
+        for _ in range(questions)
+    ]
+
+    start = time.perf_counter()
+    for question in updates:
+        for key, score in question:
+            leaderboard.update(key, leaderboard.score(key) + score)
+    update_us = (time.perf_counter() - start) / (players * questions) * 1e6
+
+    for question in updates:
+        for key, score in question:
+            scores[key] += score
+
+    repeat = max(1, 20000 // players)
+    probe = keys[players // 2]
+    return {
+        "update": update_us,
+        "rank": timed(lambda: leaderboard.rank(probe), 10000),
+        "top": timed(lambda: leaderboard.top(TOP), 10000),
+        "rebuild": timed(lambda: sorted_ranks(scores), repeat),
+        "ranks_all": timed(
+            lambda: {key: rank for rank, key, _ in leaderboard.top()}, repeat
+        ),
+    }
+
+
+def main():
+    """Parse arguments and print a table of microseconds per operation."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--players", type=int, nargs="+", default=[8, 100, 1000, 10000])
+    parser.add_argument("--questions", type=int, default=10)
+    args = parser.parse_args()
+
+    print(
+        f"{'players':>8} {'update us':>10} {'rank us':>8} {'top-10 us':>10} "
+        f"{'full sort us':>13} {'all ranks us':>13}"
+    )
+    for players in args.players:
+        stats = run(players, args.questions)
+        print(
+            f"{players:>8} {stats['update']:>10.2f} {stats['rank']:>8.2f} "
+            f"{stats['top']:>10.2f} {stats['rebuild']:>13.1f} "
+            f"{stats['ranks_all']:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
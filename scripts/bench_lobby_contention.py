@@ -0,0 +1,120 @@
+"""
+Benchmark multiplayer lock contention across many concurrent lobbies.
+
+Worker threads toggle ready states and avatars in randomly chosen lobbies.
+Every save simulates a shared store round-trip, which runs while the lobby lock
+is held, and every broadcast simulates a socket write after it is released.
+Throughput is reported for increasing lobby counts, once with the per-lobby
+locks and once with every lobby sharing one lock as before the lobby registry
+existed; both runs do the same work under the lock.
+
+Quiz pre-generation is stubbed out, so ready toggles make no model calls.
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+# Make the api package importable when running this script directly
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+# pylint: disable=wrong-import-position
+import api.socket_server
+from api.utils import multiplayer_game
+from api.utils.multiplayer_broadcast import LOBBY_UPDATE_INTERVAL
+from api.utils.multiplayer_lobby import active_lobbies, lobby_registry
+from api.utils.multiplayer_game import (
+    create_new_lobby,
+    join_existing_lobby,
+    update_player_ready_status,
+)
+from api.utils.multiplayer_player import update_player_avatar
+
+
+class FakeSocketIO:
+    """Stand-in SocketIO whose emits take as long as a socket write."""
+
+    def __init__(self, emit_latency):
+        self.emit_latency = emit_latency
+
+    def emit(self, *_args, **_kwargs):
+        """Simulate writing an event to every client of a room."""
+        time.sleep(self.emit_latency)
+
+
+class NoPregeneration:
+    """Stand-in quiz pregenerator that never generates questions."""
+
+    def schedule(self, *_args):
+        """Ignore the request to pre-generate a lobby's quiz."""
+
+    def discard(self, *_args):
+        """Ignore the request to drop a lobby's pre-generated quiz."""
+
+
+def run(lobby_count, threads, duration, global_lock):
+    """Run the workload and return operations per second."""
+    active_lobbies.clear()
+    codes = []
+    for i in range(lobby_count):
+        lobby = create_new_lobby(f"Host{i}", "🦊")
+        join_existing_lobby(lobby.lobby_code, "Guest", "🐼")
+        codes.append(lobby.lobby_code)
+
+    if global_lock:
+        # Every lobby shares one lock, so the same saves run one at a time
+        shared = threading.RLock()
+        for code in codes:
+            lobby_registry._locks[code] = shared  # pylint: disable=protected-access
+
+    stop = time.monotonic() + duration
+    counts = [0] * threads
+
+    def worker(index):
+        rng = random.Random(index)
+        while time.monotonic() < stop:
+            code = rng.choice(codes)
+            update_player_ready_status(code, "Guest", rng.random() < 0.5)
+            update_player_avatar(code, "Guest", "🐸")
+            counts[index] += 2
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    # Let the coalesced lobby updates still pending flush before the next run
+    time.sleep(LOBBY_UPDATE_INTERVAL * 2)
+    return sum(counts) / duration
+
+
+def main():
+    """Parse arguments and print a throughput table."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lobbies", type=int, nargs="+", default=[1, 10, 100, 500])
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=2.0)
+    parser.add_argument("--save-latency", type=float, default=0.001)
+    parser.add_argument("--emit-latency", type=float, default=0.001)
+    args = parser.parse_args()
+
+    api.socket_server.socketio = FakeSocketIO(args.emit_latency)
+    multiplayer_game.quiz_pregenerator = NoPregeneration()
+    lobby_registry.store.save = lambda lobby: time.sleep(args.save_latency)
+
+    print(f"{'lobbies':>8} {'global lock ops/s':>18} {'per-lobby ops/s':>16} {'speedup':>8}")
+    for lobby_count in args.lobbies:
+        serialized = run(lobby_count, args.threads, args.duration, global_lock=True)
+        per_lobby = run(lobby_count, args.threads, args.duration, global_lock=False)
+        print(
+            f"{lobby_count:>8} {serialized:>18.0f} {per_lobby:>16.0f} "
+            f"{per_lobby / serialized:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Measure the memory held per finished multiplayer game with tracemalloc.
+
+Full lobbies play every question to the end and send their final results, as
+broadcast_game_over does, then the memory traced while building them is
+divided by the number of lobbies. The slotted Lobby, Player and Answer records
+are compared against the dictionaries lobbies were stored as before, which
+repeated the question fields in every answer and kept a second copy of every
+player in the final results.
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+import uuid
+
+# Make the api package importable when running this script directly
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+# pylint: disable=wrong-import-position
+from api.utils.multiplayer_lobby import GAME_STATE, add_player
+from api.utils.multiplayer_models import (
+    Answer,
+    AnswerOutcome,
+    Lobby,
+    Player,
+    serialize_results,
+)
+
+SETTINGS = {
+    "numQuestions": 10,
+    "categories": [],
+    "difficulty": "medium",
+    "timePerQuestion": 15,
+    "revealDelay": 3,
+    "allowSkipping": False,
+    "topic": None,
+    "model": "gemini",
+}
+
+
+def build_questions(count):
+    """Build the question list shared by every answer of a lobby."""
+    return [
+        {
+            "index": i + 1,
+            "question": f"Which of these facts about topic number {i} is true?",
+            "options": [f"{letter}) Option {letter} of {i}" for letter in "ABCD"],
+            "correct_answer": "A",
+            "difficulty": "medium",
+            "image": False,
+        }
+        for i in range(count)
+    ]
+
+
+def build_dict_lobby(code, players, questions):
+    """Build a finished lobby the way it was stored as dictionaries."""
+    lobby = {
+        "lobby_code": code,
+        "created_at": 0.0,
+        "last_activity": 0.0,
+        "host_id": None,
+        "version": 0,
+        "game_state": GAME_STATE["GAME_OVER"],
+        "current_question_idx": len(questions) - 1,
+        "players": [],
+        "players_by_name": {},
+        "players_by_id": {},
+        "settings": dict(SETTINGS),
+        "questions": [questions, 200],
+        "answered": {},
+        "all_answers_received": True,
+        "waiting_for_next_question": False,
+        "game_started": True,
+        "game_over": True,
+    }
+    for i in range(players):
+        player = {
+            "id": str(uuid.uuid4()),
+            "name": f"Player{i}",
+            "isHost": i == 0,
+            "avatar": "🦊",
+            "ready": True,
+            "currentQuestion": len(questions),
+            "score": 0,
+            "correctAnswers": 0,
+            "totalQuestions": len(questions),
+            "answers": [],
+        }
+        for index, question in enumerate(questions):
+            player["answers"].append(
+                {
+                    "question_index": index,
+                    "question": question["question"],
+                    "userAnswer": question["options"][0],
+                    "correctAnswer": question["correct_answer"],
+                    "isCorrect": True,
+                    "score": 10,
+                    "timeTaken": 4.2,
+                }
+            )
+            player["score"] += 10
+            player["correctAnswers"] += 1
+            lobby["answered"].setdefault(index, set()).add(player["id"])
+        lobby["players"].append(player)
+        lobby["players_by_name"][player["name"]] = player
+        lobby["players_by_id"][player["id"]] = player
+    lobby["final_results"] = [
+        {
+            key: player[key]
+            for key in (
+                "id",
+                "name",
+                "isHost",
+                "avatar",
+                "score",
+                "correctAnswers",
+                "totalQuestions",
+                "answers",
+            )
+        }
+        for player in lobby["players"]
+    ]
+    return lobby
+
+
+def build_slotted_lobby(code, players, questions):
+    """Build a finished lobby from the slotted records."""
+    lobby = Lobby(code, None, dict(SETTINGS), 0.0, 0.0)
+    lobby.questions = [questions, 200]
+    lobby.game_state = GAME_STATE["GAME_OVER"]
+    lobby.current_question_idx = len(questions) - 1
+    for i in range(players):
+        player = Player(str(uuid.uuid4()), f"Player{i}", "🦊", is_host=i == 0)
+        player.ready = True
+        player.current_question = player.total_questions = len(questions)
+        for index in range(len(questions)):
+            player.answers.append(Answer(index, 0, AnswerOutcome.CORRECT, 10, 4.2))
+            player.score += 10
+            player.correct_answers += 1
+            lobby.answered.setdefault(index, set()).add(player.id)
+        add_player(lobby, player)
+        lobby.leaderboard.update(player.id, player.score)
+    lobby.final_players = list(lobby.players)
+    # Send the results like game over does; nothing of them may stay behind
+    serialize_results(lobby)
+    return lobby
+
+
+def measure(build, lobbies, players, questions):
+    """Return the bytes traced per lobby while building `lobbies` lobbies."""
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    kept = [
+        build(f"L{i:05d}", players, build_questions(questions)) for i in range(lobbies)
+    ]
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del kept
+    return size / lobbies
+
+
+def main():
+    """Parse arguments and print the memory per lobby."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lobbies", type=int, default=1000)
+    parser.add_argument("--players", type=int, default=8)
+    parser.add_argument("--questions", type=int, nargs="+", default=[10, 30])
+    args = parser.parse_args()
+
+    print(f"{'questions':>9} {'dict bytes':>11} {'slotted bytes':>14} {'saved':>6}")
+    for questions in args.questions:
+        as_dicts = measure(build_dict_lobby, args.lobbies, args.players, questions)
+        slotted = measure(build_slotted_lobby, args.lobbies, args.players, questions)
+        print(
+            f"{questions:>9} {as_dicts:>11.0f} {slotted:>14.0f} "
+            f"{1 - slotted / as_dicts:>6.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Benchmark the JSON and msgpack Socket.IO codecs on 8-player games.
+
+Games are played through the multiplayer service with every emitted event
+recorded instead of sent. Each event is then encoded as the JSON packet every
+client gets by default and as the msgpack packet of clients connecting with
+?codec=msgpack, which sends hot events under numeric keys. Bytes on the wire
+and encode CPU are reported per event type, and in total per game.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+# Make the api package importable when running this script directly
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+# pylint: disable=wrong-import-position
+from socketio import packet
+from api import socket_server
+from api.utils.multiplayer_codec import CodecPacket
+from api.utils.multiplayer_emitter import event_emitter
+from api.utils.multiplayer_engine import game_engine
+from api.utils.multiplayer_game import create_new_lobby, join_existing_lobby
+from api.utils.multiplayer_lobby import GAME_STATE, active_lobbies, lobby_registry
+from api.utils.multiplayer_player import submit_player_answer
+from api.utils.multiplayer_timer import question_timer
+
+AVATARS = ["🦊", "🐼", "🐸", "🐯", "🦁", "🐨", "🐙", "🦄"]
+
+QUESTIONS = [
+    {
+        "index": i,
+        "question": f"Which of these planets has the most known moons as of 2023? ({i})",
+        "options": ["A) Jupiter", "B) Saturn", "C) Uranus", "D) Neptune"],
+        "correct_answer": "B",
+        "difficulty": "medium",
+        "image": False,
+    }
+    for i in range(10)
+]
+
+
+class Recorder:
+    """Stands in for the Socket.IO server, keeping every emitted event."""
+
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event, data, room=None):
+        """Record an event."""
+        self.events.append((event, data, room))
+
+    @staticmethod
+    def start_background_task(target, *args):
+        """Run a background task right away."""
+        target(*args)
+
+
+def play(players, games):
+    """Play full games through the service and return the recorded events."""
+    recorder = Recorder()
+    socket_server.socketio = recorder
+    rng = random.Random(players)
+    for _ in range(games):
+        active_lobbies.clear()
+        lobby = create_new_lobby("Host", AVATARS[0])
+        code = lobby.lobby_code
+        for i in range(1, players):
+            join_existing_lobby(code, f"Player{i}", AVATARS[i % len(AVATARS)])
+        names = [p.name for p in lobby.players]
+
+        with lobby_registry.locked(code) as lobby:
+            lobby.game_state = GAME_STATE["GENERATING"]
+            game_engine.begin(lobby, [QUESTIONS, 200])
+        for index, question in enumerate(QUESTIONS):
+            for name in names:
+                correct = rng.random() < 0.6
+                answer = question["options"][1 if correct else rng.choice([0, 2, 3])]
+                score = rng.randint(400, 1000) if correct else 0
+                submit_player_answer(
+                    code, name, index, answer, rng.uniform(2, 15), correct, score
+                )
+            with lobby_registry.locked(code) as lobby:
+                game_engine.advance(lobby, index)
+        question_timer.cancel(code)
+        event_emitter.join()
+    socket_server.socketio = None
+    return recorder.events
+
+
+def encoders(pkt):
+    """Return the payload encoders of both codecs, with Engine.IO's framing."""
+    return {
+        # Text frames carry the Engine.IO message type, binary frames do not
+        "json": lambda: "4" + pkt.encode(),
+        "msgpack": pkt.encode_msgpack,
+    }
+
+
+def timed(func, repeat):
+    """Return the microseconds per call of a function."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def measure(events, repeat):
+    """Return the bytes and encode microseconds per codec, by event type."""
+    stats = defaultdict(lambda: defaultdict(float))
+    for event, data, _ in events:
+        pkt = CodecPacket(packet.EVENT, namespace="/", data=[event, data])
+        row = stats[event]
+        row["count"] += 1
+        for codec, encode in encoders(pkt).items():
+            payload = encode()
+            row[f"{codec}_bytes"] += len(
+                payload.encode("utf-8") if isinstance(payload, str) else payload
+            )
+            row[f"{codec}_us"] += timed(encode, repeat)
+    return stats
+
+
+def main():
+    """Parse arguments and print the codec costs per event type."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--players", type=int, default=8)
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    stats = measure(play(args.players, args.games), args.repeat)
+    print(
+        f"{'event':>16} {'per game':>9} {'JSON B':>7} {'msgpack B':>10} "
+        f"{'saved':>6} {'JSON us':>8} {'msgpack us':>11}"
+    )
+    totals = defaultdict(float)
+    for event, row in sorted(stats.items(), key=lambda item: -item[1]["json_bytes"]):
+        for key, value in row.items():
+            totals[key] += value
+        count = row["count"]
+        print(
+            f"{event:>16} {count / args.games:>9.1f} "
+            f"{row['json_bytes'] / count:>7.0f} {row['msgpack_bytes'] / count:>10.0f} "
+            f"{1 - row['msgpack_bytes'] / row['json_bytes']:>6.0%} "
+            f"{row['json_us'] / count:>8.2f} {row['msgpack_us'] / count:>11.2f}"
+        )
+    print(
+        f"{'game total':>16} {totals['count'] / args.games:>9.1f} "
+        f"{totals['json_bytes'] / args.games:>7.0f} "
+        f"{totals['msgpack_bytes'] / args.games:>10.0f} "
+        f"{1 - totals['msgpack_bytes'] / totals['json_bytes']:>6.0%} "
+        f"{totals['json_us'] / args.games:>8.0f} "
+        f"{totals['msgpack_us'] / args.games:>11.0f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Benchmark concurrent Socket.IO connections on the threaded and asyncio servers.
+
+The server runs in a child process pinned to one CPU core, either the threaded
+Werkzeug server of wsgi.py or the asyncio server of asgi.py under uvicorn. Raw
+engine.io websocket clients connect in batches until the target count is
+reached, then every client sends validate_lobby at once and waits for the
+answer. Server threads, resident memory and the round-trip latency of that
+burst are reported per connection count.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import requests
+import websockets
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+SERVERS = {
+    "threading": "wsgi.py",
+    "asgi": "asgi.py",
+}
+
+
+def start_server(mode, port, workdir):
+    """Start the server of a mode on one CPU core and return its process."""
+    env = dict(os.environ, FLASK_ENV="TESTING", PORT=str(port))
+    env.setdefault("GOOGLE_API_KEY", "benchmark")
+    process = subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, os.path.join(ROOT, SERVERS[mode])],
+        cwd=workdir,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        preexec_fn=lambda: os.sched_setaffinity(0, {0}),
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/api/", timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{mode} server did not start")
+
+
+def server_usage(pid):
+    """Return the thread count and resident memory in MB of a process."""
+    with open(f"/proc/{pid}/status", encoding="utf-8") as status:
+        fields = dict(line.split(":", 1) for line in status)
+    return int(fields["Threads"]), int(fields["VmRSS"].split()[0]) / 1024
+
+
+class Client:
+    """A raw engine.io websocket client speaking the Socket.IO protocol."""
+
+    def __init__(self, port):
+        self.url = f"ws://127.0.0.1:{port}/socket.io/?EIO=4&transport=websocket"
+        self.ws = None
+        self.events = asyncio.Queue()
+        self.reader = None
+
+    async def connect(self):
+        """Open the websocket and the default namespace."""
+        self.ws = await websockets.connect(self.url, open_timeout=30, max_queue=None)
+        await self.ws.recv()  # engine.io open packet
+        await self.ws.send("40")
+        self.reader = asyncio.create_task(self._read())
+
+    async def _read(self):
+        """Answer pings and queue received events."""
+        async for message in self.ws:
+            if message == "2":
+                await self.ws.send("3")
+            elif message.startswith("42"):
+                await self.events.put(json.loads(message[2:]))
+
+    async def request(self, event, data, reply):
+        """Send an event and return the seconds until the reply event arrives."""
+        start = time.perf_counter()
+        await self.ws.send("42" + json.dumps([event, data]))
+        while (await self.events.get())[0] != reply:
+            pass
+        return time.perf_counter() - start
+
+    async def close(self):
+        """Close the connection."""
+        self.reader.cancel()
+        await self.ws.close()
+
+
+async def measure(port, pid, connections, batch):
+    """Connect clients, burst validate_lobby from all of them and return the stats."""
+    clients = []
+    stage = "connecting"
+    start = time.perf_counter()
+    try:
+        for offset in range(0, connections, batch):
+            group = [Client(port) for _ in range(min(batch, connections - offset))]
+            await asyncio.gather(*(c.connect() for c in group))
+            clients.extend(group)
+        connect_time = time.perf_counter() - start
+        await asyncio.sleep(1)
+        threads, rss = server_usage(pid)
+
+        stage = "answering"
+        latencies = await asyncio.wait_for(
+            asyncio.gather(
+                *(
+                    c.request(
+                        "validate_lobby",
+                        {"lobby_code": "NOPE00"},
+                        "validate_lobby_response",
+                    )
+                    for c in clients
+                )
+            ),
+            timeout=30,
+        )
+        latencies = sorted(latencies)
+        return {
+            "connected": len(clients),
+            "connect_s": connect_time,
+            "threads": threads,
+            "rss_mb": rss,
+            "p50_ms": statistics.median(latencies) * 1000,
+            "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        }
+    except (OSError, asyncio.TimeoutError, websockets.WebSocketException) as e:
+        return {"connected": len(clients), "error": f"{type(e).__name__} {stage}"}
+    finally:
+        await asyncio.gather(*(c.close() for c in clients), return_exceptions=True)
+
+
+def main():
+    """Parse arguments and print a table per server mode."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--modes", nargs="+", default=list(SERVERS))
+    parser.add_argument("--connections", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--batch", type=int, default=50)
+    parser.add_argument("--port", type=int, default=5700)
+    args = parser.parse_args()
+
+    print(
+        f"{'mode':>10} {'conns':>6} {'connect s':>10} {'threads':>8} "
+        f"{'RSS MB':>7} {'KB/conn':>8} {'p50 ms':>8} {'p95 ms':>8}"
+    )
+    for mode in args.modes:
+        with tempfile.TemporaryDirectory() as workdir:
+            for connections in args.connections:
+                process = start_server(mode, args.port, workdir)
+                try:
+                    _, idle_rss = server_usage(process.pid)
+                    stats = asyncio.run(
+                        measure(args.port, process.pid, connections, args.batch)
+                    )
+                finally:
+                    process.terminate()
+                    process.wait()
+                if "error" in stats:
+                    print(
+                        f"{mode:>10} {connections:>6} failed with "
+                        f"{stats['connected']} connected: {stats['error']}"
+                    )
+                    continue
+                per_conn = (stats["rss_mb"] - idle_rss) * 1024 / connections
+                print(
+                    f"{mode:>10} {connections:>6} {stats['connect_s']:>10.2f} "
+                    f"{stats['threads']:>8} {stats['rss_mb']:>7.1f} {per_conn:>8.1f} "
+                    f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
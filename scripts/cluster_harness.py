@@ -0,0 +1,166 @@
+"""
+Run a local cluster of server nodes and move lobbies between them.
+
+Every node is a separate server process owning the lobby codes the consistent
+hash ring assigns to it. Lobbies are created on the first nodes, then a node
+joins the cluster and later leaves it again. After every change each lobby must
+still be reachable through any node, by following the redirect to its owner,
+with all of its players.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import requests
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Secret the nodes of the harness share for cluster requests
+SECRET = "cluster-harness"
+
+
+def start_node(port, nodes, workdir):
+    """Start a server node on a port and return its process."""
+    env = dict(
+        os.environ,
+        FLASK_ENV="TESTING",
+        PORT=str(port),
+        CLUSTER_NODE_URL=node_url(port),
+        CLUSTER_NODES=",".join(nodes),
+        CLUSTER_SECRET=SECRET,
+    )
+    env.setdefault("GOOGLE_API_KEY", "benchmark")
+    process = subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, os.path.join(ROOT, "wsgi.py")],
+        cwd=workdir,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            requests.get(f"{node_url(port)}/api/", timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"Node on port {port} did not start")
+
+
+def node_url(port):
+    """Return the base URL of the node on a port."""
+    return f"http://127.0.0.1:{port}"
+
+
+def set_nodes(targets, nodes):
+    """
+    Send the node list to each target node and return the lobbies each moved.
+
+    Nodes hand off their lobbies in the background, so this waits until no
+    target has a lobby still moving.
+    """
+    moved = {}
+    for target in targets:
+        response = requests.put(
+            f"{target}/api/multiplayer/cluster/nodes",
+            json={"nodes": nodes},
+            headers={"X-Cluster-Secret": SECRET},
+            timeout=30,
+        )
+        response.raise_for_status()
+        moved[target] = response.json()["moving_lobbies"]
+
+    deadline = time.time() + 60
+    for target in targets:
+        while time.time() < deadline:
+            response = requests.get(
+                f"{target}/api/multiplayer/cluster/nodes", timeout=5
+            )
+            if not response.json()["moving_lobbies"]:
+                break
+            time.sleep(0.1)
+    return moved
+
+
+def check_lobbies(nodes, lobbies):
+    """Return the lobbies that cannot be reached with all of their players."""
+    missing = []
+    for i, (code, players) in enumerate(lobbies.items()):
+        # Ask a node that may not own the lobby and follow its redirect
+        entry = nodes[i % len(nodes)]
+        response = requests.get(f"{entry}/api/multiplayer/lobby/{code}", timeout=5)
+        names = [p["name"] for p in response.json().get("players", [])]
+        if response.status_code != 200 or names != players:
+            missing.append(code)
+    return missing
+
+
+def report(step, moved, nodes, lobbies):
+    """Print how many lobbies moved and are reachable, and return whether all are."""
+    missing = check_lobbies(nodes, lobbies)
+    print(
+        f"{step:>12}: moved {sum(moved.values()):>4} lobbies, "
+        f"{len(lobbies) - len(missing):>4}/{len(lobbies)} reachable"
+    )
+    return not missing
+
+
+def run(lobbies_count, base_port):
+    """Create lobbies, add and remove a node, and return whether every check passed."""
+    first = [node_url(base_port), node_url(base_port + 1)]
+    joining = node_url(base_port + 2)
+    processes = []
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            for port in (base_port, base_port + 1):
+                processes.append(start_node(port, first, workdir))
+
+            lobbies = {}
+            for i in range(lobbies_count):
+                entry = first[i % len(first)]
+                code = requests.post(
+                    f"{entry}/api/multiplayer/create",
+                    json={"host_name": "Host", "avatar": "🦊"},
+                    timeout=5,
+                ).json()["lobby_code"]
+                # Join through the other node, which redirects to the owner
+                other = first[(i + 1) % len(first)]
+                requests.post(
+                    f"{other}/api/multiplayer/join",
+                    json={"lobby_code": code, "player_name": "Guest", "avatar": "🐼"},
+                    timeout=5,
+                ).raise_for_status()
+                lobbies[code] = ["Host", "Guest"]
+
+            ok = report("two nodes", {}, first, lobbies)
+
+            processes.append(start_node(base_port + 2, first + [joining], workdir))
+            moved = set_nodes(first + [joining], first + [joining])
+            ok = report("node joined", moved, first + [joining], lobbies) and ok
+
+            # The leaving node hands off its lobbies before it stops
+            moved = set_nodes([joining] + first, first)
+            processes.pop().terminate()
+            ok = report("node left", moved, first, lobbies) and ok
+        finally:
+            for process in processes:
+                process.terminate()
+                process.wait()
+    return ok
+
+
+def main():
+    """Parse arguments, run the harness and exit non-zero on failure."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lobbies", type=int, default=60)
+    parser.add_argument("--base-port", type=int, default=5600)
+    args = parser.parse_args()
+    sys.exit(0 if run(args.lobbies, args.base_port) else 1)
+
+
+if __name__ == "__main__":
+    main()
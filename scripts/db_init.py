@@ -6,7 +6,7 @@ import os
 import json
 from typing import Tuple, Optional
 from dotenv import load_dotenv
-from pymongo import MongoClient
+from pymongo import MongoClient, ASCENDING
 from pymongo.database import Database
 from pymongo.errors import ConnectionFailure, ConfigurationError
 
@@ -88,6 +88,9 @@ def upload_trivia_data(conn_string: str, json_dir: str, db_name: str = "trivia-q
                         result = collection.insert_many(questions)
                         print(f"Inserted {len(result.inserted_ids)} documents into '{collection_name}' collection.")
                         total_documents += len(result.inserted_ids)
+
+                        # Index difficulty so sampling can filter before $sample
+                        collection.create_index([("difficulty", ASCENDING)])
                     else:
                         print(f"No questions found in {json_file}")
 
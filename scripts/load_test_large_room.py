@@ -0,0 +1,317 @@
+"""
+Load test one large-room lobby with a thousand or more players.
+
+The asyncio server of asgi.py runs in a child process, with question generation
+replaced by fixed questions so no model is called. Players join the lobby over
+REST, connect raw engine.io websocket clients and join its room, and the host
+starts the game. Every player answers each question after a random delay, so
+the question closes once all answers are in.
+
+Per question, the time from the last answer to every player receiving their
+rank is measured, along with the events and bytes each client received and the
+server's CPU time and memory. The run fails unless every player gets every
+question and their final rank.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import httpx
+
+# The benchmark clients are shared with the connection benchmark
+from bench_socket_connections import Client, server_usage
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+QUESTIONS = [
+    {
+        "question": f"Question {i}?",
+        "options": ["A) 1", "B) 2", "C) 3", "D) 4"],
+        "correct_answer": "A",
+    }
+    for i in range(20)
+]
+
+
+def serve(port, questions):
+    """Run the asyncio server with fixed questions instead of a model."""
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+    # pylint: disable=import-outside-toplevel
+    import uvicorn
+    from api.app import create_asgi_app
+    from api.utils import multiplayer_game
+
+    multiplayer_game.generate_questions_data = lambda quiz_params: (
+        [QUESTIONS[:questions], 200],
+        None,
+    )
+    uvicorn.run(
+        create_asgi_app("TESTING"), host="127.0.0.1", port=port, log_level="warning"
+    )
+
+
+def start_server(port, questions):
+    """Start the server in a child process and return it."""
+    process = subprocess.Popen(  # pylint: disable=consider-using-with
+        [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--serve",
+            "--port",
+            str(port),
+            "--questions",
+            str(questions),
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/", timeout=1)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("Server did not start")
+
+
+def cpu_seconds(pid):
+    """Return the CPU seconds a process used so far."""
+    with open(f"/proc/{pid}/stat", encoding="utf-8") as stat:
+        fields = stat.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+class Player(Client):
+    """A websocket client playing the game, counting what it receives."""
+
+    def __init__(self, port, name):
+        super().__init__(port)
+        self.name = name
+        self.events_received = 0
+        self.bytes_received = 0
+        self.questions = set()
+        self.ranks = {}  # question index -> monotonic receive time
+        self.final_rank = None
+
+    async def _read(self):
+        """Answer pings and queue received events, counting them."""
+        async for message in self.ws:
+            if message == "2":
+                await self.ws.send("3")
+            elif message.startswith("42"):
+                self.events_received += 1
+                self.bytes_received += len(message)
+                await self.events.put(json.loads(message[2:]))
+
+    async def send(self, event, data):
+        """Send an event."""
+        await self.ws.send("42" + json.dumps([event, data]))
+
+    async def wait_for(self, event):
+        """Wait until an event arrives, dropping the events before it."""
+        while (await self.events.get())[0] != event:
+            pass
+
+    async def play(self, lobby_code, answer_window, answers_sent):
+        """Answer every question until the final rank arrives."""
+        while self.final_rank is None:
+            event, *args = await self.events.get()
+            data = args[0] if args else {}
+            if event == "new_question":
+                index = data["question_index"]
+                self.questions.add(index)
+                await asyncio.sleep(random.uniform(0, answer_window))
+                correct = random.random() < 0.6
+                await self.send(
+                    "submit_answer",
+                    {
+                        "lobby_code": lobby_code,
+                        "player_name": self.name,
+                        "question_index": index,
+                        "answer": "A) 1" if correct else "B) 2",
+                        "time_taken": 1,
+                        "is_correct": correct,
+                        "score": random.randint(100, 1000) if correct else 0,
+                    },
+                )
+                answers_sent[index] = max(
+                    answers_sent.get(index, 0), time.perf_counter()
+                )
+            elif event == "player_rank":
+                if data.get("final"):
+                    self.final_rank = data["rank"]
+                else:
+                    self.ranks[data["question_index"]] = time.perf_counter()
+
+
+async def join_players(port, players, settings):
+    """Create a lobby, join every player over REST and return the code and ids."""
+    base = f"http://127.0.0.1:{port}/api/multiplayer"
+    async with httpx.AsyncClient(timeout=30) as client:
+        response = await client.post(
+            f"{base}/create", json={"host_name": "Player0", "avatar": "🦊"}
+        )
+        lobby_code = response.json()["lobby_code"]
+        ids = {"Player0": response.json()["host_id"]}
+        (
+            await client.post(
+                f"{base}/settings",
+                json={"lobby_code": lobby_code, "settings": settings},
+            )
+        ).raise_for_status()
+
+        limit = asyncio.Semaphore(50)
+
+        async def join(name):
+            async with limit:
+                response = await client.post(
+                    f"{base}/join",
+                    json={
+                        "lobby_code": lobby_code,
+                        "player_name": name,
+                        "avatar": "🐼",
+                    },
+                )
+                response.raise_for_status()
+                ids[name] = response.json()["player_id"]
+
+        await asyncio.gather(*(join(f"Player{i}") for i in range(1, players)))
+        (
+            await client.post(
+                f"{base}/ready",
+                json={
+                    "lobby_code": lobby_code,
+                    "player_name": "Player1",
+                    "ready": True,
+                },
+            )
+        ).raise_for_status()
+    return lobby_code, ids
+
+
+async def run(port, pid, players, questions, answer_window, batch):
+    """Play one game with every player and return the measurements."""
+    lobby_code, ids = await join_players(
+        port,
+        players,
+        {
+            "largeRoom": True,
+            "numQuestions": questions,
+            "timePerQuestion": answer_window + 30,
+            "revealDelay": 2,
+        },
+    )
+
+    clients = [Player(port, name) for name in ids]
+    try:
+        for offset in range(0, len(clients), batch):
+            group = clients[offset : offset + batch]
+            await asyncio.gather(*(c.connect() for c in group))
+            for c in group:
+                await c.send(
+                    "join_room",
+                    {
+                        "lobby_code": lobby_code,
+                        "player_name": c.name,
+                        "player_id": ids[c.name],
+                    },
+                )
+            await asyncio.gather(*(c.wait_for("room_joined") for c in group))
+        _, idle_rss = server_usage(pid)
+
+        answers_sent = {}
+        cpu_start = cpu_seconds(pid)
+        start = time.perf_counter()
+        games = [
+            asyncio.create_task(c.play(lobby_code, answer_window, answers_sent))
+            for c in clients
+        ]
+        await clients[0].send("start_game", {"lobby_code": lobby_code})
+        await asyncio.wait_for(asyncio.gather(*games), timeout=questions * 60)
+        elapsed = time.perf_counter() - start
+        cpu = cpu_seconds(pid) - cpu_start
+        _, rss = server_usage(pid)
+    finally:
+        await asyncio.gather(*(c.close() for c in clients), return_exceptions=True)
+
+    latencies = sorted(
+        received - answers_sent[index]
+        for c in clients
+        for index, received in c.ranks.items()
+    )
+    complete = all(
+        len(c.questions) == questions
+        and len(c.ranks) == questions
+        and c.final_rank is not None
+        for c in clients
+    )
+    return {
+        "complete": complete,
+        "seconds": elapsed,
+        "cpu_s": cpu,
+        "rss_mb": rss,
+        "idle_rss_mb": idle_rss,
+        "events": statistics.mean(c.events_received for c in clients) / questions,
+        "kb": statistics.mean(c.bytes_received for c in clients) / questions / 1024,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def main():
+    """Parse arguments, run the load test per player count and report it."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--players", type=int, nargs="+", default=[250, 500, 1000])
+    parser.add_argument("--questions", type=int, default=5)
+    parser.add_argument("--answer-window", type=float, default=5)
+    parser.add_argument("--batch", type=int, default=50)
+    parser.add_argument("--port", type=int, default=5800)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.questions)
+        return
+
+    print(
+        f"{'players':>8} {'done':>5} {'game s':>7} {'CPU s':>6} {'RSS MB':>7} "
+        f"{'events/q':>9} {'KB/q':>6} {'rank p50 ms':>12} {'rank p95 ms':>12}"
+    )
+    ok = True
+    for players in args.players:
+        process = start_server(args.port, args.questions)
+        try:
+            stats = asyncio.run(
+                run(
+                    args.port,
+                    process.pid,
+                    players,
+                    args.questions,
+                    args.answer_window,
+                    args.batch,
+                )
+            )
+        finally:
+            process.terminate()
+            process.wait()
+        ok = ok and stats["complete"]
+        print(
+            f"{players:>8} {'yes' if stats['complete'] else 'NO':>5} "
+            f"{stats['seconds']:>7.1f} {stats['cpu_s']:>6.1f} {stats['rss_mb']:>7.1f} "
+            f"{stats['events']:>9.1f} {stats['kb']:>6.1f} "
+            f"{stats['p50_ms']:>12.0f} {stats['p95_ms']:>12.0f}"
+        )
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""
+Unit tests for the multiplayer routes and their routing between cluster nodes.
+"""
+
+import threading
+import time
+import pytest
+import requests
+from api.app import create_app
+from api.utils import multiplayer_player
+from api.utils.multiplayer_engine import game_engine
+from api.utils.multiplayer_lobby import GAME_STATE, active_lobbies, lobby_registry
+from api.utils.multiplayer_models import lobby_state
+from api.utils.multiplayer_game import create_new_lobby, join_existing_lobby
+from api.utils.multiplayer_shard import HashRing, lobby_router
+from api.utils.multiplayer_timer import question_timer
+
+QUESTIONS = [
+    {"question": f"Q{i}?", "options": ["A) 1", "B) 2"], "correct_answer": "A"}
+    for i in range(2)
+]
+
+NODE = "http://node-a:5000"
+OTHER = "http://node-b:5000"
+
+
+@pytest.fixture(name="client")
+def fixture_client(monkeypatch):
+    """Create a test client of a node sharing the cluster with another node."""
+    active_lobbies.clear()
+    monkeypatch.setattr(lobby_router, "node_url", NODE)
+    monkeypatch.setattr(lobby_router, "proxy", False)
+    monkeypatch.setattr(lobby_router, "secret", None)
+    monkeypatch.setattr(lobby_router, "enabled", False)
+    app, _ = create_app("testing")
+    yield app.test_client()
+    active_lobbies.clear()
+    lobby_router.set_nodes([])
+
+
+def _code_owned_by(node):
+    """Return a lobby code the given node owns."""
+    ring = HashRing([NODE, OTHER])
+    return next(
+        code
+        for code in (f"Q{i:05d}" for i in range(1000))
+        if ring.node_for(code) == node
+    )
+
+
+def test_foreign_lobby_requests_are_redirected(client):
+    """Test that requests for another node's lobby are redirected to it."""
+    lobby_router.set_nodes([NODE, OTHER])
+    code = _code_owned_by(OTHER)
+
+    response = client.get(f"/api/multiplayer/lobby/{code}?x=1")
+    assert response.status_code == 307
+    assert response.headers["Location"] == f"{OTHER}/api/multiplayer/lobby/{code}?x=1"
+
+    response = client.post(
+        "/api/multiplayer/join", json={"lobby_code": code, "player_name": "Guest"}
+    )
+    assert response.status_code == 307
+
+    response = client.get(f"/api/multiplayer/lobby/{_code_owned_by(NODE)}")
+    assert response.status_code == 404
+
+
+def test_foreign_lobby_requests_are_proxied(client, mocker):
+    """Test that requests for another node's lobby can be proxied to it."""
+    lobby_router.set_nodes([NODE, OTHER])
+    lobby_router.proxy = True
+    proxied = mocker.patch(
+        "api.utils.multiplayer_cluster.requests.request",
+        return_value=mocker.Mock(
+            content=b'{"lobby_code": "X"}',
+            status_code=200,
+            headers={"Content-Type": "application/json"},
+        ),
+    )
+    code = _code_owned_by(OTHER)
+
+    response = client.get(f"/api/multiplayer/lobby/{code}")
+
+    assert response.status_code == 200
+    assert response.get_json() == {"lobby_code": "X"}
+    assert proxied.call_args.args == ("GET", f"{OTHER}/api/multiplayer/lobby/{code}")
+
+
+def _wait_for_hand_offs(client):
+    """Wait until the node has no lobby moving to another node."""
+    deadline = time.time() + 5
+    while client.get("/api/multiplayer/cluster/nodes").get_json()["moving_lobbies"]:
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def _mock_other_node(mocker, on_send=None):
+    """Mock the other node accepting lobbies, and return the requests it got."""
+    sent = []
+
+    def post(url, json=None, **kwargs):  # pylint: disable=unused-argument
+        sent.append((url, json))
+        if url.endswith("/resume"):
+            return mocker.Mock(status_code=200)
+        if on_send:
+            on_send(len(sent))
+        return mocker.Mock(status_code=201)
+
+    mocker.patch("api.utils.multiplayer_cluster.requests.post", side_effect=post)
+    return sent
+
+
+def test_lobbies_move_when_nodes_change(client, mocker):
+    """Test that lobbies are handed to their new owner and adopted there."""
+    lobby_router.enabled = True
+    code = create_new_lobby("Host", "🦊").lobby_code
+    join_existing_lobby(code, "Guest", "🐼")
+    state = lobby_state(lobby_registry.lobbies[code])
+    sent = _mock_other_node(mocker)
+
+    # This node leaves the cluster, so the other node owns every lobby
+    response = client.put("/api/multiplayer/cluster/nodes", json={"nodes": [OTHER]})
+
+    assert response.status_code == 202
+    assert response.get_json() == {"nodes": [OTHER], "moving_lobbies": 1}
+    _wait_for_hand_offs(client)
+    assert sent == [
+        (f"{OTHER}/api/multiplayer/cluster/lobbies", {"lobby": state}),
+        (f"{OTHER}/api/multiplayer/cluster/lobbies/{code}/resume", None),
+    ]
+    assert code not in lobby_registry
+    assert lobby_router.owner(code) == OTHER
+
+    # Adopting the lobby back restores it with its players
+    lobby_router.set_nodes([])
+    response = client.post("/api/multiplayer/cluster/lobbies", json={"lobby": state})
+    assert response.status_code == 201
+    response = client.get(f"/api/multiplayer/lobby/{code}")
+    assert [p["name"] for p in response.get_json()["players"]] == ["Host", "Guest"]
+
+
+def test_moving_lobby_is_served_here_until_handed_off(client, mocker):
+    """Test that a lobby is not routed to its new owner before it has the lobby."""
+    lobby_router.enabled = True
+    code = create_new_lobby("Host", "🦊").lobby_code
+    during = []
+
+    def on_send(_):
+        during.append(client.get(f"/api/multiplayer/lobby/{code}").status_code)
+
+    _mock_other_node(mocker, on_send)
+
+    client.put("/api/multiplayer/cluster/nodes", json={"nodes": [OTHER]})
+    _wait_for_hand_offs(client)
+
+    assert during == [200]
+    assert client.get(f"/api/multiplayer/lobby/{code}").status_code == 307
+
+
+def test_lobby_changed_during_hand_off_is_sent_again(client, mocker):
+    """Test that a lobby updated while it was sent replaces the sent copy."""
+    lobby_router.enabled = True
+    code = create_new_lobby("Host", "🦊").lobby_code
+
+    def on_send(count):
+        if count == 1:
+            # A player joins while the first copy is on its way
+            join_existing_lobby(code, "Guest", "🐼")
+
+    sent = _mock_other_node(mocker, on_send)
+
+    client.put("/api/multiplayer/cluster/nodes", json={"nodes": [OTHER]})
+    _wait_for_hand_offs(client)
+
+    lobbies = [body["lobby"] for url, body in sent if body]
+    assert len(lobbies) == 2
+    assert [p["name"] for p in lobbies[-1]["players"]] == ["Host", "Guest"]
+    assert sent[-1][0].endswith(f"/{code}/resume")
+    assert code not in lobby_registry
+
+
+def test_adopted_lobby_runs_once_resumed(client):
+    """Test that an adopted lobby can be replaced until its timers are re-armed."""
+    lobby_router.enabled = True
+    code = _start_game()
+    state = lobby_state(lobby_registry.lobbies[code])
+    active_lobbies.clear()
+    question_timer.cancel(code)
+
+    url = "/api/multiplayer/cluster/lobbies"
+    assert client.post(url, json={"lobby": state}).status_code == 201
+    assert not question_timer.pending(code)
+    assert client.post(url, json={"lobby": state}).status_code == 201
+
+    assert client.post(f"{url}/{code}/resume").status_code == 200
+    assert question_timer.pending(code)
+    # A running lobby is never replaced by a late copy
+    assert client.post(url, json={"lobby": state}).status_code == 409
+    assert client.post(f"{url}/{code}/resume").status_code == 404
+    question_timer.cancel(code)
+
+
+def test_unreachable_node_keeps_lobby(client, mocker):
+    """Test that a lobby stays on this node if its new owner cannot be reached."""
+    lobby_router.enabled = True
+    code = create_new_lobby("Host", "🦊").lobby_code
+    mocker.patch(
+        "api.utils.multiplayer_cluster.requests.post",
+        side_effect=requests.ConnectionError,
+    )
+
+    client.put("/api/multiplayer/cluster/nodes", json={"nodes": [OTHER]})
+    _wait_for_hand_offs(client)
+
+    assert code in lobby_registry
+
+
+def test_cluster_routes_require_secret(client):
+    """Test that cluster routes are refused without the cluster secret."""
+    lobby_router.secret = "s3cret"
+    response = client.put("/api/multiplayer/cluster/nodes", json={"nodes": []})
+    assert response.status_code == 403
+
+    response = client.put(
+        "/api/multiplayer/cluster/nodes",
+        json={"nodes": []},
+        headers={"X-Cluster-Secret": "wrong"},
+    )
+    assert response.status_code == 403
+
+    response = client.put(
+        "/api/multiplayer/cluster/nodes",
+        json={"nodes": []},
+        headers={"X-Cluster-Secret": "s3cret"},
+    )
+    assert response.status_code == 202
+
+
+def test_cluster_routes_refused_without_secret_or_cluster_mode(client):
+    """Test that cluster routes are refused when neither a secret nor cluster mode is set."""
+    response = client.put(
+        "/api/multiplayer/cluster/nodes", json={"nodes": ["http://attacker"]}
+    )
+    assert response.status_code == 403
+    assert lobby_router.nodes == []
+
+    state = lobby_state(create_new_lobby("Host", "🦊"))
+    state["lobby_code"] = "EVIL01"
+    response = client.post("/api/multiplayer/cluster/lobbies", json={"lobby": state})
+    assert response.status_code == 403
+    assert "EVIL01" not in lobby_registry
+
+
+def _start_game():
+    """Create a lobby with two players and start its game."""
+    code = create_new_lobby("Host", "🦊").lobby_code
+    join_existing_lobby(code, "Guest", "🐼")
+    with lobby_registry.locked(code) as lobby:
+        lobby.game_state = GAME_STATE["GENERATING"]
+        game_engine.begin(lobby, [QUESTIONS, 200])
+    return code
+
+
+def _answer(code, name):
+    """Answer the first question as a player."""
+    with lobby_registry.locked(code) as lobby:
+        game_engine.submit_answer(lobby, name, 0, "A) 1", 2)
+
+
+def test_game_state_is_conditional(client):
+    """Test that game state requests with the current ETag get 304."""
+    code = _start_game()
+    url = f"/api/multiplayer/game/{code}"
+
+    response = client.get(url)
+    etag = response.headers["ETag"]
+    assert response.status_code == 200 and response.json["questions"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    _answer(code, "Host")
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["ETag"] != etag
+    assert response.json["players"][0]["score"] == 14
+
+    # The current view leaves out the answers
+    current = client.get(f"{url}?view=current").json
+    assert current["question"] == {"question": "Q0?", "options": ["A) 1", "B) 2"]}
+    assert "answers" not in current["players"][0] and "questions" not in current
+    assert current["version"] == response.json["version"]
+    assert client.get(f"{url}?view=all").status_code == 400
+    question_timer.cancel(code)
+
+
+def test_game_state_long_poll(client, monkeypatch):
+    """Test that a long poll answers once the state changes, or 304 on timeout."""
+    code = _start_game()
+    url = f"/api/multiplayer/game/{code}?view=current"
+    version = client.get(url).json["version"]
+
+    threading.Timer(0.2, _answer, (code, "Guest")).start()
+    start = time.monotonic()
+    response = client.get(f"{url}&since={version}")
+    assert response.status_code == 200 and response.json["version"] > version
+    assert time.monotonic() - start < multiplayer_player.LONG_POLL_RECHECK
+
+    monkeypatch.setattr(multiplayer_player, "LONG_POLL_TIMEOUT", 0.2)
+    response = client.get(f"{url}&since={response.json['version']}")
+    assert response.status_code == 304
+    question_timer.cancel(code)
@@ -51,7 +51,7 @@ def test_get_triviaqa_api(
 
     assert result == [{"question": "What is AI?"}]
     mock_get_questions_from_api.assert_called_once_with(
-        category="17", difficulty="medium", num_questions="5"
+        category="17", difficulty="medium", num_questions="5", session_id=None
     )
 
 
@@ -82,3 +82,34 @@ def test_get_triviaqa_invalid_category(mock_get_categories, capsys):
     assert result is None
     captured = capsys.readouterr()
     assert "Category 'Invalid' not found" in captured.out
+
+
+@patch("api.services.triviaqa_api.get_categories")
+@patch("api.services.triviaqa_api.get_question_bank")
+def test_get_triviaqa_question_bank(mock_get_question_bank, mock_get_categories):
+    """Test get_triviaqa() when fetching from the local question bank."""
+    mock_get_categories.return_value = {"Myths": "question-bank"}
+    mock_get_question_bank.return_value.get_questions.return_value = {
+        "questions": [{"question": "Who is the king of the gods?"}]
+    }
+
+    result = get_triviaqa("Myths", 3, "easy")
+
+    assert result == {"questions": [{"question": "Who is the king of the gods?"}]}
+    mock_get_question_bank.return_value.get_questions.assert_called_once_with(
+        "Myths", 3, "easy"
+    )
+
+
+@patch("api.services.triviaqa_api.MongoClient")
+@patch("api.services.triviaqa_api.get_categories")
+@patch("api.services.triviaqa_api.get_question_bank")
+def test_get_triviaqa_question_bank_missing(
+    mock_get_question_bank, mock_get_categories, mock_mongo_client
+):
+    """Test get_triviaqa() when the question bank has not been built."""
+    mock_get_categories.return_value = {"Myths": "question-bank"}
+    mock_get_question_bank.return_value = None
+
+    assert get_triviaqa("Myths", 3, "easy") is None
+    mock_mongo_client.assert_not_called()
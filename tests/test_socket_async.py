@@ -0,0 +1,174 @@
+"""Tests for the asyncio Socket.IO server and the ASGI app."""
+
+import asyncio
+import threading
+import time
+from unittest.mock import AsyncMock
+import httpx
+import pytest
+from flask import Flask
+from api import socket_server
+from api.app import create_asgi_app
+from api.socket_async import (
+    AsyncSocketBridge,
+    ThreadedWsgiToAsgi,
+    create_async_server,
+)
+from api.utils.multiplayer_lobby import GAME_STATE, active_lobbies, lobby_registry
+from api.utils.multiplayer_engine import game_engine
+from api.utils.multiplayer_game import create_new_lobby, join_existing_lobby
+from api.utils.multiplayer_timer import question_timer
+
+QUESTIONS = [{"question": "Q?", "options": ["A) 1", "B) 2"], "correct_answer": "A"}]
+
+
+@pytest.fixture(autouse=True, name="restore_socketio")
+def fixture_restore_socketio(monkeypatch):
+    """Restore the server the multiplayer service emits through."""
+    monkeypatch.setattr(socket_server, "socketio", socket_server.socketio)
+
+
+def test_asgi_app_serves_rest_routes():
+    """Test that the Flask blueprints stay mounted under the ASGI app."""
+
+    async def get():
+        transport = httpx.ASGITransport(app=create_asgi_app("testing"))
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            return await c.get("/api/")
+
+    response = asyncio.run(get())
+    assert response.status_code == 200
+    assert response.json() == {"message": "Quizzatron API is up and running!🚀"}
+    assert isinstance(socket_server.socketio, AsyncSocketBridge)
+
+
+def test_asgi_app_runs_flask_requests_in_parallel():
+    """Test that slow Flask requests do not wait on each other under ASGI."""
+    flask_app = Flask(__name__)
+
+    @flask_app.route("/slow")
+    def slow():
+        time.sleep(0.3)
+        return threading.current_thread().name
+
+    app = ThreadedWsgiToAsgi(flask_app, 4)
+
+    async def get_four():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            return await asyncio.gather(*(c.get("/slow") for _ in range(4)))
+
+    started = time.monotonic()
+    responses = asyncio.run(get_four())
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 0.9
+    assert len({response.text for response in responses}) == 4
+
+
+def test_asgi_app_bounds_parallel_flask_requests():
+    """Test that requests beyond the limit wait for a running one to finish."""
+    flask_app = Flask(__name__)
+
+    @flask_app.route("/slow")
+    def slow():
+        time.sleep(0.2)
+        return "done"
+
+    app = ThreadedWsgiToAsgi(flask_app, 2)
+
+    async def get_four():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            return await asyncio.gather(*(c.get("/slow") for _ in range(4)))
+
+    started = time.monotonic()
+    asyncio.run(get_four())
+    assert time.monotonic() - started >= 0.4
+
+
+def test_asgi_game_state_long_poll_waits():
+    """Test that a game state long poll under ASGI waits for the next change."""
+    active_lobbies.clear()
+    code = create_new_lobby("Host", "🦊").lobby_code
+    join_existing_lobby(code, "Guest", "🐼")
+    with lobby_registry.locked(code) as lobby:
+        lobby.game_state = GAME_STATE["GENERATING"]
+        game_engine.begin(lobby, [QUESTIONS, 200])
+    url = f"/api/multiplayer/game/{code}?view=current"
+    answer = {
+        "lobby_code": code,
+        "player_name": "Guest",
+        "question_index": 0,
+        "answer": "A) 1",
+    }
+
+    async def poll_then_answer():
+        transport = httpx.ASGITransport(app=create_asgi_app("testing"))
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            version = (await c.get(url)).json()["version"]
+            poll = asyncio.ensure_future(c.get(f"{url}&since={version}"))
+            await asyncio.sleep(0.2)
+            # The poll is still waiting, and other requests are served meanwhile
+            assert not poll.done()
+            await c.post("/api/multiplayer/answer", json=answer)
+            return version, await poll
+
+    version, response = asyncio.run(poll_then_answer())
+    question_timer.cancel(code)
+    active_lobbies.clear()
+
+    assert response.status_code == 200
+    assert response.json()["version"] > version
+
+
+def test_async_handlers_call_the_game_engine():
+    """Test that coroutine handlers run service calls and report their errors."""
+    active_lobbies.clear()
+    code = create_new_lobby("Host", "🦊").lobby_code
+    join_existing_lobby(code, "Guest", "🐼")
+    with lobby_registry.locked(code) as lobby:
+        lobby.game_state = GAME_STATE["GENERATING"]
+        game_engine.begin(lobby, [QUESTIONS, 200])
+
+    sio = create_async_server(Flask(__name__))
+    sio.emit = AsyncMock()
+    handler = sio.handlers["/"]["submit_answer"]
+    answer = {
+        "lobby_code": code,
+        "player_name": "Host",
+        "question_index": 0,
+        "answer": "A) 1",
+    }
+
+    async def submit_twice():
+        await handler("sid1", answer)
+        await handler("sid1", answer)
+
+    asyncio.run(submit_twice())
+    question_timer.cancel(code)
+
+    sio.emit.assert_awaited_once_with(
+        "error", {"message": "Answer already submitted"}, to="sid1"
+    )
+    assert lobby_registry.lobbies[code].players_by_name["Host"].score == 14
+    active_lobbies.clear()
+
+
+def test_bridge_emits_from_worker_threads():
+    """Test that events emitted from threads are written by the event loop."""
+    sio = create_async_server(Flask(__name__))
+    sio.emit = AsyncMock()
+    bridge = AsyncSocketBridge(sio)
+
+    async def emit_from_thread():
+        bridge.attach()
+        thread = threading.Thread(
+            target=bridge.emit, args=("scoreboard", {"players": []}, "ROOM01")
+        )
+        thread.start()
+        while thread.is_alive():
+            await asyncio.sleep(0.01)
+
+    asyncio.run(emit_from_thread())
+    sio.emit.assert_awaited_once_with("scoreboard", {"players": []}, room="ROOM01")
@@ -1,9 +1,11 @@
 """Unit test for checking category aggregator"""
 
 import json
+import time
 
 import pytest
-from api.utils.category_aggregator import get_categories
+from api.utils import category_aggregator
+from api.utils.category_aggregator import get_categories, register_category_source
 
 
 def test_get_categories_json_structure():
@@ -25,3 +27,66 @@ def test_get_categories_json_structure():
         json.dumps(result)
     except TypeError:
         pytest.fail("Result is not JSON serializable")
+
+
+@pytest.fixture(name="isolated_sources")
+def fixture_isolated_sources(monkeypatch):
+    """Replace the registered category sources and cache with empty ones."""
+    monkeypatch.setattr(category_aggregator, "_category_sources", {})
+    monkeypatch.setattr(category_aggregator, "_category_cache", {})
+
+
+def _slow_source(categories, delay):
+    """Build a category source that sleeps before returning its listing."""
+
+    def fetch():
+        time.sleep(delay)
+        return categories
+
+    return fetch
+
+
+@pytest.mark.usefixtures("isolated_sources")
+def test_get_categories_queries_sources_concurrently():
+    """Test that sources are fetched in parallel rather than one after another."""
+    register_category_source("first", _slow_source({"Science": 17}, 0.3))
+    register_category_source("second", _slow_source({"Myths": "trivia-qa"}, 0.3))
+
+    started = time.monotonic()
+    result = get_categories()
+    elapsed = time.monotonic() - started
+
+    assert result == {"Science": 17, "Myths": "trivia-qa"}
+    assert elapsed < 0.55
+
+
+@pytest.mark.usefixtures("isolated_sources")
+def test_get_categories_returns_partial_results_on_timeout():
+    """Test that a source exceeding its timeout is left out of the results."""
+    register_category_source("fast", _slow_source({"Science": 17}, 0))
+    register_category_source("slow", _slow_source({"Myths": "trivia-qa"}, 1), 0.1)
+
+    assert get_categories() == {"Science": 17}
+
+
+@pytest.mark.usefixtures("isolated_sources")
+def test_get_categories_serves_cache_when_source_fails():
+    """Test that a failing source falls back to its last cached listing."""
+    calls = []
+
+    def flaky_source():
+        calls.append(1)
+        if len(calls) > 1:
+            raise ConnectionError("source unavailable")
+        return {"Myths": "trivia-qa"}
+
+    register_category_source("flaky", flaky_source)
+    assert get_categories() == {"Myths": "trivia-qa"}
+
+    # Age the cached listing past its TTL so the source is queried again
+    category_aggregator._category_cache["flaky"] = (  # pylint: disable=protected-access
+        time.monotonic() - category_aggregator.CATEGORY_CACHE_TTL - 1,
+        {"Myths": "trivia-qa"},
+    )
+    assert get_categories() == {"Myths": "trivia-qa"}
+    assert len(calls) == 2
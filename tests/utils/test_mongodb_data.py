@@ -4,7 +4,7 @@ Unit tests for the MongoDB data utility functions.
 
 from unittest.mock import MagicMock
 import pytest
-from api.utils.mongodb_data import get_mongodb_data
+from api.utils.mongodb_data import get_mongodb_data, build_question_pipeline
 
 
 @pytest.fixture(name="mock_mongo_client")
@@ -20,17 +20,19 @@ def fixture_mock_mongo_client():
     mock_collection = MagicMock()
     mock_db.__getitem__.return_value = mock_collection
 
-    # Mock data to be returned from aggregation
+    # Mock data to be returned from aggregation, already formatted by the pipeline
     mock_collection.aggregate.return_value = iter([
         {
             "question": "What is 2 + 2?",
-            "options": ["1", "2", "3", "4"],
-            "correct_answer": "4"
+            "options": ["A) 1", "B) 2", "C) 3", "D) 4"],
+            "correct_answer": "D",
+            "difficulty": "medium"
         },
         {
             "question": "What is the capital of France?",
-            "options": ["Berlin", "Madrid", "Paris", "Rome"],
-            "correct_answer": "Paris"
+            "options": ["A) Berlin", "B) Madrid", "C) Paris", "D) Rome"],
+            "correct_answer": "C",
+            "difficulty": "medium"
         }
     ])
 
@@ -65,3 +67,56 @@ def test_get_mongodb_data_empty_collection(mock_mongo_client):
     result = get_mongodb_data(mock_mongo_client, "Math", num_questions=3, difficulty="easy")
 
     assert result == {"questions": []}  # Should return an empty questions list
+
+
+def test_get_mongodb_data_caches_collection_catalog(mock_mongo_client):
+    """Test that the collection listing is not repeated for every request."""
+    mock_db = mock_mongo_client["trivia-qa"]
+    mock_db.name = "cached-catalog-db"
+
+    get_mongodb_data(mock_mongo_client, "Math", num_questions=1, difficulty="easy")
+    get_mongodb_data(mock_mongo_client, "Science", num_questions=1, difficulty="easy")
+
+    assert mock_db.list_collection_names.call_count == 1
+
+
+def test_get_mongodb_data_limits_catalog_refreshes(mock_mongo_client):
+    """Test that repeated requests for an unknown topic do not relist every time."""
+    mock_db = mock_mongo_client["trivia-qa"]
+    mock_db.name = "unknown-topic-db"
+
+    for _ in range(5):
+        assert get_mongodb_data(mock_mongo_client, "Nope", num_questions=1) is None
+
+    assert mock_db.list_collection_names.call_count == 1
+
+
+def test_build_question_pipeline_stages():
+    """Test that the pipeline filters on difficulty and formats answers server-side."""
+    pipeline = build_question_pipeline(3, "easy")
+
+    assert pipeline[0] == {"$match": {"difficulty": {"$in": ["easy", None]}}}
+    assert pipeline[1] == {"$sample": {"size": 3}}
+
+    projection = pipeline[2]["$project"]
+    assert projection["_id"] == 0
+    assert "$indexOfArray" in projection["correct_answer"]["$arrayElemAt"][1]
+    assert projection["difficulty"] == {"$ifNull": ["$difficulty", "easy"]}
+    option = projection["options"]["$map"]["in"]["$concat"][2]
+    assert option == {"$toString": {"$arrayElemAt": ["$options", "$$i"]}}
+
+
+def test_get_mongodb_data_skips_seen_questions(mock_mongo_client):
+    """Test that a session does not get the same question on its next quiz."""
+    collection = mock_mongo_client["trivia-qa"]["Math"]
+    documents = list(collection.aggregate.return_value)
+
+    collection.aggregate.return_value = iter(documents)
+    first = get_mongodb_data(mock_mongo_client, "Math", 1, "medium", "player-1")
+
+    collection.aggregate.return_value = iter(documents)
+    second = get_mongodb_data(mock_mongo_client, "Math", 1, "medium", "player-1")
+
+    assert collection.aggregate.call_args.args[0][1] == {"$sample": {"size": 2}}
+    assert first["questions"][0]["question"] == "What is 2 + 2?"
+    assert second["questions"][0]["question"] == "What is the capital of France?"
@@ -0,0 +1,84 @@
+"""
+Unit tests for the per-client Socket.IO codecs.
+"""
+
+import msgpack
+import socketio
+from api.utils.multiplayer_codec import (
+    COMPACT_EVENTS,
+    CodecManager,
+    CodecPacket,
+    expand,
+)
+
+SCOREBOARD = {
+    "players": [
+        {"id": "p1", "name": "Host", "score": 850, "rank": 1, "answer": "A) 1"},
+        {"id": "p2", "name": "Guest", "score": 0, "rank": 2, "answer": "Unanswered"},
+    ],
+    "question_index": 3,
+}
+
+
+def _connect(server, eio_sid, query=""):
+    """Connect a client to the default namespace and return its session id."""
+    server._handle_eio_connect(eio_sid, {"QUERY_STRING": query})
+    if query:
+        server._handle_eio_message(eio_sid, msgpack.packb({"type": 0, "nsp": "/"}))
+    else:
+        server._handle_eio_message(eio_sid, "0")
+    return server.manager.sid_from_eio_sid(eio_sid, "/")
+
+
+def _record(server):
+    """Record the Engine.IO payloads the server sends, by client."""
+    sent = {}
+    server.eio.send = lambda eio_sid, data: sent.setdefault(eio_sid, []).append(data)
+    server.eio.send_packet = lambda eio_sid, pkt: server.eio.send(eio_sid, pkt.data)
+    return sent
+
+
+def test_hot_events_use_numeric_keys():
+    """Test that msgpack packets compact hot events and decode back exactly."""
+    pkt = CodecPacket(socketio.packet.EVENT, data=["scoreboard", SCOREBOARD])
+    encoded = msgpack.unpackb(pkt.encode_msgpack(), strict_map_key=False)
+    event, data = encoded["data"]
+    assert event == "scoreboard" and data[1] == 3 and data[0][0][9] == 1
+    assert expand(data, COMPACT_EVENTS["scoreboard"]) == SCOREBOARD
+    assert len(pkt.encode_msgpack()) < len(pkt.encode()) / 2
+
+    decoded = CodecPacket(
+        encoded_packet=msgpack.packb({"type": 2, "nsp": "/", "data": ["ping", 1]})
+    )
+    assert decoded.data == ["ping", 1]
+    assert CodecPacket(encoded_packet='2["ping",1]').data == ["ping", 1]
+
+
+def test_clients_get_their_codec():
+    """Test that one room broadcast reaches each client in its own codec."""
+    server = socketio.Server(serializer=CodecPacket, client_manager=CodecManager())
+    sent = _record(server)
+    json_sid = _connect(server, "json")
+    msgpack_sid = _connect(server, "binary", "EIO=4&codec=msgpack")
+    for sid in (json_sid, msgpack_sid):
+        server.enter_room(sid, "ABC123")
+
+    # Connect acks are sent in the client's codec
+    assert sent["json"][0].startswith("0{")
+    assert msgpack.unpackb(sent["binary"][0])["type"] == 0
+
+    sent.clear()
+    server.emit("scoreboard", SCOREBOARD, room="ABC123")
+    assert sent["json"] == ['2["scoreboard",' + _json(SCOREBOARD) + "]"]
+    (payload,) = sent["binary"]
+    event, data = msgpack.unpackb(payload, strict_map_key=False)["data"]
+    assert event == "scoreboard"
+    assert expand(data, COMPACT_EVENTS["scoreboard"]) == SCOREBOARD
+
+    server._handle_eio_disconnect("binary")
+    assert not server.manager.msgpack_clients
+
+
+def _json(data):
+    """Encode data as the default Socket.IO serializer does."""
+    return CodecPacket.json.dumps(data, separators=(",", ":"))
@@ -0,0 +1,76 @@
+"""
+Unit tests for the post-commit Socket.IO event emitter.
+"""
+
+import threading
+from unittest.mock import MagicMock
+import pytest
+import api.socket_server
+from api.utils.multiplayer_emitter import EventEmitter, event_emitter
+from api.utils.multiplayer_lobby import LobbyRegistry
+from api.utils.multiplayer_models import Lobby
+
+
+@pytest.fixture(name="fake_socketio")
+def fixture_fake_socketio(monkeypatch):
+    """Replace the SocketIO instance with a mock that records emits."""
+    socketio = MagicMock()
+    monkeypatch.setattr(api.socket_server, "socketio", socketio)
+    return socketio
+
+
+def _emitted(socketio):
+    """Return the (event, data) pairs written to the mock SocketIO."""
+    return [(call.args[0], call.args[1]) for call in socketio.emit.call_args_list]
+
+
+def test_events_wait_for_transaction_commit(fake_socketio):
+    """Test that events emitted in a transaction are written after it exits."""
+    emitter = EventEmitter(workers=2)
+    with emitter.transaction():
+        emitter.emit("lobby_update", {"version": 1}, room="ABC123")
+        with emitter.transaction():
+            emitter.emit("lobby_update", {"version": 2}, room="ABC123")
+        emitter.join()
+        assert not fake_socketio.emit.called
+
+    emitter.join()
+    assert _emitted(fake_socketio) == [
+        ("lobby_update", {"version": 1}),
+        ("lobby_update", {"version": 2}),
+    ]
+
+
+def test_failed_transaction_drops_events(fake_socketio):
+    """Test that a transaction that raises does not emit its events."""
+    emitter = EventEmitter(workers=1)
+    with pytest.raises(ValueError):
+        with emitter.transaction():
+            emitter.emit("lobby_update", {"version": 1}, room="ABC123")
+            raise ValueError("boom")
+
+    emitter.emit("lobby_update", {"version": 2}, room="ABC123")
+    emitter.join()
+    assert _emitted(fake_socketio) == [("lobby_update", {"version": 2})]
+
+
+def test_slow_room_does_not_block_lobby_locks(fake_socketio):
+    """Test that a blocked socket write does not hold up lobby state changes."""
+    registry = LobbyRegistry()
+    code = registry.create(lambda c: Lobby(c, "host", {}, 0.0, 0.0)).lobby_code
+    release = threading.Event()
+    fake_socketio.emit.side_effect = lambda *args, **kwargs: release.wait(2)
+
+    with registry.locked(code):
+        event_emitter.emit("lobby_update", {"version": 1}, room=code)
+
+    acquired = threading.Event()
+
+    def mutate():
+        with registry.locked(code):
+            acquired.set()
+
+    threading.Thread(target=mutate).start()
+    assert acquired.wait(1)
+    release.set()
+    event_emitter.join()
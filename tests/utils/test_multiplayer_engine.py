@@ -0,0 +1,142 @@
+"""
+Unit tests for the multiplayer game engine state machine.
+"""
+
+import random
+import time
+import pytest
+from api.app import create_app
+from api.utils.multiplayer_lobby import GAME_STATE, active_lobbies, lobby_registry
+from api.utils.multiplayer_engine import (
+    TRANSITIONS,
+    GameEngine,
+    all_players_answered,
+    game_engine,
+)
+from api.utils.multiplayer_game import (
+    create_new_lobby,
+    join_existing_lobby,
+)
+from api.utils.multiplayer_player import submit_player_answer
+from api.utils.multiplayer_timer import question_timer
+
+QUESTIONS = [
+    {
+        "question": f"Question {i}?",
+        "options": ["A) 1", "B) 2", "C) 3", "D) 4"],
+        "correct_answer": "A",
+    }
+    for i in range(3)
+]
+
+
+@pytest.fixture(name="lobby")
+def fixture_lobby():
+    """Create a lobby with a host and a guest whose game is about to begin."""
+    active_lobbies.clear()
+    lobby = create_new_lobby("Host", "🦊")
+    join_existing_lobby(lobby.lobby_code, "Guest", "🐼")
+    lobby.game_state = GAME_STATE["GENERATING"]
+    yield lobby
+    question_timer.cancel(lobby.lobby_code)
+    active_lobbies.clear()
+
+
+def test_transition_table_rejects_other_actions(lobby):
+    """Test that only actions listed for the current state change it."""
+    engine = GameEngine()
+    actions = {action for _, action in TRANSITIONS}
+    for state in GAME_STATE.values():
+        for action in actions:
+            lobby.game_state = state
+            allowed = engine.transition(lobby, action)
+            assert allowed == ((state, action) in TRANSITIONS)
+            assert lobby.game_state == TRANSITIONS.get((state, action), state)
+
+
+def test_random_actions_keep_game_consistent(lobby):
+    """Fuzz the engine with random answers, closes and advances."""
+    rng = random.Random(41)
+    with lobby_registry.locked(lobby.lobby_code):
+        game_engine.begin(lobby, [QUESTIONS, 200])
+        for _ in range(300):
+            action = rng.choice(["answer", "answer", "close", "advance"])
+            index = rng.randrange(len(QUESTIONS))
+            if action == "answer":
+                name = rng.choice(["Host", "Guest"])
+                game_engine.submit_answer(lobby, name, index, "A) 1", 1)
+            elif action == "close":
+                game_engine.close_question(lobby, index)
+            else:
+                game_engine.advance(lobby, index)
+
+            assert lobby.game_state in GAME_STATE.values()
+            for player in lobby.players:
+                indexes = [a.question_index for a in player.answers]
+                assert len(indexes) == len(set(indexes))
+                assert player.score == sum(a.score for a in player.answers)
+            if lobby.game_state == GAME_STATE["SCOREBOARD"]:
+                assert all_players_answered(lobby, lobby.current_question_idx)
+        question_timer.cancel(lobby.lobby_code)
+
+
+def test_socket_and_rest_answers_share_one_path(lobby):
+    """Test that an answer sent over both REST and Socket.IO only counts once."""
+    code = lobby.lobby_code
+    with lobby_registry.locked(code):
+        game_engine.begin(lobby, [QUESTIONS, 200])
+
+    assert submit_player_answer(code, "Host", 0, "A) 1", 1)[1] == 200
+
+    app, socketio = create_app("testing")
+    client = socketio.test_client(app)
+    client.get_received()
+    client.emit(
+        "submit_answer",
+        {
+            "lobby_code": code,
+            "player_name": "Host",
+            "question_index": 0,
+            "answer": "A) 1",
+            "time_taken": 1,
+        },
+    )
+    received = client.get_received()
+    client.disconnect()
+
+    assert received[0]["name"] == "error"
+    assert received[0]["args"][0]["message"] == "Answer already submitted"
+    host = lobby.players_by_name["Host"]
+    assert host.score == 14
+    assert len(host.answers) == 1
+
+
+def test_answers_are_scored_by_the_server(lobby):
+    """Test that correctness and points come from the question and the deadline."""
+    code = lobby.lobby_code
+    with lobby_registry.locked(code):
+        lobby.settings["difficulty"] = "hard"
+        game_engine.begin(lobby, [QUESTIONS, 200])
+        lobby.question_deadline = time.time() + 10.5
+
+    assert submit_player_answer(code, "Host", 0, "A) 1", 1)[1] == 200
+    assert submit_player_answer(code, "Guest", 0, "B) 2", 1)[1] == 200
+
+    host, guest = lobby.players_by_name["Host"], lobby.players_by_name["Guest"]
+    assert (host.score, host.correct_answers) == (15, 1)
+    assert (guest.score, guest.correct_answers) == (0, 0)
+
+
+def test_game_over_sends_results_once(lobby, mocker):
+    """Test that the final results go out under a single key."""
+    emit = mocker.patch("api.utils.multiplayer_broadcast.event_emitter.emit")
+    with lobby_registry.locked(lobby.lobby_code):
+        game_engine.begin(lobby, [QUESTIONS, 200])
+        for index in range(len(QUESTIONS)):
+            for name in ("Host", "Guest"):
+                game_engine.submit_answer(lobby, name, index, "A) 1", 1)
+            game_engine.advance(lobby, index)
+
+    (payload,) = [c.args[1] for c in emit.call_args_list if c.args[0] == "game_over"]
+    assert "results" not in payload
+    assert sorted(p["name"] for p in payload["players"]) == ["Guest", "Host"]
@@ -0,0 +1,531 @@
+"""
+Unit tests for the multiplayer game utility functions.
+"""
+
+import threading
+import time
+from unittest.mock import patch
+import pytest
+from api.utils import multiplayer_game
+from api.utils import multiplayer_lobby
+from api.utils.multiplayer_broadcast import lobby_updates
+from api.utils.multiplayer_lobby import (
+    active_lobbies,
+    lobby_registry,
+    cleanup_orphaned_players,
+    find_player,
+    GAME_STATE,
+)
+from api.utils.multiplayer_game import (
+    create_new_lobby,
+    join_existing_lobby,
+    update_player_ready_status,
+    update_lobby_settings,
+    start_game,
+    QuizPregenerator,
+)
+from api.utils import multiplayer_engine
+from api.utils.multiplayer_player import (
+    get_lobby_info,
+    update_player_avatar,
+    leave_lobby,
+    submit_player_answer,
+    advance_to_next_question,
+    get_game_results,
+)
+from api.utils.multiplayer_models import AnswerOutcome
+
+QUESTIONS = [
+    {
+        "question": f"Question {i}?",
+        "options": ["A) 1", "B) 2", "C) 3", "D) 4"],
+        "correct_answer": "A",
+    }
+    for i in range(3)
+]
+
+
+@pytest.fixture(autouse=True, name="clean_lobbies")
+def fixture_clean_lobbies():
+    """Start every test without lobbies."""
+    active_lobbies.clear()
+    yield
+    active_lobbies.clear()
+
+
+@pytest.fixture(autouse=True, name="pregenerator")
+def fixture_pregenerator(monkeypatch):
+    """Use a private pregenerator that only speculates when a test shortens the debounce."""
+    pregenerator = QuizPregenerator(debounce=3600)
+    monkeypatch.setattr(multiplayer_game, "quiz_pregenerator", pregenerator)
+    yield pregenerator
+    for code in list(active_lobbies):
+        pregenerator.discard(code)
+
+
+@pytest.fixture(name="ready_lobby")
+def fixture_ready_lobby():
+    """Create a lobby with a host and one ready player."""
+    lobby = create_new_lobby("Host", "🦊")
+    join_existing_lobby(lobby.lobby_code, "Guest", "🐼")
+    update_player_ready_status(lobby.lobby_code, "Guest", True)
+    return lobby.lobby_code
+
+
+def _wait_for_state(lobby_code, state, timeout=2):
+    """Wait until a lobby reaches a game state."""
+    deadline = time.monotonic() + timeout
+    while active_lobbies[lobby_code].game_state != state:
+        assert time.monotonic() < deadline, f"Lobby never reached {state}"
+        time.sleep(0.01)
+
+
+def test_start_game_generates_outside_lock(ready_lobby):
+    """Test that other lobbies stay usable while questions are generated."""
+    release = threading.Event()
+
+    def slow_generation(_quiz_params):
+        release.wait(2)
+        return [QUESTIONS, 200], None
+
+    with patch(
+        "api.utils.multiplayer_game.generate_questions_data",
+        side_effect=slow_generation,
+    ):
+        result, status_code = start_game(ready_lobby)
+        assert status_code == 202
+        assert result["game_state"] == GAME_STATE["GENERATING"]
+        assert active_lobbies[ready_lobby].game_state == GAME_STATE["GENERATING"]
+
+        other_lobby = create_new_lobby("Other", "🐸")
+        assert join_existing_lobby(other_lobby.lobby_code, "Friend", "🐙")[1] == 200
+
+        release.set()
+        _wait_for_state(ready_lobby, GAME_STATE["QUESTION"])
+
+    assert active_lobbies[ready_lobby].questions == [QUESTIONS, 200]
+    assert active_lobbies[ready_lobby].current_question_idx == 0
+
+
+def test_start_game_failure_reopens_lobby(ready_lobby):
+    """Test that a failed generation returns the lobby to the lobby state."""
+    with patch(
+        "api.utils.multiplayer_game.generate_questions_data",
+        return_value=(None, "Failed to generate quiz"),
+    ):
+        assert start_game(ready_lobby)[1] == 202
+        _wait_for_state(ready_lobby, GAME_STATE["LOBBY"])
+
+
+def test_start_game_discards_result_for_closed_lobby(ready_lobby):
+    """Test that questions generated for a closed lobby are dropped."""
+    release = threading.Event()
+
+    def slow_generation(_quiz_params):
+        release.wait(2)
+        return [QUESTIONS, 200], None
+
+    with patch(
+        "api.utils.multiplayer_game.generate_questions_data",
+        side_effect=slow_generation,
+    ), patch(
+        "api.utils.multiplayer_game.finish_game_start",
+        wraps=multiplayer_game.finish_game_start,
+    ) as finish:
+        assert start_game(ready_lobby)[1] == 202
+        assert leave_lobby(ready_lobby, "Host")[1] == 200
+        release.set()
+
+        deadline = time.monotonic() + 2
+        while not finish.called:
+            assert time.monotonic() < deadline, "Generation never finished"
+            time.sleep(0.01)
+
+    assert ready_lobby not in active_lobbies
+
+
+def test_start_game_rejects_second_start(ready_lobby):
+    """Test that a lobby cannot be started twice while generating."""
+    release = threading.Event()
+
+    def slow_generation(_quiz_params):
+        release.wait(2)
+        return [QUESTIONS, 200], None
+
+    with patch(
+        "api.utils.multiplayer_game.generate_questions_data",
+        side_effect=slow_generation,
+    ):
+        assert start_game(ready_lobby)[1] == 202
+        assert start_game(ready_lobby)[1] == 400
+        release.set()
+        _wait_for_state(ready_lobby, GAME_STATE["QUESTION"])
+
+
+def test_player_indexes_follow_join_and_leave(ready_lobby):
+    """Test that the name and id indexes mirror the player list."""
+    lobby = active_lobbies[ready_lobby]
+    guest = lobby.players_by_name["Guest"]
+    assert lobby.players_by_id[guest.id] is guest
+
+    assert join_existing_lobby(ready_lobby, "Guest", "🐸")[1] == 400
+
+    leave_lobby(ready_lobby, "Guest")
+    assert "Guest" not in lobby.players_by_name
+    assert guest.id not in lobby.players_by_id
+    assert [player.name for player in lobby.players] == ["Host"]
+
+
+def test_session_index_follows_reconnect_and_delete(ready_lobby):
+    """Test that sessions are rebound on reconnect and dropped with the lobby."""
+    with lobby_registry.locked(ready_lobby) as lobby:
+        guest = lobby.players_by_name["Guest"]
+        lobby_registry.bind_session("sid-1", ready_lobby, guest)
+        lobby_registry.bind_session("sid-2", ready_lobby, guest)
+        lobby_registry.bind_session("sid-host", ready_lobby, lobby.players[0])
+
+    assert lobby_registry.session("sid-1") is None
+    assert lobby_registry.session("sid-2") == (ready_lobby, guest.id)
+
+    leave_lobby(ready_lobby, "Guest")
+    assert lobby_registry.session("sid-2") is None
+
+    # The host leaving closes the lobby, which drops its remaining sessions
+    leave_lobby(ready_lobby, "Host")
+    assert ready_lobby not in active_lobbies
+    assert lobby_registry.session("sid-host") is None
+
+
+def test_start_game_uses_speculative_questions(pregenerator):
+    """Test that questions generated for settled settings start the game at once."""
+    pregenerator.debounce = 0.05
+    with patch(
+        "api.utils.multiplayer_game.generate_questions_data",
+        return_value=([QUESTIONS, 200], None),
+    ) as generate:
+        lobby_code = create_new_lobby("Host", "🦊").lobby_code
+        join_existing_lobby(lobby_code, "Guest", "🐼")
+        update_player_ready_status(lobby_code, "Guest", True)
+
+        deadline = time.monotonic() + 2
+        # pylint: disable=protected-access
+        while pregenerator._entries[lobby_code]["state"] != "ready":
+            assert time.monotonic() < deadline, "Speculation never finished"
+            time.sleep(0.01)
+
+        result, status_code = start_game(lobby_code)
+
+    assert status_code == 200
+    assert result["game_state"] == GAME_STATE["QUESTION"]
+    assert active_lobbies[lobby_code].questions == [QUESTIONS, 200]
+    assert generate.call_count == 1
+
+
+def test_speculation_waits_for_lobby_activity(pregenerator):
+    """Test that a lobby nobody joined is not speculated on, and reaping cancels it."""
+    # pylint: disable=protected-access
+    lobby_code = create_new_lobby("Host", "🦊").lobby_code
+    assert lobby_code not in pregenerator._entries
+
+    join_existing_lobby(lobby_code, "Guest", "🐼")
+    assert pregenerator._entries[lobby_code]["state"] == "pending"
+
+    with lobby_registry.locked(lobby_code):
+        lobby_registry.delete(lobby_code)
+    assert lobby_code not in pregenerator._entries
+
+
+def test_settings_change_discards_speculation(pregenerator):
+    """Test that a result generated for outdated settings is not used."""
+    pregenerator.debounce = 0.01
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_generation(quiz_params):
+        calls.append(quiz_params.get("topic"))
+        started.set()
+        release.wait(2)
+        return [QUESTIONS, 200], None
+
+    with patch(
+        "api.utils.multiplayer_game.generate_questions_data",
+        side_effect=slow_generation,
+    ):
+        lobby_code = create_new_lobby("Host", "🦊").lobby_code
+        join_existing_lobby(lobby_code, "Guest", "🐼")
+        update_player_ready_status(lobby_code, "Guest", True)
+        assert started.wait(2)
+
+        pregenerator.debounce = 3600
+        update_lobby_settings(lobby_code, {"topic": "Space"})
+        release.set()
+
+        assert start_game(lobby_code)[1] == 202
+        _wait_for_state(lobby_code, GAME_STATE["QUESTION"])
+
+    assert calls == [None, "Space"]
+
+
+def test_start_game_waits_for_running_speculation(pregenerator):
+    """Test that a game started mid-speculation is started by that generation."""
+    pregenerator.debounce = 0.01
+    started, release = threading.Event(), threading.Event()
+
+    def slow_generation(_quiz_params):
+        started.set()
+        release.wait(2)
+        return [QUESTIONS, 200], None
+
+    with patch(
+        "api.utils.multiplayer_game.generate_questions_data",
+        side_effect=slow_generation,
+    ) as generate:
+        lobby_code = create_new_lobby("Host", "🦊").lobby_code
+        join_existing_lobby(lobby_code, "Guest", "🐼")
+        update_player_ready_status(lobby_code, "Guest", True)
+        assert started.wait(2)
+
+        assert start_game(lobby_code)[1] == 202
+        release.set()
+        _wait_for_state(lobby_code, GAME_STATE["QUESTION"])
+
+    assert generate.call_count == 1
+
+
+def test_orphaned_players_reaped_after_grace(ready_lobby, monkeypatch):
+    """Test that players without a live session are removed after the grace period."""
+    monkeypatch.setattr(multiplayer_lobby, "active_sessions", {"sid-host": 0})
+    with lobby_registry.locked(ready_lobby) as lobby:
+        lobby_registry.bind_session("sid-host", ready_lobby, lobby.players[0])
+        guest = find_player(lobby, "Guest")
+        lobby_registry.bind_session("sid-guest", ready_lobby, guest)
+        guest.disconnected_at = time.time()
+
+    assert cleanup_orphaned_players() == 0
+
+    guest.disconnected_at -= multiplayer_lobby.ORPHAN_GRACE_PERIOD + 1
+    assert cleanup_orphaned_players() == 1
+    assert [player.name for player in active_lobbies[ready_lobby].players] == ["Host"]
+
+
+@pytest.mark.parametrize("value", ["abc", None, 0, -5, True, float("nan"), "inf"])
+def test_settings_reject_invalid_durations(ready_lobby, value):
+    """Test that question durations must be positive numbers."""
+    settings = dict(active_lobbies[ready_lobby].settings)
+    for key in ("timePerQuestion", "revealDelay"):
+        result, status_code = update_lobby_settings(ready_lobby, {key: value})
+
+        assert status_code == 400
+        assert key in result["error"]
+    assert active_lobbies[ready_lobby].settings == settings
+
+
+def test_settings_coerce_numeric_durations(ready_lobby):
+    """Test that numeric strings are stored as seconds the timer can use."""
+    assert update_lobby_settings(ready_lobby, {"timePerQuestion": "20"})[1] == 200
+
+    assert active_lobbies[ready_lobby].settings["timePerQuestion"] == 20.0
+
+
+@pytest.fixture(name="timed_game")
+def fixture_timed_game(ready_lobby, monkeypatch):
+    """Start a game with short question deadlines and reveal delays."""
+    monkeypatch.setattr(multiplayer_engine, "ANSWER_GRACE_PERIOD", 0)
+    update_lobby_settings(ready_lobby, {"timePerQuestion": 0.1, "revealDelay": 0.1})
+    with patch(
+        "api.utils.multiplayer_game.generate_questions_data",
+        return_value=([QUESTIONS, 200], None),
+    ):
+        start_game(ready_lobby)
+        _wait_for_state(ready_lobby, GAME_STATE["QUESTION"])
+    return ready_lobby
+
+
+def test_question_times_out_and_advances(timed_game):
+    """Test that the server closes a stalled question and moves on by itself."""
+    assert submit_player_answer(timed_game, "Host", 0, "A) 1", 1)[1] == 200
+    assert active_lobbies[timed_game].game_state == GAME_STATE["WAITING"]
+
+    _wait_for_state(timed_game, GAME_STATE["SCOREBOARD"])
+    guest = active_lobbies[timed_game].players_by_name["Guest"]
+    assert guest.answers[0].outcome == AnswerOutcome.TIMED_OUT
+
+    _wait_for_state(timed_game, GAME_STATE["QUESTION"])
+    assert active_lobbies[timed_game].current_question_idx == 1
+
+    # Late answers for the closed question are rejected
+    assert submit_player_answer(timed_game, "Guest", 0, "A) 1", 1)[1] == 400
+
+
+def test_all_answers_close_question_early(timed_game):
+    """Test that the question closes as soon as every player has answered."""
+    with lobby_registry.locked(timed_game) as lobby:
+        lobby.settings["timePerQuestion"] = 60
+        multiplayer_engine.game_engine.start_question(lobby)
+
+    for name in ("Host", "Guest"):
+        assert submit_player_answer(timed_game, name, 0, "A) 1", 1)[1] == 200
+
+    assert active_lobbies[timed_game].game_state == GAME_STATE["SCOREBOARD"]
+    _wait_for_state(timed_game, GAME_STATE["QUESTION"])
+
+    # The host's duplicate next-question request no longer skips a question
+    assert advance_to_next_question(timed_game)[1] == 400
+    assert active_lobbies[timed_game].current_question_idx == 1
+
+
+def test_answered_set_follows_answers_and_leaves(timed_game):
+    """Test that the per-question answered set tracks answers, duplicates and leaves."""
+    with lobby_registry.locked(timed_game) as lobby:
+        lobby.settings["timePerQuestion"] = 60
+        multiplayer_engine.game_engine.start_question(lobby)
+
+    assert submit_player_answer(timed_game, "Host", 0, "A) 1", 1)[1] == 200
+    assert submit_player_answer(timed_game, "Host", 0, "A) 1", 1)[1] == 400
+
+    lobby = active_lobbies[timed_game]
+    host = lobby.players_by_name["Host"]
+    assert lobby.answered[0] == {host.id}
+    assert not multiplayer_engine.all_players_answered(lobby, 0)
+
+    # The last unanswered player leaving completes the question
+    leave_lobby(timed_game, "Guest")
+    assert lobby.game_state == GAME_STATE["SCOREBOARD"]
+    assert lobby.answered[0] == {host.id}
+
+
+def test_last_question_ends_game(timed_game):
+    """Test that the game ends when the last question times out."""
+    _wait_for_state(timed_game, GAME_STATE["GAME_OVER"], timeout=5)
+    results, status = get_game_results(timed_game)
+    assert status == 200
+    assert [len(player["answers"]) for player in results["players"]] == [3, 3]
+    assert results["players"][0]["answers"][2] == {
+        "question_index": 2,
+        "question": "Question 2?",
+        "userAnswer": "",
+        "correctAnswer": "A",
+        "isCorrect": False,
+        "score": 0,
+        "timeTaken": 0.0,
+        "timedOut": True,
+    }
+
+
+def test_lobby_updates_are_versioned_deltas(monkeypatch):
+    """Test that lobby updates carry consecutive versions and only what changed."""
+    monkeypatch.setattr(lobby_updates, "interval", 0)
+    with patch("api.utils.multiplayer_broadcast.broadcast_lobby_update") as broadcast:
+        lobby_code = create_new_lobby("Host", "🦊").lobby_code
+        guest_id = join_existing_lobby(lobby_code, "Guest", "🐼")[0]["player_id"]
+        update_player_ready_status(lobby_code, "Guest", True)
+        update_player_avatar(lobby_code, "Guest", "🐸")
+        update_lobby_settings(lobby_code, {"difficulty": "medium", "topic": "Space"})
+        leave_lobby(lobby_code, "Guest")
+
+    updates = [call.args[1] for call in broadcast.call_args_list]
+    assert [update["version"] for update in updates] == [1, 2, 3, 4, 5]
+    assert all(update["delta"] for update in updates)
+    assert "answers" not in updates[0]["players"][guest_id]
+    assert updates[1]["players"] == {guest_id: {"ready": True}}
+    assert updates[2]["players"] == {guest_id: {"avatar": "🐸"}}
+    assert updates[3]["settings"] == {"topic": "Space"}
+    assert updates[4]["removed_players"] == [guest_id]
+
+    snapshot, status_code = get_lobby_info(lobby_code)
+    assert status_code == 200
+    assert snapshot["version"] == 5 and snapshot["delta"] is False
+    assert [
+        set(player) & {"answers", "session_id"} for player in snapshot["players"]
+    ] == [set()]
+
+
+def test_lobby_updates_are_coalesced(ready_lobby, monkeypatch):
+    """Test that a burst of changes is sent as one merged lobby_update."""
+    monkeypatch.setattr(lobby_updates, "interval", 0.1)
+    guest_id = active_lobbies[ready_lobby].players_by_name["Guest"].id
+    with patch("api.utils.multiplayer_broadcast.broadcast_lobby_update") as broadcast:
+        for i in range(20):
+            update_lobby_settings(ready_lobby, {"numQuestions": i + 1})
+            update_player_ready_status(ready_lobby, "Guest", i % 2 == 0)
+        update_player_avatar(ready_lobby, "Guest", "🐸")
+
+        deadline = time.monotonic() + 2
+        while not broadcast.called or "avatar" not in str(broadcast.call_args):
+            assert time.monotonic() < deadline, "Pending changes were never flushed"
+            time.sleep(0.01)
+        time.sleep(0.15)
+
+    # At most a leading update and one merged update for the whole burst
+    updates = [call.args[1] for call in broadcast.call_args_list]
+    assert len(updates) <= 2
+    assert [update["version"] for update in updates] == list(
+        range(updates[0]["version"], updates[0]["version"] + len(updates))
+    )
+    assert updates[-1]["settings"] == {"numQuestions": 20}
+    assert updates[-1]["players"] == {guest_id: {"ready": False, "avatar": "🐸"}}
+
+
+def test_large_room_lifts_player_limit():
+    """Test that large-room mode admits more than 8 players and only counts them."""
+    lobby_code = create_new_lobby("Host", "🦊").lobby_code
+    for i in range(7):
+        assert join_existing_lobby(lobby_code, f"Player{i}", "🐼")[1] == 200
+    assert join_existing_lobby(lobby_code, "Late", "🐼") == (
+        {"error": "Lobby is full"},
+        400,
+    )
+
+    assert update_lobby_settings(lobby_code, {"largeRoom": True})[1] == 200
+    with patch("api.utils.multiplayer_broadcast.broadcast_lobby_update") as broadcast:
+        lobby_updates.discard(lobby_code)
+        assert join_existing_lobby(lobby_code, "Late", "🐼")[1] == 200
+    update = broadcast.call_args.args[1]
+    assert update["player_count"] == 9 and "players" not in update
+
+    # The lobby cannot go back to a regular lobby with 9 players
+    assert update_lobby_settings(lobby_code, {"largeRoom": False})[1] == 400
+    snapshot = get_lobby_info(lobby_code)[0]
+    assert snapshot["player_count"] == 9
+
+
+def test_large_room_sends_counts_and_ranks(monkeypatch):
+    """Test that large rooms get answer counts, top players and individual ranks."""
+    monkeypatch.setattr(lobby_updates, "large_room_interval", 0)
+    lobby = create_new_lobby("Host", "🦊")
+    lobby_code = lobby.lobby_code
+    update_lobby_settings(lobby_code, {"largeRoom": True})
+    for i in range(29):
+        join_existing_lobby(lobby_code, f"Player{i}", "🐼")
+    with lobby_registry.locked(lobby_code):
+        for i, player in enumerate(lobby.players):
+            player.session_id = f"sid-{i}"
+        lobby.game_state = GAME_STATE["GENERATING"]
+        multiplayer_engine.game_engine.begin(lobby, [QUESTIONS, 200])
+
+    with patch("api.utils.multiplayer_broadcast.event_emitter.emit") as emit, patch(
+        "api.utils.multiplayer_engine.answer_score", side_effect=range(30)
+    ):
+        for player in list(lobby.players):
+            submit_player_answer(lobby_code, player.name, 0, "A) 1", 1)
+    multiplayer_engine.question_timer.cancel(lobby_code)
+
+    events = {}
+    for call in emit.call_args_list:
+        events.setdefault(call.args[0], []).append((call.args[1], call.kwargs["room"]))
+    assert "player_answered" not in events
+    progress = [u["answer_progress"] for u, _ in events["lobby_update"]]
+    assert progress[-1] == {"question_index": 0, "answered": 30, "total": 30}
+
+    ((scoreboard, room),) = events["scoreboard"]
+    assert room == lobby_code
+    assert [entry["score"] for entry in scoreboard["players"]] == list(
+        range(29, 19, -1)
+    )
+    assert [entry["rank"] for entry in scoreboard["players"]] == list(range(1, 11))
+    assert len(scoreboard["sample"]) == 20 and scoreboard["player_count"] == 30
+    assert scoreboard["answer_counts"] == {"options": [30, 0, 0, 0], "unanswered": 0}
+
+    ranks = {room: rank for rank, room in events["player_rank"]}
+    assert len(ranks) == 30
+    assert ranks["sid-0"]["rank"] == 30 and ranks["sid-29"]["rank"] == 1
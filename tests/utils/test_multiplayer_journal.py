@@ -0,0 +1,184 @@
+"""
+Unit tests for the multiplayer lobby journal.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+import pytest
+from api.utils import multiplayer_lobby
+from api.utils.multiplayer_engine import game_engine
+from api.utils.multiplayer_journal import JOURNAL_FILE, LobbyJournal
+from api.utils.multiplayer_lobby import GAME_STATE, LobbyRegistry
+from api.utils.multiplayer_models import Lobby, Player, lobby_state
+from api.utils.multiplayer_store import MemoryLobbyStore
+from api.utils.multiplayer_timer import question_timer
+
+QUESTIONS = [
+    {"question": f"Q{i}?", "options": ["A) 1", "B) 2"], "correct_answer": "A"}
+    for i in range(3)
+]
+
+
+def _build(code):
+    """Build a lobby with a host for a code."""
+    lobby = Lobby(code, "host", {"numQuestions": 1}, 1000.0, 1000.0)
+    multiplayer_lobby.add_player(lobby, Player("host", "Host", "🦊", is_host=True))
+    return lobby
+
+
+@contextmanager
+def _update(registry, code):
+    """Change a lobby and bump its state version, as every lobby update does."""
+    with registry.locked(code) as lobby:
+        yield lobby
+        lobby.state_version += 1
+
+
+def _start(directory, **kwargs):
+    """Start a journal on a fresh registry, as a restarted process would."""
+    registry = LobbyRegistry(MemoryLobbyStore())
+    journal = LobbyJournal(str(directory), commit_interval=0.01, **kwargs)
+    journal.start(registry)
+    return registry, journal
+
+
+@pytest.fixture(name="journaled")
+def fixture_journaled(tmp_path):
+    """A registry journaling to a temporary directory, with one lobby."""
+    registry, journal = _start(tmp_path)
+    registry.adopt(_build("ABC123"))
+    yield registry, journal
+    question_timer.cancel("ABC123")
+
+
+def test_replay_restores_lobby_updates(tmp_path, journaled):
+    """Test that lobbies come back after a restart with every committed update."""
+    registry, journal = journaled
+    with _update(registry, "ABC123") as lobby:
+        multiplayer_lobby.add_player(lobby, Player("guest", "Guest", "🐼"))
+        lobby.questions = [QUESTIONS, 200]
+    with _update(registry, "ABC123") as lobby:
+        lobby.players_by_id["guest"].score = 30
+        lobby.players_by_id["host"].avatar = "🐸"
+    with registry.locked("ABC123") as lobby:
+        expected = lobby_state(lobby)
+    journal.flush()
+
+    restored, replay = _start(tmp_path)
+    with restored.locked("ABC123") as lobby:
+        assert lobby_state(lobby) == expected
+        # Players rejoin by their id
+        assert lobby.players_by_id["guest"].name == "Guest"
+    assert replay.stats["replayed_lobbies"] == 1
+    assert journal.get_stats()["records"] >= 2
+
+
+def test_replay_restores_played_game(tmp_path, journaled):
+    """Test that answers and scores journaled as patches replay exactly."""
+    registry, journal = journaled
+    with _update(registry, "ABC123") as lobby:
+        multiplayer_lobby.add_player(lobby, Player("guest", "Guest", "🐼"))
+        lobby.game_state = GAME_STATE["GENERATING"]
+        game_engine.begin(lobby, [QUESTIONS, 200])
+    for index in range(2):
+        for name in ("Host", "Guest"):
+            with registry.locked("ABC123") as lobby:
+                game_engine.submit_answer(lobby, name, index, "A) 1", 2)
+        with registry.locked("ABC123") as lobby:
+            game_engine.advance(lobby, index)
+    with registry.locked("ABC123") as lobby:
+        expected = lobby_state(lobby)
+    journal.flush()
+
+    restored, _ = _start(tmp_path)
+    with restored.locked("ABC123") as lobby:
+        assert lobby_state(lobby) == expected
+        assert len(lobby.players_by_id["guest"].answers) == 2
+
+
+def test_reads_write_no_records(journaled, mocker):
+    """Test that reads, even ones touching last_activity, append nothing."""
+    registry, journal = journaled
+    journal.flush()
+    records = journal.stats["records"]
+    copy = mocker.spy(journal, "_copy")
+    with registry.locked("ABC123") as lobby:
+        assert lobby.players[0].name == "Host"
+    with registry.locked("ABC123") as lobby:
+        lobby.last_activity = time.time()
+    journal.flush()
+    assert journal.stats["records"] == records
+    copy.assert_not_called()
+
+
+def test_updates_are_copied_once_per_batch(journaled, mocker):
+    """Test that the writer copies a lobby once for updates it has not copied yet."""
+    registry, journal = journaled
+    journal.flush()
+    copy = mocker.spy(journal, "_copy")
+    journal.commit_interval = 0.2
+    for score in range(1, 6):
+        with _update(registry, "ABC123") as lobby:
+            lobby.players[0].score = score
+    journal.flush()
+
+    assert copy.call_count <= 2
+    stats = journal.get_stats()
+    assert stats["games"] == 1
+    assert stats["bytes_per_game"] == stats["bytes"]
+
+
+def test_replay_stops_at_torn_record(tmp_path, journaled):
+    """Test that a record cut short by a crash is ignored on replay."""
+    registry, journal = journaled
+    with _update(registry, "ABC123") as lobby:
+        lobby.players[0].score = 10
+    journal.flush()
+    with open(os.path.join(tmp_path, JOURNAL_FILE), "a", encoding="utf-8") as file:
+        file.write('["patch","ABC123",{"fields":')
+
+    restored, _ = _start(tmp_path)
+    with restored.locked("ABC123") as lobby:
+        assert lobby.players[0].score == 10
+
+
+def test_deleted_lobbies_stay_deleted(tmp_path, journaled):
+    """Test that a lobby deleted before the restart is not restored."""
+    registry, journal = journaled
+    registry.adopt(_build("XYZ789"))
+    registry.delete("ABC123")
+    journal.flush()
+
+    restored, _ = _start(tmp_path)
+    assert restored.codes() == ["XYZ789"]
+
+
+def test_snapshot_compacts_journal(tmp_path, journaled):
+    """Test that a journal past its size limit is folded into the snapshot."""
+    registry, journal = journaled
+    journal.snapshot_bytes = 200
+    for score in range(1, 20):
+        with _update(registry, "ABC123") as lobby:
+            lobby.players[0].score = score
+    journal.flush()
+
+    assert journal.stats["snapshots"] > 1
+    assert journal.get_stats()["journal_bytes"] < 400
+    restored, _ = _start(tmp_path)
+    with restored.locked("ABC123") as lobby:
+        assert lobby.players[0].score == 19
+
+
+def test_restored_question_closes_at_deadline(tmp_path, journaled):
+    """Test that an open question of a restored game gets its timer back."""
+    registry, journal = journaled
+    with _update(registry, "ABC123") as lobby:
+        lobby.questions = [QUESTIONS, 200]
+        lobby.game_state = GAME_STATE["QUESTION"]
+        lobby.current_question_idx = 0
+        lobby.question_deadline = time.time() + 30
+    journal.flush()
+
+    _start(tmp_path)
+    assert question_timer.pending("ABC123")
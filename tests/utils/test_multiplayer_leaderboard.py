@@ -0,0 +1,66 @@
+"""
+Unit tests for the incremental multiplayer leaderboard.
+"""
+
+import random
+from api.utils.multiplayer_leaderboard import Leaderboard
+from api.utils.multiplayer_lobby import add_player, remove_player
+from api.utils.multiplayer_models import (
+    Lobby,
+    Player,
+    lobby_from_state,
+    lobby_state,
+    serialize_results,
+)
+
+
+def test_ranks_share_equal_scores():
+    """Test that equal scores share a rank and the next rank skips ahead."""
+    leaderboard = Leaderboard([("a", 10), ("b", 30), ("c", 30), ("d", 5)])
+    assert [leaderboard.rank(key) for key in "abcd"] == [3, 1, 1, 4]
+    assert leaderboard.top(3) == [(1, "b", 30), (1, "c", 30), (3, "a", 10)]
+
+    leaderboard.update("d", 40)
+    leaderboard.remove("b")
+    assert leaderboard.top() == [(1, "d", 40), (2, "c", 30), (3, "a", 10)]
+    assert leaderboard.rank("b") is None and len(leaderboard) == 3
+
+
+def test_updates_match_full_sort():
+    """Test that random score updates rank like sorting every score."""
+    rng = random.Random(7)
+    leaderboard = Leaderboard()
+    scores = {}
+    for _ in range(2000):
+        key = f"player{rng.randrange(50)}"
+        if rng.random() < 0.1:
+            leaderboard.remove(key)
+            scores.pop(key, None)
+        else:
+            scores[key] = scores.get(key, 0) + rng.choice([0, 100, 250])
+            leaderboard.update(key, scores[key])
+
+    for key, score in scores.items():
+        assert leaderboard.rank(key) == 1 + sum(s > score for s in scores.values())
+    assert [score for _, _, score in leaderboard.top()] == sorted(
+        scores.values(), reverse=True
+    )
+
+
+def test_lobby_results_are_ranked():
+    """Test that lobbies rank their players and keep leavers of a finished game."""
+    lobby = Lobby("ABC123", "host", {}, 1000.0, 1000.0)
+    players = [Player(f"p{i}", f"Player{i}", "🦊", score=i * 10) for i in range(4)]
+    for player in players:
+        add_player(lobby, player)
+    remove_player(lobby, players[3])
+    assert lobby.leaderboard.rank("p2") == 1 and "p3" not in lobby.leaderboard
+
+    lobby.final_players = list(lobby.players)
+    remove_player(lobby, players[2])
+    results = serialize_results(lobby)
+    assert [(r["id"], r["rank"]) for r in results] == [("p2", 1), ("p1", 2), ("p0", 3)]
+
+    # Restored lobbies rebuild the ranking of the final players
+    restored = lobby_from_state(lobby_state(lobby))
+    assert serialize_results(restored) == results
@@ -0,0 +1,110 @@
+"""
+Unit tests for the multiplayer lobby registry.
+"""
+
+import threading
+import time
+from api.utils.multiplayer_lobby import LobbyRegistry, LobbyLifecycle
+from api.utils.multiplayer_models import Lobby
+
+
+def _build(code):
+    """Build a minimal lobby for a code."""
+    return Lobby(code, "host", {}, created_at=1000.0, last_activity=1000.0)
+
+
+def test_registry_create_and_lock():
+    """Test that a created lobby can be locked and mutated by its code."""
+    registry = LobbyRegistry()
+    lobby = registry.create(_build)
+
+    with registry.locked(lobby.lobby_code) as locked_lobby:
+        locked_lobby.players.append("Host")
+
+    assert lobby.lobby_code in registry
+    assert registry.codes() == [lobby.lobby_code]
+    assert lobby.players == ["Host"]
+
+
+def test_registry_locked_missing_lobby():
+    """Test that locking an unknown code yields None."""
+    registry = LobbyRegistry()
+    with registry.locked("NOPE00") as lobby:
+        assert lobby is None
+
+
+def test_registry_no_use_after_delete():
+    """Test that a waiter does not receive a lobby deleted while it waited."""
+    registry = LobbyRegistry()
+    code = registry.create(_build).lobby_code
+    seen = []
+
+    def waiter():
+        with registry.locked(code) as lobby:
+            seen.append(lobby)
+
+    with registry.locked(code):
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        time.sleep(0.05)
+        registry.delete(code)
+    thread.join(1)
+
+    assert seen == [None]
+    assert code not in registry
+
+
+def test_registry_lobbies_do_not_contend():
+    """Test that holding one lobby's lock does not block another lobby."""
+    registry = LobbyRegistry()
+    first = registry.create(_build).lobby_code
+    second = registry.create(_build).lobby_code
+    acquired = threading.Event()
+
+    def other_lobby():
+        with registry.locked(second):
+            acquired.set()
+
+    with registry.locked(first):
+        threading.Thread(target=other_lobby).start()
+        assert acquired.wait(1)
+
+
+def test_lifecycle_reaps_expired_lobbies():
+    """Test that only lobbies past their deadline are removed."""
+    registry = LobbyRegistry()
+    lifecycle = LobbyLifecycle(registry, idle_timeout=60)
+    idle = registry.create(_build).lobby_code
+    active = registry.create(_build)
+    active.last_activity = 1030.0
+    for lobby in registry.lobbies.values():
+        lifecycle.track(lobby.lobby_code, 1000.0)
+
+    assert lifecycle.reap_expired(now=1059.0) == 0
+    assert lifecycle.reap_expired(now=1061.0) == 1
+    assert idle not in registry
+    assert active.lobby_code in registry
+
+    # The touched lobby was pushed back with its new deadline
+    assert lifecycle.reap_expired(now=1091.0) == 1
+    assert registry.codes() == []
+    assert lifecycle.get_stats() == {
+        "lobbies_expired": 2,
+        "players_reaped": 0,
+        "rescheduled": 1,
+        "tracked_deadlines": 0,
+    }
+
+
+def test_lifecycle_skips_closed_lobbies():
+    """Test that deadlines of lobbies closed in the meantime are dropped."""
+    registry = LobbyRegistry()
+    lifecycle = LobbyLifecycle(registry, idle_timeout=60)
+    code = registry.create(_build).lobby_code
+    lifecycle.track(code, 1000.0)
+
+    with registry.locked(code):
+        registry.delete(code)
+
+    assert lifecycle.reap_expired(now=2000.0) == 0
+    assert lifecycle.get_stats()["tracked_deadlines"] == 0
@@ -0,0 +1,57 @@
+"""
+Unit tests for the multiplayer lobby, player and answer records.
+"""
+
+import pytest
+from api.utils.multiplayer_models import (
+    NO_CHOICE,
+    Answer,
+    AnswerOutcome,
+    Player,
+    choice_of,
+    serialize_answers,
+    serialize_player,
+)
+
+QUESTIONS = [
+    {
+        "question": f"Question {i}?",
+        "options": ["A) 1", "B) 2", "C) 3", "D) 4"],
+        "correct_answer": "A",
+    }
+    for i in range(2)
+]
+
+
+def test_records_are_slotted():
+    """Test that records carry no per-instance attribute dictionary."""
+    player = Player("id", "Host", "🦊")
+    assert not hasattr(player, "__dict__")
+    with pytest.raises(AttributeError):
+        player.nickname = "Hosty"
+
+
+def test_answers_serialize_from_question_index():
+    """Test that answers are joined with their question when serialized."""
+    player = Player("id", "Host", "🦊")
+    player.answers.append(
+        Answer(0, choice_of(QUESTIONS[0], "B) 2"), AnswerOutcome.INCORRECT, 0, 3.5)
+    )
+    first = serialize_answers(player, QUESTIONS)
+    assert first == [
+        {
+            "question_index": 0,
+            "question": "Question 0?",
+            "userAnswer": "B) 2",
+            "correctAnswer": "A",
+            "isCorrect": False,
+            "score": 0,
+            "timeTaken": 3.5,
+        }
+    ]
+
+    player.answers.append(Answer(1, NO_CHOICE, AnswerOutcome.TIMED_OUT))
+    second = serialize_player(player, QUESTIONS)["answers"]
+    assert second[0] == first[0]
+    assert second[1]["userAnswer"] == "" and second[1]["timedOut"] is True
+    assert "answers" not in serialize_player(player)
@@ -0,0 +1,47 @@
+"""
+Unit tests for the lobby ownership of cluster nodes.
+"""
+
+from collections import Counter
+from api.utils.multiplayer_lobby import generate_lobby_code
+from api.utils.multiplayer_shard import HashRing, LobbyRouter, lobby_router
+
+NODES = ["http://a:5000", "http://b:5000", "http://c:5000"]
+CODES = [f"L{i:05d}" for i in range(3000)]
+
+
+def test_ring_spreads_lobbies_over_nodes():
+    """Test that every node owns a fair share of the lobbies."""
+    ring = HashRing(NODES)
+    counts = Counter(ring.node_for(code) for code in CODES)
+    assert set(counts) == set(NODES)
+    assert min(counts.values()) > len(CODES) / len(NODES) / 2
+
+
+def test_ring_only_moves_lobbies_of_changed_node():
+    """Test that a node joining or leaving only moves lobbies to or from it."""
+    before = HashRing(NODES[:2])
+    after = HashRing(NODES)
+    moved = [code for code in CODES if before.node_for(code) != after.node_for(code)]
+
+    assert all(after.node_for(code) == NODES[2] for code in moved)
+    assert len(moved) < len(CODES) / 2
+    assert HashRing().node_for(CODES[0]) is None
+
+
+def test_router_owns_everything_without_nodes():
+    """Test that a single node owns every lobby."""
+    router = LobbyRouter()
+    assert router.owns("ABC123")
+
+    router = LobbyRouter(node_url=NODES[0], nodes=NODES)
+    owned = [code for code in CODES if router.owns(code)]
+    assert 0 < len(owned) < len(CODES)
+    assert all(router.owner(code) in NODES[1:] for code in CODES if code not in owned)
+
+
+def test_generated_codes_are_owned_by_this_node(monkeypatch):
+    """Test that new lobbies are created on the node that owns their code."""
+    monkeypatch.setattr(lobby_router, "node_url", NODES[1])
+    monkeypatch.setattr(lobby_router, "ring", HashRing(NODES))
+    assert all(lobby_router.owns(generate_lobby_code()) for _ in range(20))
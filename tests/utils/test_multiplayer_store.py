@@ -0,0 +1,144 @@
+"""
+Unit tests for the multiplayer lobby stores.
+"""
+
+import pytest
+from api.utils import multiplayer_lobby
+from api.utils.multiplayer_lobby import GAME_STATE, LobbyRegistry, lobby_registry
+from api.utils.multiplayer_models import (
+    Answer,
+    AnswerOutcome,
+    Lobby,
+    Player,
+    lobby_from_state,
+    lobby_state,
+    serialize_results,
+)
+from api.utils.multiplayer_store import (
+    LobbyConflict,
+    RedisLobbyStore,
+    retry_on_conflict,
+)
+from api.utils.multiplayer_game import create_new_lobby, join_existing_lobby
+from api.utils.multiplayer_player import update_player_avatar
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def _build(code):
+    """Build a lobby with a host for a code."""
+    lobby = Lobby(code, "host", {"numQuestions": 1}, 1000.0, 1000.0)
+    multiplayer_lobby.add_player(lobby, Player("host", "Host", "🦊", is_host=True))
+    return lobby
+
+
+@pytest.fixture(name="server")
+def fixture_server():
+    """A Redis server shared by the workers of a test."""
+    return fakeredis.FakeServer()
+
+
+def _worker(server):
+    """Return the lobby registry of one worker connected to the server."""
+    return LobbyRegistry(RedisLobbyStore(fakeredis.FakeRedis(server=server)))
+
+
+def test_lobby_state_round_trip():
+    """Test that a finished lobby is rebuilt from its stored state."""
+    questions = [{"question": "Q?", "options": ["A) 1", "B) 2"], "correct_answer": "A"}]
+    lobby = _build("ABC123")
+    guest = Player("guest", "Guest", "🐼", session_id="sid", disconnected_at=5.0)
+    multiplayer_lobby.add_player(lobby, guest)
+    lobby.questions = [questions, 200]
+    lobby.game_state = GAME_STATE["GAME_OVER"]
+    for player, outcome in zip(lobby.players, AnswerOutcome):
+        player.answers.append(Answer(0, 1, outcome, 10, 2.5))
+        lobby.answered.setdefault(0, set()).add(player.id)
+    lobby.final_players = list(lobby.players)
+    multiplayer_lobby.remove_player(lobby, guest)
+
+    restored = lobby_from_state(lobby_state(lobby))
+
+    assert restored == lobby
+    assert restored.players_by_name["Host"] is restored.players[0]
+    assert restored.final_players[0] is restored.players[0]
+    assert serialize_results(restored) == serialize_results(lobby)
+
+
+def test_workers_share_lobbies(server):
+    """Test that a lobby created on one worker is updated from another."""
+    first, second = _worker(server), _worker(server)
+    code = first.create(_build).lobby_code
+
+    with second.locked(code) as lobby:
+        lobby.players[0].ready = True
+
+    with first.locked(code) as lobby:
+        assert lobby.players[0].ready
+    assert first.codes() == second.codes() == [code]
+    assert len(second) == 1
+
+    with first.locked(code):
+        first.delete(code)
+    with second.locked(code) as lobby:
+        assert lobby is None
+
+
+def test_concurrent_update_conflicts(server):
+    """Test that the later of two concurrent updates fails and can be retried."""
+    first, second = _worker(server), _worker(server)
+    code = first.create(_build).lobby_code
+    attempts = []
+
+    @retry_on_conflict
+    def rename(registry, avatar):
+        with registry.locked(code) as lobby:
+            attempts.append(avatar)
+            lobby.players[0].avatar = avatar
+            # Another worker saves the lobby while the first update is running
+            if len(attempts) == 1:
+                with second.locked(code) as other:
+                    other.settings["numQuestions"] = 5
+
+    rename(first, "🐸")
+
+    assert attempts == ["🐸", "🐸"]
+    with _worker(server).locked(code) as lobby:
+        assert lobby.players[0].avatar == "🐸"
+        assert lobby.settings["numQuestions"] == 5
+
+    with pytest.raises(LobbyConflict):
+        with first.locked(code) as lobby:
+            lobby.players[0].ready = True
+            with second.locked(code) as other:
+                other.players[0].avatar = "🐢"
+
+
+def test_unchanged_lobby_is_not_saved(server):
+    """Test that reading a lobby does not bump its revision."""
+    registry = _worker(server)
+    code = registry.create(_build).lobby_code
+    client = fakeredis.FakeRedis(server=server)
+    key = f"quizzatron:lobby:{code}"
+
+    with registry.locked(code) as lobby:
+        assert lobby.players[0].name == "Host"
+    assert client.hget(key, "revision") == b"0"
+
+    with registry.locked(code) as lobby:
+        lobby.last_activity = 2000.0
+    assert client.hget(key, "revision") == b"1"
+
+
+def test_services_run_on_redis_store(server, monkeypatch):
+    """Test the lobby services against a store shared with another worker."""
+    monkeypatch.setattr(
+        lobby_registry, "store", RedisLobbyStore(fakeredis.FakeRedis(server=server))
+    )
+    code = create_new_lobby("Host", "🦊").lobby_code
+    assert join_existing_lobby(code, "Guest", "🐼")[1] == 200
+    assert update_player_avatar(code, "Guest", "🐸")[1] == 200
+
+    with _worker(server).locked(code) as lobby:
+        assert [p.name for p in lobby.players] == ["Host", "Guest"]
+        assert lobby.players_by_name["Guest"].avatar == "🐸"
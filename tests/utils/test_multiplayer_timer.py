@@ -0,0 +1,56 @@
+"""
+Unit tests for the question timer wheel.
+"""
+
+import threading
+import time
+from api.utils.multiplayer_timer import TimerWheel
+
+
+def test_timer_wheel_fires_in_deadline_order():
+    """Test that timers fire once, no earlier than their delay."""
+    wheel = TimerWheel(tick=0.01)
+    fired = []
+    done = threading.Event()
+    started = time.monotonic()
+
+    def record(name):
+        fired.append((name, time.monotonic() - started))
+        if len(fired) == 2:
+            done.set()
+
+    wheel.schedule("late", 0.1, record, "late")
+    wheel.schedule("early", 0.03, record, "early")
+
+    assert done.wait(2)
+    assert [name for name, _ in fired] == ["early", "late"]
+    assert fired[0][1] >= 0.03 and fired[1][1] >= 0.1
+    assert not wheel.pending("early") and not wheel.pending("late")
+
+
+def test_timer_wheel_cancel_and_replace():
+    """Test that cancelled timers never fire and rescheduling replaces a key."""
+    wheel = TimerWheel(tick=0.01)
+    fired = []
+    done = threading.Event()
+
+    wheel.schedule("cancelled", 0.02, fired.append, "cancelled")
+    wheel.cancel("cancelled")
+    wheel.schedule("lobby", 0.02, fired.append, "first")
+    wheel.schedule("lobby", 0.05, lambda: (fired.append("second"), done.set()))
+
+    assert done.wait(2)
+    time.sleep(0.05)
+    assert fired == ["second"]
+
+
+def test_timer_wheel_delays_beyond_one_rotation():
+    """Test that a delay longer than one wheel rotation waits for its round."""
+    wheel = TimerWheel(tick=0.01, slots=4)
+    done = threading.Event()
+    started = time.monotonic()
+
+    wheel.schedule("lobby", 0.1, done.set)
+
+    assert done.wait(2)
+    assert time.monotonic() - started >= 0.1
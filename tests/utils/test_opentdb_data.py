@@ -2,9 +2,35 @@
 Unit tests for the OpenTDB data utility functions.
 """
 
+import threading
+import time
 from unittest.mock import patch, MagicMock
 import pytest
-from api.utils.opentdb_data import get_questions_from_api, format_question_api_output
+from api.utils.opentdb_data import (
+    get_questions_from_api,
+    format_question_api_output,
+    QuestionPrefetcher,
+    RateLimiter,
+)
+
+
+def _batch_response(count, response_code=0):
+    """Build a mocked OpenTDB response holding `count` questions."""
+    mock_response = MagicMock()
+    mock_response.json.return_value = {
+        "response_code": response_code,
+        "token": "session-token",
+        "results": [
+            {
+                "question": f"Question {i} &amp; more",
+                "incorrect_answers": ["a", "b", "c"],
+                "correct_answer": "d",
+                "difficulty": "easy",
+            }
+            for i in range(count)
+        ],
+    }
+    return mock_response
 
 
 @patch("api.utils.opentdb_data.requests.get")
@@ -84,3 +110,143 @@ def test_format_question_api_output_edge_case():
     assert formatted_output is not None
     assert "questions" in formatted_output
     assert len(formatted_output["questions"]) == 0
+
+
+@patch("api.utils.opentdb_data.requests.get")
+def test_prefetcher_serves_from_buffer(mock_requests):
+    """Test that questions are served from the buffer without further API calls."""
+    mock_requests.return_value = _batch_response(10)
+    prefetcher = QuestionPrefetcher(RateLimiter(0), batch_size=10, low_water=0)
+
+    first = prefetcher.take("9", "easy", 4)
+    calls_after_fill = mock_requests.call_count
+    second = prefetcher.take("9", "easy", 4)
+
+    assert len(first) == 4 and len(second) == 4
+    assert first[0]["question"] == "Question 0 & more"
+    assert second[0]["question"] == "Question 4 & more"
+    assert mock_requests.call_count == calls_after_fill
+
+
+@patch("api.utils.opentdb_data.requests.get")
+def test_prefetcher_refills_below_low_water(mock_requests):
+    """Test that dropping below the low-water mark triggers a background refill."""
+    mock_requests.return_value = _batch_response(10)
+    prefetcher = QuestionPrefetcher(RateLimiter(0), batch_size=10, low_water=8)
+
+    prefetcher.take("9", "easy", 5)
+
+    deadline = time.monotonic() + 2
+    while len(prefetcher._buffers[("9", "easy")]) < 15:  # pylint: disable=protected-access
+        assert time.monotonic() < deadline, "Background refill did not complete"
+        time.sleep(0.01)
+
+
+@patch("api.utils.opentdb_data.requests.get")
+def test_prefetcher_falls_back_to_needed_amount(mock_requests):
+    """Test that a category too small for a full batch is fetched by exact amount."""
+    mock_requests.side_effect = [
+        _batch_response(0),  # Session token request
+        _batch_response(0, response_code=1),
+        _batch_response(3),
+    ]
+    prefetcher = QuestionPrefetcher(RateLimiter(0), batch_size=50, low_water=0)
+
+    assert len(prefetcher.take("9", "hard", 3)) == 3
+    assert mock_requests.call_args.kwargs["params"]["amount"] == 3
+    assert mock_requests.call_args.kwargs["params"]["token"] == "session-token"
+
+
+@patch("api.utils.opentdb_data.requests.get")
+def test_prefetcher_remembers_small_batches(mock_requests):
+    """Test that after one miss a small category is refilled with a single call."""
+    mock_requests.side_effect = [
+        _batch_response(0),  # Session token request
+        _batch_response(0, response_code=1),
+        _batch_response(3),
+        _batch_response(3),
+    ]
+    prefetcher = QuestionPrefetcher(RateLimiter(0), batch_size=50, low_water=0)
+
+    prefetcher.take("9", "hard", 3)
+    prefetcher.take("9", "hard", 3)
+
+    assert mock_requests.call_count == 4
+    assert mock_requests.call_args.kwargs["params"]["amount"] == 3
+
+
+@patch("api.utils.opentdb_data.requests.get")
+def test_concurrent_refills_share_one_token(mock_requests):
+    """Test that concurrent refills request one token and reset it once."""
+
+    def get(url, params, timeout):  # pylint: disable=unused-argument
+        if params.get("command") == "request":
+            time.sleep(0.05)
+        return _batch_response(0)
+
+    # pylint: disable=protected-access
+    mock_requests.side_effect = get
+    prefetcher = QuestionPrefetcher(RateLimiter(0))
+    key = ("9", "easy")
+    threads = [
+        threading.Thread(target=prefetcher._session_token, args=(key,))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    token, generation = prefetcher._session_token(key)
+    for _ in range(3):
+        prefetcher._reset_token(key, token, generation)
+
+    commands = [c.kwargs["params"]["command"] for c in mock_requests.call_args_list]
+    assert commands == ["request", "reset"]
+
+
+@patch("api.utils.opentdb_data.requests.get")
+def test_exhausted_token_resets_only_its_buffer(mock_requests):
+    """Test that an exhausted buffer resets its own token and not the others'."""
+    mock_requests.side_effect = [
+        _batch_response(0),  # Session token request for ("9", "easy")
+        _batch_response(3),
+        _batch_response(0),  # Session token request for ("10", "easy")
+        _batch_response(0, response_code=4),
+        _batch_response(0),  # Token reset
+        _batch_response(3),
+    ]
+    prefetcher = QuestionPrefetcher(RateLimiter(0), batch_size=3, low_water=0)
+
+    prefetcher.take("9", "easy", 3)
+    prefetcher.take("10", "easy", 3)
+
+    # pylint: disable=protected-access
+    assert prefetcher._token_generations == {("9", "easy"): 1, ("10", "easy"): 2}
+    commands = [c.kwargs["params"].get("command") for c in mock_requests.call_args_list]
+    assert commands.count("reset") == 1
+
+
+@pytest.mark.parametrize("num_questions", ["None", "abc", "0", "-3"])
+def test_get_questions_from_api_invalid_count(num_questions):
+    """Test that a non-numeric or non-positive question count returns None."""
+    with patch("api.utils.opentdb_data.question_prefetcher") as mock_prefetcher:
+        assert (
+            get_questions_from_api(
+                category="9", difficulty="easy", num_questions=num_questions
+            )
+            is None
+        )
+        mock_prefetcher.take.assert_not_called()
+
+
+def test_rate_limiter_spaces_calls():
+    """Test that the rate limiter enforces its interval between calls."""
+    limiter = RateLimiter(0.1)
+
+    started = time.monotonic()
+    for _ in range(3):
+        with limiter:
+            pass
+
+    assert time.monotonic() - started >= 0.2
@@ -0,0 +1,132 @@
+"""
+Unit tests for the local question bank utility functions.
+"""
+
+import json
+import pytest
+from api.utils.question_bank import build_question_bank, QuestionBank
+
+
+@pytest.fixture(name="question_bank")
+def fixture_question_bank(tmp_path):
+    """Build a small question bank from converter-style JSON files."""
+    json_dir = tmp_path / "json_files"
+    json_dir.mkdir()
+    (json_dir / "greek-myths.json").write_text(
+        json.dumps(
+            [
+                {
+                    "category": "greek-myths",
+                    "question": f"Which god rules domain {i}?",
+                    "options": ["Zeus", "Hera", "Apollo", "Hades"],
+                    "correct_answer": "Apollo",
+                    "index": i,
+                }
+                for i in range(20)
+            ]
+        ),
+        encoding="utf-8",
+    )
+    (json_dir / "animals.json").write_text(
+        json.dumps(
+            [
+                {
+                    "category": "animals",
+                    "question": "Which animal is the largest mammal?",
+                    "options": ["Elephant", "Blue whale", "Giraffe", "Hippo"],
+                    "correct_answer": "Blue whale",
+                    "difficulty": "easy",
+                    "index": 1,
+                }
+            ]
+        ),
+        encoding="utf-8",
+    )
+
+    db_path = str(tmp_path / "bank.db")
+    assert build_question_bank(str(json_dir), db_path) == 21
+    return QuestionBank(db_path)
+
+
+def test_question_bank_categories(question_bank):
+    """Test that categories are named like the MongoDB collections."""
+    assert set(question_bank.categories) == {"Greek Myths", "Animals"}
+
+
+def test_get_questions_format(question_bank):
+    """Test that sampled questions use the shared question format."""
+    result = question_bank.get_questions("Greek Myths", 5, "hard")
+
+    assert len(result["questions"]) == 5
+    question = result["questions"][0]
+    assert question["options"][2] == "C) Apollo"
+    assert question["correct_answer"] == "C"
+    assert question["difficulty"] == "hard"
+    assert question["image"] is False
+    assert len({q["question"] for q in result["questions"]}) == 5
+
+
+def test_get_questions_filters_difficulty(question_bank):
+    """Test that questions with a recorded difficulty only match that difficulty."""
+    assert len(question_bank.get_questions("Animals", 5, "easy")["questions"]) == 1
+    assert question_bank.get_questions("Animals", 5, "hard") == {"questions": []}
+
+
+def test_get_questions_unknown_category(question_bank):
+    """Test that a category missing from the bank returns None."""
+    assert question_bank.get_questions("Unknown", 5, "easy") is None
+
+
+def test_search_questions(question_bank):
+    """Test free-text topic search through the FTS index."""
+    result = question_bank.search_questions("largest mammal", 5, "easy")
+
+    assert len(result["questions"]) == 1
+    assert result["questions"][0]["correct_answer"] == "B"
+    assert question_bank.search_questions("volcano", 5, "easy") is None
+
+
+def test_search_questions_filters_difficulty(question_bank):
+    """Test that search only returns questions of the requested difficulty."""
+    assert question_bank.search_questions("largest mammal", 5, "hard") is None
+
+
+def test_format_keeps_id_order(question_bank):
+    """Test that questions are returned in the order their ids were picked."""
+    ids = [9, 2, 14, 5]
+    expected = [
+        question_bank._format([i], "medium")["questions"][0]["question"] for i in ids
+    ]
+
+    result = question_bank._format(ids, "medium")["questions"]
+    assert [q["question"] for q in result] == expected
+    assert [q["index"] for q in result] == [1, 2, 3, 4]
+
+
+def test_build_keeps_correct_answer(tmp_path):
+    """Test that rows missing their answer are skipped and truncation keeps the answer."""
+    json_dir = tmp_path / "json_files"
+    json_dir.mkdir()
+    (json_dir / "planets.json").write_text(
+        json.dumps(
+            [
+                {
+                    "question": "Which planet is the largest?",
+                    "options": ["Mars", "Venus", "Earth", "Mercury", "Jupiter"],
+                    "correct_answer": "Jupiter",
+                },
+                {
+                    "question": "Which planet is the smallest?",
+                    "options": ["Mars", "Venus", "Earth", "Jupiter"],
+                    "correct_answer": "Mercury",
+                },
+            ]
+        ),
+        encoding="utf-8",
+    )
+
+    db_path = str(tmp_path / "bank.db")
+    assert build_question_bank(str(json_dir), db_path) == 1
+    question = QuestionBank(db_path).get_questions("Planets", 5, "easy")["questions"][0]
+    assert question["options"] == ["A) Mars", "B) Venus", "C) Earth", "D) Jupiter"]
+    assert question["correct_answer"] == "D"
@@ -0,0 +1,56 @@
+"""
+Unit tests for the seen-question tracking utility.
+"""
+
+from api.utils.seen_questions import BloomFilter, SeenQuestionTracker
+
+
+def _questions(*texts):
+    """Build question dictionaries from their texts."""
+    return [{"question": text} for text in texts]
+
+
+def test_bloom_filter_membership():
+    """Test that added items are found and the false-positive rate stays low."""
+    bloom = BloomFilter(capacity=500, error_rate=0.01)
+    for i in range(500):
+        bloom.add(f"question {i}")
+
+    assert all(f"question {i}" in bloom for i in range(500))
+    false_positives = sum(f"other {i}" in bloom for i in range(2000))
+    assert false_positives < 60
+
+
+def test_pick_prefers_unseen_questions():
+    """Test that a session is not served the same question twice."""
+    tracker = SeenQuestionTracker()
+    first, _ = tracker.pick("session", _questions("q1", "q2"), 2)
+    second, leftovers = tracker.pick("session", _questions("q1", "q2", "q3", "q4"), 2)
+
+    assert [q["question"] for q in first] == ["q1", "q2"]
+    assert [q["question"] for q in second] == ["q3", "q4"]
+    assert [q["question"] for q in leftovers] == ["q1", "q2"]
+
+
+def test_pick_tops_up_with_seen_questions():
+    """Test that seen questions fill in when not enough unseen ones exist."""
+    tracker = SeenQuestionTracker()
+    tracker.pick("session", _questions("q1"), 1)
+
+    picked, _ = tracker.pick("session", _questions("q1", "q2"), 2)
+
+    assert [q["question"] for q in picked] == ["q2", "q1"]
+
+
+def test_sessions_are_independent_and_bounded():
+    """Test that sessions track separately and the least recently used is evicted."""
+    tracker = SeenQuestionTracker(max_sessions=2)
+    tracker.pick("a", _questions("q1"), 1)
+    tracker.pick("b", _questions("q1"), 1)
+    tracker.pick("c", _questions("q1"), 1)
+
+    # Session "a" was evicted, so q1 counts as unseen for it again
+    picked, _ = tracker.pick("a", _questions("q2", "q1"), 1)
+    assert picked[0]["question"] == "q2"
+    picked, _ = tracker.pick("a", _questions("q1", "q3"), 1)
+    assert picked[0]["question"] == "q1"